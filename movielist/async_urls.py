@@ -0,0 +1,17 @@
+"""
+URL configuration with ASYNC_VIEWS=1: the async views of the movie and
+collection endpoints, then every other URL of movielist.urls.
+"""
+from django.urls import include, path
+from rest_framework.routers import SimpleRouter
+from movies.async_views import AsyncCollectionViewSet, AsyncMovieListView
+
+router = SimpleRouter()
+router.register(r'collection', AsyncCollectionViewSet, basename='collection')
+
+urlpatterns = [
+    path('movies/', AsyncMovieListView.as_view(), name='movie-list'),
+    # Format suffix URLs (/collection/.json) fall through to the synchronous viewset.
+    *router.urls,
+    path('', include('movielist.urls')),
+]
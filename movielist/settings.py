@@ -48,6 +48,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'movies.middleware.InstrumentationMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -80,7 +81,7 @@ WSGI_APPLICATION = 'movielist.wsgi.application'
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'movies.authentication.CachedJWTAuthentication',
     ],
 }
 
@@ -96,15 +97,18 @@ DATABASES = {
 
 CACHES = {
     'default': {
-        'BACKEND': 'django_redis.cache.RedisCache',
+        'BACKEND': 'movies.instrumentation.InstrumentedRedisCache',
         'LOCATION': 'redis://127.0.0.1:6379/1',
         'OPTIONS': {
             'CLIENT_CLASS': 'django_redis.client.DefaultClient',
-            'PARSER_CLASS': 'redis.connection.HiredisParser',
         }
     }
 }
 
+# The benchmark commands run against this database of the same Redis server,
+# so their request counts and metrics stay out of the configured one.
+BENCHMARK_REDIS_DB = int(os.getenv('BENCHMARK_REDIS_DB', 15))
+
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
 
@@ -150,3 +154,151 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 EXTERNAL_MOVIES_API_URL = os.getenv('EXTERNAL_API_URL', 'external_api_url')
 API_USERNAME = os.getenv('API_USERNAME', 'api_username')
 API_PASSWORD = os.getenv('API_PASSWORD', 'api_password')
+
+COLLECTIONS_PAGE_SIZE = int(os.getenv('COLLECTIONS_PAGE_SIZE', 50))
+COLLECTIONS_MAX_PAGE_SIZE = int(os.getenv('COLLECTIONS_MAX_PAGE_SIZE', 500))
+
+# /movies/ pages are served from cache for MOVIES_CACHE_SOFT_TTL seconds, then
+# served stale while one worker refreshes them, until MOVIES_CACHE_HARD_TTL.
+MOVIES_CACHE_SOFT_TTL = int(os.getenv('MOVIES_CACHE_SOFT_TTL', 3600))
+MOVIES_CACHE_HARD_TTL = int(os.getenv('MOVIES_CACHE_HARD_TTL', 86400))
+MOVIES_CACHE_LOCK_TIMEOUT = int(os.getenv('MOVIES_CACHE_LOCK_TIMEOUT', 30))
+MOVIES_CACHE_LOCK_WAIT = float(os.getenv('MOVIES_CACHE_LOCK_WAIT', 5))
+
+# Upstream movie API client: connection pool size, per-attempt (connect, read)
+# timeouts, total deadline including retries, and circuit breaker.
+MOVIES_API_POOL_SIZE = int(os.getenv('MOVIES_API_POOL_SIZE', 20))
+MOVIES_API_CONNECT_TIMEOUT = float(os.getenv('MOVIES_API_CONNECT_TIMEOUT', 3.05))
+MOVIES_API_READ_TIMEOUT = float(os.getenv('MOVIES_API_READ_TIMEOUT', 10))
+MOVIES_API_DEADLINE = float(os.getenv('MOVIES_API_DEADLINE', 15))
+MOVIES_API_RETRIES = int(os.getenv('MOVIES_API_RETRIES', 3))
+MOVIES_API_BACKOFF = float(os.getenv('MOVIES_API_BACKOFF', 0.5))
+MOVIES_API_BREAKER_THRESHOLD = int(os.getenv('MOVIES_API_BREAKER_THRESHOLD', 5))
+MOVIES_API_BREAKER_RESET = float(os.getenv('MOVIES_API_BREAKER_RESET', 30))
+
+# RequestCounterMiddleware buffers counts in memory and flushes them to Redis
+# every REQUEST_COUNTER_FLUSH_INTERVAL seconds or REQUEST_COUNTER_FLUSH_EVERY
+# requests. Set REQUEST_COUNTER_BUFFERED=0 to INCR Redis on every request.
+REQUEST_COUNTER_BUFFERED = os.getenv('REQUEST_COUNTER_BUFFERED', '1') == '1'
+REQUEST_COUNTER_FLUSH_INTERVAL = float(os.getenv('REQUEST_COUNTER_FLUSH_INTERVAL', 1))
+REQUEST_COUNTER_FLUSH_EVERY = int(os.getenv('REQUEST_COUNTER_FLUSH_EVERY', 100))
+
+# Per-minute request and latency buckets are kept this many seconds.
+METRICS_RETENTION = int(os.getenv('METRICS_RETENTION', 7200))
+
+# Cache collection list/detail responses per user. Keys carry the user's
+# collection version, so writes invalidate them without deleting anything.
+COLLECTION_RESPONSE_CACHE = {
+    'list': os.getenv('COLLECTION_RESPONSE_CACHE_LIST', '1') == '1',
+    'retrieve': os.getenv('COLLECTION_RESPONSE_CACHE_RETRIEVE', '1') == '1',
+}
+COLLECTION_RESPONSE_CACHE_TTL = int(os.getenv('COLLECTION_RESPONSE_CACHE_TTL', 300))
+
+# 'upstream' serves /movies/ pages from the external API (through the cache);
+# 'mirror' serves the pages already copied by `manage.py sync_movies` from the
+# database and only goes upstream for pages not synced yet.
+MOVIES_SOURCE = os.getenv('MOVIES_SOURCE', 'upstream')
+
+# InstrumentationMiddleware logs one JSON line per request to the
+# 'movies.requests' logger with its SQL, cache and upstream call counts and
+# times, and sends them in a Server-Timing header unless SERVER_TIMING=0.
+SERVER_TIMING = os.getenv('SERVER_TIMING', '1') == '1'
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'movies.requests': {
+            'handlers': ['console'],
+            'level': os.getenv('REQUEST_LOG_LEVEL', 'INFO'),
+            'propagate': False,
+        },
+    },
+}
+
+# CachedJWTAuthentication keeps resolved users for AUTH_USER_CACHE_LOCAL_TTL
+# seconds in the local 'users' tier of AUTH_USER_CACHE_SIZE entries (see
+# LOCAL_CACHE_TIERS) and for AUTH_USER_CACHE_TTL seconds in Redis.
+# AUTH_TRUST_TOKEN_CLAIMS=1 skips the lookup for safe requests to views with
+# `trust_token_claims = True`.
+AUTH_USER_CACHE_SIZE = int(os.getenv('AUTH_USER_CACHE_SIZE', 10000))
+AUTH_USER_CACHE_LOCAL_TTL = float(os.getenv('AUTH_USER_CACHE_LOCAL_TTL', 5))
+AUTH_USER_CACHE_TTL = int(os.getenv('AUTH_USER_CACHE_TTL', 300))
+AUTH_TRUST_TOKEN_CLAIMS = os.getenv('AUTH_TRUST_TOKEN_CLAIMS', '0') == '1'
+
+# Streamed collection responses (?stream=true or Accept: application/x-ndjson)
+# read this many rows from the database at a time.
+STREAM_CHUNK_SIZE = int(os.getenv('STREAM_CHUNK_SIZE', 500))
+
+# 'fast' builds collection and movie read responses straight from values()
+# rows and upstream dicts; 'standard' goes through the DRF serializers. Both
+# render identical JSON.
+READ_SERIALIZERS = os.getenv('READ_SERIALIZERS', 'fast')
+
+# Read replicas. Safe requests to the movie and collection endpoints read
+# from one of DATABASE_REPLICAS (round-robin, skipping replicas whose health
+# check query failed within REPLICA_HEALTH_CHECK_INTERVAL seconds); a user's
+# reads stay on the primary for REPLICA_PIN_SECONDS after they write.
+# DATABASE_REPLICA_FILES takes comma-separated SQLite files, e.g. copies of
+# db.sqlite3 for trying this out locally; other replicas are added to
+# DATABASES and DATABASE_REPLICAS here.
+DATABASE_ROUTERS = ['movies.db_router.PrimaryReplicaRouter']
+DATABASE_REPLICAS = []
+for i, path in enumerate(filter(None, os.getenv('DATABASE_REPLICA_FILES', '').split(',')), 1):
+    DATABASES[f'replica_{i}'] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': path.strip(),
+        'TEST': {'MIRROR': 'default'},
+    }
+    DATABASE_REPLICAS.append(f'replica_{i}')
+REPLICA_PIN_SECONDS = int(os.getenv('REPLICA_PIN_SECONDS', 5))
+REPLICA_HEALTH_CHECK_INTERVAL = float(os.getenv('REPLICA_HEALTH_CHECK_INTERVAL', 10))
+REPLICA_HEALTH_CHECK_QUERY = os.getenv('REPLICA_HEALTH_CHECK_QUERY', 'SELECT 1 FROM django_migrations LIMIT 1')
+
+# 'compact' stores /movies/ pages in Redis as versioned JSON rows, compressed
+# with zlib (at MOVIES_CACHE_COMPRESS_LEVEL) above
+# MOVIES_CACHE_COMPRESS_THRESHOLD bytes; 'pickle' stores the entry dicts as
+# they are. 'compact' still reads pickled pages; 'pickle' treats compact
+# pages as misses.
+MOVIES_CACHE_CODEC = os.getenv('MOVIES_CACHE_CODEC', 'compact')
+MOVIES_CACHE_COMPRESS_THRESHOLD = int(os.getenv('MOVIES_CACHE_COMPRESS_THRESHOLD', 1024))
+MOVIES_CACHE_COMPRESS_LEVEL = int(os.getenv('MOVIES_CACHE_COMPRESS_LEVEL', 6))
+
+# Two-tier cache. /movies/ pages, cached collection responses and resolved
+# users are kept in a per-process LRU in front of Redis, bounded per tier by
+# entries and by the pickled size of the values, each entry for at most the
+# tier's TTL in seconds. Writes and deletes are broadcast on Redis pub/sub so
+# other workers drop their copy. LOCAL_CACHE_ENABLED=0 reads Redis only.
+LOCAL_CACHE_ENABLED = os.getenv('LOCAL_CACHE_ENABLED', '1') == '1'
+LOCAL_CACHE_TIERS = {
+    'movies': {
+        'max_entries': int(os.getenv('LOCAL_CACHE_MOVIES_ENTRIES', 500)),
+        'max_bytes': int(os.getenv('LOCAL_CACHE_MOVIES_BYTES', 32 * 1024 * 1024)),
+        'ttl': float(os.getenv('LOCAL_CACHE_MOVIES_TTL', 60)),
+        'codec': 'movies.page_codec.PageCodec' if MOVIES_CACHE_CODEC == 'compact' else None,
+    },
+    'collections': {
+        'max_entries': int(os.getenv('LOCAL_CACHE_COLLECTIONS_ENTRIES', 2000)),
+        'max_bytes': int(os.getenv('LOCAL_CACHE_COLLECTIONS_BYTES', 32 * 1024 * 1024)),
+        'ttl': float(os.getenv('LOCAL_CACHE_COLLECTIONS_TTL', 60)),
+    },
+    'users': {
+        'max_entries': AUTH_USER_CACHE_SIZE,
+        'max_bytes': int(os.getenv('LOCAL_CACHE_USERS_BYTES', 8 * 1024 * 1024)),
+        'ttl': AUTH_USER_CACHE_LOCAL_TTL,
+    },
+}
+
+# ASYNC_VIEWS=1 serves /movies/ and /collection/ from async views
+# (movielist/async_urls.py), for ASGI deployments (movielist/asgi.py). The
+# async upstream client keeps up to MOVIES_API_ASYNC_POOL_SIZE requests in
+# flight per event loop, and ASYNC_DB_WRITERS collection writes run at once:
+# SQLite takes one writer, and more only poll its lock.
+ASYNC_VIEWS = os.getenv('ASYNC_VIEWS', '0') == '1'
+if ASYNC_VIEWS:
+    ROOT_URLCONF = 'movielist.async_urls'
+MOVIES_API_ASYNC_POOL_SIZE = int(os.getenv('MOVIES_API_ASYNC_POOL_SIZE', 256))
+ASYNC_DB_WRITERS = int(os.getenv('ASYNC_DB_WRITERS', 1))
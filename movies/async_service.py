@@ -0,0 +1,196 @@
+import asyncio
+import json
+import os
+import time
+import weakref
+import aiohttp
+from django.conf import settings
+from .instrumentation import timed
+from .service import RETRY_STATUSES, CircuitBreaker
+
+
+class AsyncMovieAPIClient:
+    """
+    asyncio counterpart of MovieAPIClient: the same results, deadline,
+    retries with exponential backoff and circuit breaker, without holding
+    a thread while upstream answers. Requests share an aiohttp session of
+    up to ``pool_size`` keep-alive connections, opened on first use in the
+    running event loop and closed by aclose() or ``async with``; as with
+    requests, redirects are followed and proxies are taken from the
+    environment.
+    """
+
+    def __init__(self, pool_size=None, connect_timeout=None, read_timeout=None, deadline=None,
+                 retries=None, backoff_factor=None, breaker=None):
+        self.pool_size = pool_size or settings.MOVIES_API_ASYNC_POOL_SIZE
+        self.connect_timeout = connect_timeout or settings.MOVIES_API_CONNECT_TIMEOUT
+        self.read_timeout = read_timeout or settings.MOVIES_API_READ_TIMEOUT
+        self.deadline = deadline or settings.MOVIES_API_DEADLINE
+        self.retries = settings.MOVIES_API_RETRIES if retries is None else retries
+        self.backoff_factor = settings.MOVIES_API_BACKOFF if backoff_factor is None else backoff_factor
+        self.breaker = breaker or CircuitBreaker(
+            settings.MOVIES_API_BREAKER_THRESHOLD, settings.MOVIES_API_BREAKER_RESET
+        )
+        self.session = None
+
+        self.requests = 0
+        self.failures = 0
+        self.not_modified = 0
+        self.bytes_saved = 0
+        self.ms_saved = 0.0
+        self.connections_opened = 0
+        self.in_flight = 0
+
+    def get_session(self):
+        if self.session is None:
+            trace = aiohttp.TraceConfig()
+            trace.on_connection_create_end.append(self._connection_opened)
+            self.session = aiohttp.ClientSession(
+                # Certificates are not verified, as with verify=False in MovieAPIClient.
+                connector=aiohttp.TCPConnector(limit=self.pool_size, ssl=False),
+                timeout=aiohttp.ClientTimeout(total=None, sock_connect=self.connect_timeout, sock_read=self.read_timeout),
+                trust_env=True,
+                trace_configs=[trace],
+            )
+        return self.session
+
+    async def _connection_opened(self, session, context, params):
+        self.connections_opened += 1
+
+    async def aclose(self):
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.aclose()
+
+    async def fetch_movies(self, url, auth, page=1, validators=None):
+        """See MovieAPIClient.fetch_movies."""
+        if not self.breaker.allow():
+            return {"error": "Movie API circuit breaker is open."}
+        try:
+            return await self._fetch_movies(url, auth, page, validators)
+        except Exception:
+            # As in MovieAPIClient: a half-open breaker rejects every call until an outcome is recorded.
+            self.breaker.record_failure()
+            raise
+
+    async def _fetch_movies(self, url, auth, page, validators):
+        params = {'page': page}
+        headers = {}
+        if validators and validators.get('etag'):
+            headers['If-None-Match'] = validators['etag']
+        if validators and validators.get('last_modified'):
+            headers['If-Modified-Since'] = validators['last_modified']
+        request_headers = {'Authorization': aiohttp.encode_basic_auth(*auth), **headers} if auth else headers
+        deadline = time.monotonic() + self.deadline
+        error = None
+
+        for attempt in range(self.retries + 1):
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                timeout = aiohttp.ClientTimeout(
+                    total=min(self.connect_timeout + self.read_timeout, remaining),
+                    sock_connect=min(self.connect_timeout, remaining),
+                    sock_read=min(self.read_timeout, remaining),
+                )
+                started = time.perf_counter()
+                self.in_flight += 1
+                try:
+                    with timed('upstream'):
+                        async with self.get_session().get(
+                            url, params=params, headers=request_headers, timeout=timeout,
+                        ) as response:
+                            body = await response.read()
+                finally:
+                    self.in_flight -= 1
+                ms = (time.perf_counter() - started) * 1000
+                if response.status == 304 and headers:
+                    self.requests += 1
+                    self.not_modified += 1
+                    self.bytes_saved += validators.get('bytes', 0)
+                    self.ms_saved += validators.get('ms', 0) - ms
+                    self.breaker.record_success()
+                    return {"not_modified": True}
+                if response.status not in RETRY_STATUSES:
+                    if response.status >= 400:
+                        # Worded as requests' raise_for_status() in MovieAPIClient.
+                        kind = 'Client' if response.status < 500 else 'Server'
+                        raise ValueError(f"{response.status} {kind} Error: {response.reason} for url: {response.url}")
+                    # A body that is not a JSON object is counted once, as a client error below.
+                    result = json.loads(body)
+                    if not isinstance(result, dict):
+                        raise ValueError(f"Expected a JSON object, got {type(result).__name__}")
+                    self.requests += 1
+                    self.breaker.record_success()
+                    etag, last_modified = response.headers.get('ETag'), response.headers.get('Last-Modified')
+                    if etag or last_modified:
+                        result['validators'] = {
+                            'etag': etag,
+                            'last_modified': last_modified,
+                            'bytes': len(body),
+                            'ms': round(ms, 3),
+                        }
+                    return result
+                error = f"{response.status} Server Error for url: {response.url}"
+            except (aiohttp.ClientConnectionError, aiohttp.ClientPayloadError, asyncio.TimeoutError) as e:
+                error = str(e) or type(e).__name__
+            except (aiohttp.ClientError, ValueError) as e:
+                # Client errors, including too many redirects, are not retried and do not mean upstream is down.
+                self.requests += 1
+                self.breaker.record_success()
+                return {"error": str(e)}
+
+            self.requests += 1
+            self.failures += 1
+            if attempt < self.retries:
+                await asyncio.sleep(max(0, min(self.backoff_factor * 2 ** attempt, deadline - time.monotonic())))
+
+        self.breaker.record_failure()
+        return {"error": error or "Movie API deadline exceeded."}
+
+    def stats(self):
+        connector = self.session.connector if self.session is not None else None
+        return {
+            'requests': self.requests,
+            'failures': self.failures,
+            'revalidation': {
+                'not_modified': self.not_modified,
+                'bytes_saved': self.bytes_saved,
+                'ms_saved': round(self.ms_saved, 1),
+            },
+            'pool': {
+                'connections_opened': self.connections_opened,
+                'in_flight': self.in_flight,
+                # aiohttp keeps idle keep-alive connections per host in _conns.
+                'idle_connections': sum(map(len, connector._conns.values())) if connector else 0,
+                'max_size': self.pool_size,
+            },
+            'breaker': self.breaker.stats(),
+        }
+
+
+_clients = weakref.WeakKeyDictionary()
+_clients_pid = None
+
+
+def get_async_movie_api_client():
+    """
+    Return the AsyncMovieAPIClient of the running event loop: its
+    connections belong to that loop. A forked worker gets its own.
+    """
+    global _clients, _clients_pid
+    if _clients_pid != os.getpid():
+        _clients = weakref.WeakKeyDictionary()
+        _clients_pid = os.getpid()
+    loop = asyncio.get_running_loop()
+    client = _clients.get(loop)
+    if client is None:
+        client = _clients[loop] = AsyncMovieAPIClient()
+    return client
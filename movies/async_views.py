@@ -0,0 +1,288 @@
+import asyncio
+import weakref
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.core.exceptions import ValidationError
+from django.http import Http404
+from rest_framework import exceptions, status
+from rest_framework.response import Response
+from . import read_serializers
+from .catalog import get_mirrored_page
+from .db_router import ReplicaReadMixin, apin_to_primary, aroute_reads, arouted, read_alias, routing_scope
+from .genre_counts import afavourite_genres
+from .models import Collection
+from .page_cache import aget_movies_page
+from .response_cache import aget_or_build_response
+from .serializers import MovieSerializer
+from .streaming import aiter_json, aiter_ndjson, stream_mode, streaming_response
+from .versioning import abump_collection_version, acollection_version, collection_etag, not_modified, page_etag
+from .views import CollectionViewSet, MovieListView
+
+_writers = weakref.WeakKeyDictionary()
+
+
+def write_slot():
+    """
+    The event loop's semaphore for ASYNC_DB_WRITERS concurrent writes. A
+    write waiting here leaves the CPU to the write holding SQLite's lock,
+    where it would otherwise poll for the lock from a thread.
+    """
+    loop = asyncio.get_running_loop()
+    slot = _writers.get(loop)
+    if slot is None:
+        slot = _writers[loop] = asyncio.Semaphore(settings.ASYNC_DB_WRITERS)
+    return slot
+
+
+class AsyncDispatchMixin:
+    """
+    Await coroutine handlers in a DRF view, for ASGI with ``ASYNC_VIEWS=1``.
+
+    dispatch() is APIView.dispatch() with ReplicaReadMixin's routing scope,
+    run on the event loop: authenticators with an aauthenticate() load the
+    user with the async cache and ORM APIs, other authenticators run in a
+    thread, and the replica pin is read and set with asyncio Redis. DRF's
+    own initial() and finalize_response() then do no I/O, so permission
+    classes must not either. Synchronous handlers run in a thread;
+    exceptions go through handle_exception().
+    """
+
+    @classmethod
+    def as_view(cls, *args, **initkwargs):
+        # ViewSetMixin.as_view() returns a plain function; Django must await it.
+        return markcoroutinefunction(super().as_view(*args, **initkwargs))
+
+    async def dispatch(self, request, *args, **kwargs):
+        with routing_scope():
+            self.args = args
+            self.kwargs = kwargs
+            request = self.initialize_request(request, *args, **kwargs)
+            self.request = request
+            self.headers = self.default_response_headers
+
+            try:
+                await self.ainitial(request, *args, **kwargs)
+
+                if request.method.lower() in self.http_method_names:
+                    handler = getattr(self, request.method.lower(), self.http_method_not_allowed)
+                else:
+                    handler = self.http_method_not_allowed
+
+                if iscoroutinefunction(handler):
+                    response = await handler(request, *args, **kwargs)
+                else:
+                    response = await sync_to_async(handler)(request, *args, **kwargs)
+
+            except Exception as exc:
+                response = self.handle_exception(exc)
+
+            self.response = await self.afinalize_response(request, response, *args, **kwargs)
+            return self.response
+
+    async def ainitial(self, request, *args, **kwargs):
+        await self.aperform_authentication(request)
+        # ReplicaReadMixin.initial() without its synchronous pin lookup.
+        super(ReplicaReadMixin, self).initial(request, *args, **kwargs)
+        if self.reads_from_replica(request):
+            await aroute_reads(request.user.pk)
+
+    async def aperform_authentication(self, request):
+        """
+        Request._authenticate() on the event loop: set request.user from the
+        first authenticator that authenticates the request, awaiting its
+        aauthenticate() or else running its authenticate() in a thread.
+        """
+        for authenticator in request.authenticators:
+            if hasattr(authenticator, 'aauthenticate'):
+                authenticate = authenticator.aauthenticate
+            else:
+                authenticate = sync_to_async(authenticator.authenticate)
+            try:
+                user_auth = await authenticate(request)
+            except exceptions.APIException:
+                # As DRF does, so that the error response is rendered for an anonymous user.
+                request.user, request.auth = AnonymousUser(), None
+                raise
+            if user_auth is not None:
+                request.user, request.auth = user_auth
+                return
+        # Set, so that initial() does not try the authenticators again synchronously.
+        request.user, request.auth = AnonymousUser(), None
+
+    async def afinalize_response(self, request, response, *args, **kwargs):
+        if self.pins_to_primary(request, response):
+            await apin_to_primary(request.user.pk)
+        return super(ReplicaReadMixin, self).finalize_response(request, response, *args, **kwargs)
+
+
+class AsyncMovieListView(AsyncDispatchMixin, MovieListView):
+    """MovieListView with the page cache and upstream fetch awaited on the event loop."""
+
+    async def get(self, request):
+        page = int(request.query_params.get('page', 1))
+
+        result = None
+        if settings.MOVIES_SOURCE == 'mirror':
+            result = await sync_to_async(get_mirrored_page)(page)
+        if result is None:
+            result = await aget_movies_page(page)
+
+        if "error" in result:
+            return Response({"error": "Failed to fetch movies", "details": result["error"]}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+
+        etag = result.get("etag") or page_etag(result)
+        if not_modified(request, etag):
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers={'ETag': etag})
+
+        return Response({"count": result["count"], "page": page, "movies": result["movies"]}, status=status.HTTP_200_OK, headers={'ETag': etag})
+
+
+class AsyncCollectionViewSet(AsyncDispatchMixin, CollectionViewSet):
+    """
+    CollectionViewSet with list, retrieve and destroy on Django's async ORM.
+
+    Streamed responses read their body with aiterator() while it is sent,
+    from the database the request reads from. Create and update run
+    CollectionViewSet's handlers in a thread: their bulk write is one
+    transaction, which the async ORM lacks. Writes take a write_slot().
+    """
+
+    async def list(self, request, *args, **kwargs):
+        version = await acollection_version(request.user.pk)
+        etag = collection_etag(request, version)
+        if not_modified(request, etag):
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers={'ETag': etag})
+
+        mode = stream_mode(request)
+        if mode:
+            return await self.astream_list(mode, etag)
+
+        response_data = await aget_or_build_response('list', request, version, self.alist_data)
+        return Response(response_data, headers={'ETag': etag})
+
+    async def alist_data(self):
+        if read_serializers.enabled():
+            rows = await self.apaginate_queryset(
+                self.get_queryset().prefetch_related(None).values('id', *read_serializers.COLLECTION_FIELDS)
+            )
+            collections = await read_serializers.acollection_dicts(rows, self.include_movies())
+        else:
+            collections = self.get_serializer(await self.apaginate_queryset(self.get_queryset()), many=True).data
+
+        return {
+            'is_success': True,
+            'data': {
+                'collections': collections,
+                'favourite_genres': await afavourite_genres(self.request.user),
+                'next': self.paginator.get_next_link(),
+                'previous': self.paginator.get_previous_link()
+            }
+        }
+
+    async def retrieve(self, request, *args, **kwargs):
+        version = await acollection_version(request.user.pk)
+        etag = collection_etag(request, version)
+        if not_modified(request, etag):
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers={'ETag': etag})
+
+        mode = stream_mode(request)
+        if mode:
+            return await self.astream_retrieve(mode, etag)
+
+        response_data = await aget_or_build_response('retrieve', request, version, self.aretrieve_data)
+        return Response(response_data, status=status.HTTP_200_OK, headers={'ETag': etag})
+
+    async def aretrieve_data(self):
+        collection = await self.aget_object('id', 'title', 'description')
+        movies = self.collection_movies(collection)
+        if read_serializers.enabled():
+            movies = await read_serializers.amovie_dicts(movies)
+        else:
+            movies = MovieSerializer([movie async for movie in movies], many=True).data
+        return {
+            'title': collection.title,
+            'description': collection.description,
+            'movies': movies
+        }
+
+    async def astream_list(self, mode, etag):
+        """stream_list() with the queryset read by aiterator()."""
+        serializer_class = self.get_serializer_class()
+        context = self.get_serializer_context()
+        queryset = self.get_queryset().order_by('id')
+
+        async def collections():
+            async for collection in queryset.aiterator(chunk_size=settings.STREAM_CHUNK_SIZE):
+                yield serializer_class(collection, context=context).data
+
+        if mode == 'ndjson':
+            return streaming_response(arouted(aiter_ndjson(collections()), read_alias()), mode, headers={'ETag': etag})
+
+        response_data = {
+            'is_success': True,
+            'data': {
+                'collections': collections(),
+                'favourite_genres': await afavourite_genres(self.request.user),
+                'next': None,
+                'previous': None,
+            }
+        }
+        return streaming_response(arouted(aiter_json(response_data), read_alias()), mode, headers={'ETag': etag})
+
+    async def astream_retrieve(self, mode, etag):
+        """stream_retrieve() with the movies read by aiterator()."""
+        collection = await self.aget_object('id', 'title', 'description')
+        movies = self.collection_movies(collection).values(*read_serializers.MOVIE_FIELDS)
+        movies = movies.aiterator(chunk_size=settings.STREAM_CHUNK_SIZE)
+
+        summary = {'title': collection.title, 'description': collection.description}
+        if mode == 'ndjson':
+            pieces = aiter_ndjson(movies, first=[summary])
+        else:
+            pieces = aiter_json({**summary, 'movies': movies})
+        return streaming_response(arouted(pieces, read_alias()), mode, headers={'ETag': etag})
+
+    async def apaginate_queryset(self, queryset):
+        if self.paginator is None:
+            return None
+        return await self.paginator.apaginate_queryset(queryset, self.request, view=self)
+
+    async def aget_object(self, *fields):
+        """get_object() with the async ORM, loading only ``fields`` if given."""
+        queryset = self.queryset.filter(user=self.request.user)
+        if fields:
+            queryset = queryset.only(*fields)
+        try:
+            collection = await queryset.aget(**{self.lookup_field: self.kwargs[self.lookup_field]})
+        except Collection.DoesNotExist:
+            raise Http404(f'No {Collection._meta.object_name} matches the given query.')
+        except (TypeError, ValueError, ValidationError):
+            raise Http404
+        self.check_object_permissions(self.request, collection)
+        return collection
+
+    async def create(self, request, *args, **kwargs):
+        async with write_slot():
+            return await sync_to_async(super().create)(request, *args, **kwargs)
+
+    async def update(self, request, *args, **kwargs):
+        async with write_slot():
+            return await sync_to_async(super().update)(request, *args, **kwargs)
+
+    async def partial_update(self, request, *args, **kwargs):
+        kwargs['partial'] = True
+        return await self.update(request, *args, **kwargs)
+
+    async def destroy(self, request, *args, **kwargs):
+        collection = await self.aget_object()
+        collection_uuid = collection.uuid
+        async with write_slot():
+            await collection.adelete()
+        # No transaction to wait for: the delete is committed.
+        await abump_collection_version(collection.user_id)
+        return Response(
+            {'message': f'Collection with UUID {collection_uuid} has been deleted.'},
+            status=status.HTTP_204_NO_CONTENT
+        )
@@ -0,0 +1,149 @@
+from functools import partial
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+from django.utils.translation import gettext_lazy as _
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+from .tiered_cache import get_tier
+
+
+def user_cache_key(user_id):
+    return f"auth_user_{user_id}"
+
+
+def invalidate_user(user_id):
+    get_tier('users').delete(user_cache_key(user_id))
+
+
+# What authentication and permission checks read. Other fields, the password
+# hash above all, are not cached and load from the database when accessed.
+CACHED_USER_FIELDS = ('is_active', 'is_staff', 'is_superuser')
+# With CHECK_REVOKE_TOKEN, the md5 of the password hash that the token's
+# revoke claim is compared with is cached instead of the hash.
+PASSWORD_MD5_KEY = 'password_md5'
+
+
+def user_values(user):
+    names = {user._meta.pk.attname, user.USERNAME_FIELD, *CACHED_USER_FIELDS}
+    values = {
+        field.attname: getattr(user, field.attname)
+        for field in user._meta.concrete_fields if field.attname in names
+    }
+    if api_settings.CHECK_REVOKE_TOKEN:
+        values[PASSWORD_MD5_KEY] = get_md5_hash_password(user.password)
+    return values
+
+
+def user_from_values(model, values):
+    # A fresh instance per request, so views cannot change a shared one.
+    values = dict(values)
+    password_md5 = values.pop(PASSWORD_MD5_KEY, None)
+    user = model.from_db(DEFAULT_DB_ALIAS, list(values), list(values.values()))
+    user.password_md5 = password_md5
+    return user
+
+
+def claims_are_trusted(request, view):
+    return (
+        settings.AUTH_TRUST_TOKEN_CLAIMS
+        and request.method in SAFE_METHODS
+        and getattr(view, 'trust_token_claims', False)
+    )
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """
+    JWTAuthentication that resolves users from the 'users' cache tier (a
+    process-local LRU, then Redis) and only then the database. Entries are
+    invalidated when a user is saved or deleted (see signals.py).
+
+    With ``AUTH_TRUST_TOKEN_CLAIMS`` on, safe requests to views that set
+    ``trust_token_claims = True`` skip the lookup: request.user is an
+    unsaved User carrying only the id from the token, and a deactivated
+    user keeps read access until the token expires.
+    """
+
+    def authenticate(self, request):
+        self.request = request
+        return super().authenticate(request)
+
+    async def aauthenticate(self, request):
+        """
+        authenticate() for async views, with the user loaded by the async
+        cache and ORM APIs.
+        """
+        self.request = request
+        header = self.get_header(request)
+        if header is None:
+            return None
+        raw_token = self.get_raw_token(header)
+        if raw_token is None:
+            return None
+        validated_token = self.get_validated_token(raw_token)
+        return await self.aget_user(validated_token), validated_token
+
+    def trusts_claims(self):
+        request = getattr(self, 'request', None)
+        return request is not None and claims_are_trusted(request, request.parser_context.get('view'))
+
+    def user_id(self, validated_token):
+        try:
+            return validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(_("Token contained no recognizable user identification"))
+
+    def get_user(self, validated_token):
+        user_id = self.user_id(validated_token)
+        if self.trusts_claims():
+            return self.user_model(**{api_settings.USER_ID_FIELD: user_id})
+        return self.check_user(self.load_user(user_id), validated_token)
+
+    async def aget_user(self, validated_token):
+        user_id = self.user_id(validated_token)
+        if self.trusts_claims():
+            return self.user_model(**{api_settings.USER_ID_FIELD: user_id})
+        user = await self.aload_user(user_id)
+        if api_settings.CHECK_REVOKE_TOKEN and user is not None and user.password_md5 is None:
+            # Cached before CHECK_REVOKE_TOKEN was on: check_user() reads the password hash.
+            return await sync_to_async(self.check_user)(user, validated_token)
+        return self.check_user(user, validated_token)
+
+    def check_user(self, user, validated_token):
+        if user is None:
+            raise AuthenticationFailed(_("User not found"), code="user_not_found")
+
+        if not user.is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+
+        if api_settings.CHECK_REVOKE_TOKEN:
+            password_md5 = getattr(user, 'password_md5', None) or get_md5_hash_password(user.password)
+            if validated_token.get(api_settings.REVOKE_TOKEN_CLAIM) != password_md5:
+                raise AuthenticationFailed(_("The user's password has been changed."), code="password_changed")
+
+        return user
+
+    def load_user(self, user_id):
+        users = get_tier('users')
+        values = users.get(user_cache_key(user_id))
+        if values is None:
+            user = self.user_model.objects.filter(**{api_settings.USER_ID_FIELD: user_id}).first()
+            if user is None:
+                return None
+            values = user_values(user)
+            users.set(user_cache_key(user_id), values, settings.AUTH_USER_CACHE_TTL)
+        return user_from_values(self.user_model, values)
+
+    async def aload_user(self, user_id):
+        """load_user() with the async cache and ORM APIs; concurrent misses share one query."""
+        values = await get_tier('users').aget_or_set(
+            user_cache_key(user_id), partial(self.aload_values, user_id), settings.AUTH_USER_CACHE_TTL
+        )
+        return None if values is None else user_from_values(self.user_model, values)
+
+    async def aload_values(self, user_id):
+        user = await self.user_model.objects.filter(**{api_settings.USER_ID_FIELD: user_id}).afirst()
+        return None if user is None else user_values(user)
@@ -0,0 +1,237 @@
+import asyncio
+import itertools
+import json
+import random
+import statistics
+import threading
+import time
+from asgiref.sync import sync_to_async
+from django.core.asgi import get_asgi_application
+from django.core.cache import cache
+from django.test.utils import override_settings
+from django.urls import reverse
+from rest_framework_simplejwt.tokens import RefreshToken
+from movies.async_service import get_async_movie_api_client
+from movies.tiered_cache import clear_local_tiers, get_async_redis
+from . import factories
+from .async_fake_upstream import AsyncFakeMovieAPI
+from .runner import percentile
+
+# The URL configuration of each mode: DRF's synchronous views, or the async views of ASYNC_VIEWS=1.
+MODES = {'sync': 'movielist.urls', 'async': 'movielist.async_urls'}
+
+ENDPOINTS = (
+    'movies', 'collection-list', 'collection-detail', 'collection-create', 'collection-update', 'collection-delete',
+)
+
+
+async def asgi_request(application, method, path, headers=None, data=None):
+    """
+    Send one request to an ASGI application the way an ASGI server does,
+    and return the response status and body.
+    """
+    path, _, query = path.partition('?')
+    headers = {'Host': 'testserver', **(headers or {})}
+    body = b''
+    if data is not None:
+        body = json.dumps(data).encode()
+        headers['Content-Type'] = 'application/json'
+        headers['Content-Length'] = str(len(body))
+    scope = {
+        'type': 'http',
+        'asgi': {'version': '3.0'},
+        'http_version': '1.1',
+        'method': method,
+        'scheme': 'http',
+        'path': path,
+        'raw_path': path.encode(),
+        'query_string': query.encode(),
+        'root_path': '',
+        'headers': [(name.lower().encode(), value.encode()) for name, value in headers.items()],
+        'client': ('127.0.0.1', 0),
+        'server': ('testserver', 80),
+    }
+    request = {'type': 'http.request', 'body': body, 'more_body': False}
+    finished = asyncio.Event()
+    status, chunks = None, []
+
+    async def receive():
+        nonlocal request
+        if request is not None:
+            message, request = request, None
+            return message
+        # Django listens for a disconnect while the view runs.
+        await finished.wait()
+        return {'type': 'http.disconnect'}
+
+    async def send(message):
+        nonlocal status
+        if message['type'] == 'http.response.start':
+            status = message['status']
+        elif message['type'] == 'http.response.body':
+            chunks.append(message.get('body', b''))
+            if not message.get('more_body', False):
+                finished.set()
+
+    try:
+        await application(scope, receive, send)
+    finally:
+        finished.set()
+    return status, b''.join(chunks)
+
+
+class ASGIRun:
+    """
+    Send ``requests`` requests built by ``make_call(i)`` (method, path and
+    JSON data) to an ASGI application, ``concurrency`` at a time, from one
+    event loop, and time them. ``threads_max`` is the most threads the
+    process had meanwhile: sync views each hold one while they run.
+    """
+
+    def __init__(self, application, make_call, requests, concurrency, token=None, on_response=None):
+        self.application = application
+        self.make_call = make_call
+        self.requests = requests
+        self.concurrency = concurrency
+        self.headers = {'Authorization': f'Bearer {token}'} if token else {}
+        self.on_response = on_response
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def call(self, i, slots):
+        async with slots:
+            method, path, data = self.make_call(i)
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+            started = time.perf_counter()
+            try:
+                status, body = await asgi_request(self.application, method, path, self.headers, data)
+            finally:
+                self.in_flight -= 1
+            elapsed = (time.perf_counter() - started) * 1000
+        if self.on_response and status < 400:
+            self.on_response(body)
+        return elapsed, status
+
+    async def run(self):
+        slots = asyncio.Semaphore(self.concurrency)
+        threads = [threading.active_count()]
+        running = True
+
+        async def sample_threads():
+            while running:
+                threads.append(threading.active_count())
+                await asyncio.sleep(0.005)
+
+        sampler = asyncio.create_task(sample_threads())
+        started = time.perf_counter()
+        try:
+            results = await asyncio.gather(*(self.call(i, slots) for i in range(self.requests)))
+        finally:
+            running = False
+            await sampler
+        wall = time.perf_counter() - started
+
+        latencies = [latency for latency, _ in results]
+        return {
+            'requests': len(results),
+            'errors': sum(1 for _, status in results if status >= 400),
+            'rps': round(len(results) / wall, 1),
+            'p50_ms': round(percentile(latencies, 50), 2),
+            'p99_ms': round(percentile(latencies, 99), 2),
+            'mean_ms': round(statistics.fmean(latencies), 2),
+            'max_in_flight': self.max_in_flight,
+            'threads_max': max(threads),
+        }
+
+
+async def run_mode(application, user, collection_uuids, movie_payload, requests, concurrency, movie_pages, counter):
+    token = str(RefreshToken.for_user(user).access_token)
+    rng = random.Random(len(collection_uuids))
+    created = []
+
+    def movies_page(i):
+        return 'GET', f"{reverse('movie-list')}?page={rng.randint(1, movie_pages)}", None
+
+    def collection_list(i):
+        return 'GET', reverse('collection-list'), None
+
+    def collection_detail(i):
+        return 'GET', reverse('collection-detail', args=[rng.choice(collection_uuids)]), None
+
+    def collection_create(i):
+        return 'POST', reverse('collection-list'), {
+            'title': f'Bench collection {next(counter)}', 'description': 'Benchmark', 'movies': movie_payload[:5],
+        }
+
+    def collection_update(i):
+        return 'PATCH', reverse('collection-detail', args=[rng.choice(collection_uuids)]), {
+            'movies': rng.sample(movie_payload, 5),
+        }
+
+    def collection_delete(i):
+        return 'DELETE', reverse('collection-detail', args=[created.pop()]), None
+
+    calls = {
+        'movies': (movies_page, None),
+        'collection-list': (collection_list, None),
+        'collection-detail': (collection_detail, None),
+        'collection-create': (collection_create, lambda body: created.append(json.loads(body)['collection_uuid'])),
+        'collection-update': (collection_update, None),
+        'collection-delete': (collection_delete, None),
+    }
+    results = {}
+    for endpoint in ENDPOINTS:
+        make_call, on_response = calls[endpoint]
+        count = min(requests, len(created)) if endpoint == 'collection-delete' else requests
+        if count:
+            run = ASGIRun(application, make_call, count, concurrency, token, on_response)
+            results[endpoint] = await run.run()
+    return results
+
+
+def run_asgi_benchmark(collection_count=100, requests=200, concurrency=50, seed=0, catalog_pages=20, upstream_latency=0.05):
+    """
+    Benchmark the movie and collection endpoints through Django's ASGI
+    application, once with the synchronous views and once with the async
+    views, each for its own user owning ``collection_count`` collections.
+    As with run_benchmark(), the caller provides a disposable database.
+    """
+    factories.seed(seed)
+    movies = factories.create_movies(200)
+    users = {mode: factories.create_user_with_collections(collection_count, movies) for mode in MODES}
+    movie_payload = [
+        {"uuid": movie.uuid, "title": movie.title, "description": movie.description, "genres": movie.genres}
+        for movie in movies[:20]
+    ]
+    application = get_asgi_application()
+    counter = itertools.count()
+
+    async def run_modes():
+        modes = {}
+        async with AsyncFakeMovieAPI(latency=upstream_latency) as upstream:
+            with override_settings(EXTERNAL_MOVIES_API_URL=upstream.url):
+                for mode, urlconf in MODES.items():
+                    # Each mode starts with an empty page cache.
+                    await sync_to_async(cache.delete_pattern)('movies_list_page_*')
+                    clear_local_tiers()
+                    with override_settings(ROOT_URLCONF=urlconf):
+                        user, collection_uuids = users[mode]
+                        modes[mode] = await run_mode(
+                            application, user, collection_uuids, movie_payload, requests, concurrency,
+                            catalog_pages, counter,
+                        )
+        await get_async_redis().aclose()
+        await get_async_movie_api_client().aclose()
+        return modes
+
+    return {
+        'meta': {
+            'seed': seed,
+            'requests': requests,
+            'concurrency': concurrency,
+            'collections': collection_count,
+            'upstream_latency': upstream_latency,
+        },
+        'modes': asyncio.run(run_modes()),
+    }
@@ -0,0 +1,88 @@
+import asyncio
+import json
+import time
+from http import HTTPStatus
+from .fake_upstream import catalog_response
+
+
+class AsyncFakeMovieAPI:
+    """
+    asyncio stand-in for the external movie API with the catalog of
+    FakeMovieAPI. Latency is an ``asyncio.sleep()``, so hundreds of requests
+    can be in flight at once; ``max_in_flight`` records how many were.
+    ``statuses`` are answered, in order, before any page. Use as an async
+    context manager::
+
+        async with AsyncFakeMovieAPI(latency=0.1) as upstream:
+            settings.EXTERNAL_MOVIES_API_URL = upstream.url
+    """
+
+    def __init__(self, catalog_size=1000, page_size=10, latency=0.0, statuses=(), validators=True):
+        self.catalog_size = catalog_size
+        self.page_size = page_size
+        self.latency = latency
+        self.statuses = list(statuses)
+        self.validators = validators
+        self.revision = 0
+        self.modified = int(time.time()) - 1
+        self.requests = 0
+        self.connections = 0
+        self.not_modified = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.server = None
+        self._writers = set()
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server.sockets[0].getsockname()[1]}/movies/"
+
+    def count_not_modified(self):
+        self.not_modified += 1
+
+    async def handle(self, reader, writer):
+        self.connections += 1
+        self._writers.add(writer)
+        try:
+            while request_line := await reader.readline():
+                headers = {}
+                while (line := await reader.readline()) not in (b'\r\n', b'\n', b''):
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().title()] = value.strip()
+
+                status, body, response_headers = await self.respond(request_line.split()[1].decode(), headers)
+                head = f"HTTP/1.1 {status} {HTTPStatus(status).phrase}\r\n"
+                if body is not None:
+                    response_headers = {**response_headers, "Content-Type": "application/json", "Content-Length": len(body)}
+                head += ''.join(f"{name}: {value}\r\n" for name, value in response_headers.items())
+                writer.write(head.encode() + b'\r\n' + (body or b''))
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            self._writers.discard(writer)
+            writer.close()
+
+    async def respond(self, path, headers):
+        self.requests += 1
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            if self.latency:
+                await asyncio.sleep(self.latency)
+            if self.statuses:
+                return self.statuses.pop(0), json.dumps({"detail": "Scripted status."}).encode(), {}
+            return catalog_response(self, path, headers)
+        finally:
+            self.in_flight -= 1
+
+    async def __aenter__(self):
+        self.server = await asyncio.start_server(self.handle, '127.0.0.1', 0)
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self.server.close()
+        # Close idle keep-alive connections too, which wait_closed() waits for.
+        for writer in list(self._writers):
+            writer.close()
+        await self.server.wait_closed()
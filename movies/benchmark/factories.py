@@ -0,0 +1,82 @@
+import functools
+import factory
+import factory.random
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from factory.django import DjangoModelFactory
+from movies.bulk import link_genres
+from movies.genre_counts import rebuild_genre_counts
+from movies.models import Collection, Movie
+from .fake_upstream import GENRES
+
+PASSWORD = 'BenchPassword1!'
+
+
+@functools.cache
+def hashed_password():
+    # Hashing is deliberately slow; every benchmark user shares one hash.
+    return make_password(PASSWORD)
+
+
+class UserFactory(DjangoModelFactory):
+    class Meta:
+        model = User
+
+    username = factory.Sequence(lambda n: f'bench_user_{n}')
+    password = factory.LazyFunction(hashed_password)
+
+
+class MovieFactory(DjangoModelFactory):
+    class Meta:
+        model = Movie
+
+    uuid = factory.Faker('uuid4')
+    title = factory.Faker('sentence', nb_words=3)
+    description = factory.Faker('paragraph', nb_sentences=4)
+    genres = factory.LazyFunction(
+        lambda: ','.join(factory.random.randgen.sample(GENRES, factory.random.randgen.randint(1, 3)))
+    )
+
+
+class CollectionFactory(DjangoModelFactory):
+    class Meta:
+        model = Collection
+
+    user = factory.SubFactory(UserFactory)
+    title = factory.Sequence(lambda n: f'Collection {n}')
+    description = factory.Faker('sentence')
+
+
+def seed(seed_value):
+    factory.random.reseed_random(seed_value)
+
+
+def create_movies(count):
+    movies = Movie.objects.bulk_create(MovieFactory.build_batch(count), batch_size=1000)
+    movies = list(Movie.objects.filter(uuid__in=[movie.uuid for movie in movies]))
+    link_genres({movie.pk: movie.genres for movie in movies})
+    return movies
+
+
+def create_user_with_collections(collection_count, movies, movies_per_collection=5):
+    """
+    Create a user owning ``collection_count`` collections, each holding
+    ``movies_per_collection`` movies drawn from ``movies``, with bulk
+    inserts so that 10,000 collections take seconds, not minutes.
+    """
+    user = UserFactory()
+    Collection.objects.bulk_create(CollectionFactory.build_batch(collection_count, user=user), batch_size=1000)
+    collections = Collection.objects.filter(user=user).only('id', 'uuid')
+
+    rng = factory.random.randgen
+    through = Collection.movies.through
+    through.objects.bulk_create(
+        [
+            through(collection_id=collection.pk, movie_id=movie.pk)
+            for collection in collections
+            for movie in rng.sample(movies, min(movies_per_collection, len(movies)))
+        ],
+        batch_size=1000,
+    )
+    rebuild_genre_counts([user.pk])
+    return user, [collection.uuid for collection in collections]
@@ -0,0 +1,176 @@
+import hashlib
+import json
+import random
+import threading
+import time
+from email.utils import formatdate, parsedate_to_datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+GENRES = ('Action', 'Adventure', 'Comedy', 'Crime', 'Drama', 'Fantasy', 'Horror', 'Romance', 'Sci-Fi', 'Thriller')
+
+
+def fake_movie(index, revision=0):
+    return {
+        "uuid": f"fake-{index}",
+        "title": f"Fake Movie {index}" + (f" (revision {revision})" if revision else ""),
+        "description": f"Description of fake movie {index}.",
+        "genres": ",".join(GENRES[(index + offset) % len(GENRES)] for offset in (0, 3)),
+    }
+
+
+def is_not_modified(etag, modified, if_none_match, if_modified_since):
+    # If-None-Match takes precedence over If-Modified-Since (RFC 9110).
+    if if_none_match is not None:
+        return etag in [tag.strip() for tag in if_none_match.split(",")]
+    try:
+        since = parsedate_to_datetime(if_modified_since or "")
+    except (TypeError, ValueError):
+        return False
+    return int(modified) <= since.timestamp()
+
+
+def catalog_response(catalog, path, request_headers):
+    """
+    ``(status, body, headers)`` answering a GET for ``path`` from the
+    catalog of a FakeMovieAPI or AsyncFakeMovieAPI; a 304 has no body.
+    """
+    try:
+        page = int(parse_qs(urlparse(path).query).get('page', ['1'])[0])
+    except ValueError:
+        page = 0
+    start = (page - 1) * catalog.page_size
+    if page < 1 or (start >= catalog.catalog_size and page != 1):
+        return 404, json.dumps({"detail": "Invalid page."}).encode(), {}
+
+    revision = catalog.revision
+    results = [
+        fake_movie(index, revision) for index in range(start, min(start + catalog.page_size, catalog.catalog_size))
+    ]
+    body = json.dumps({"count": catalog.catalog_size, "results": results}).encode()
+    if not catalog.validators:
+        return 200, body, {}
+
+    headers = {
+        "ETag": f'"{hashlib.md5(body, usedforsecurity=False).hexdigest()}"',
+        "Last-Modified": formatdate(catalog.modified, usegmt=True),
+    }
+    if is_not_modified(
+        headers["ETag"], catalog.modified, request_headers.get("If-None-Match"), request_headers.get("If-Modified-Since")
+    ):
+        catalog.count_not_modified()
+        return 304, None, headers
+    return 200, body, headers
+
+
+class FakeMovieAPIHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        server = self.server
+        server.count_request()
+        if server.latency:
+            time.sleep(max(0, server.rng_gauss(server.latency, server.latency * server.jitter)))
+
+        if server.rng_random() < server.error_rate:
+            self.send_json(500, {"detail": "Injected failure."})
+            return
+
+        status, body, headers = catalog_response(server, self.path, self.headers)
+        if body is None:
+            self.send_response(status)
+            for name, value in headers.items():
+                self.send_header(name, value)
+            self.end_headers()
+            return
+        self.send_body(status, body, headers)
+
+    def send_json(self, status, payload, headers=None):
+        self.send_body(status, json.dumps(payload).encode(), headers)
+
+    def send_body(self, status, body, headers=None):
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class FakeMovieAPI(ThreadingHTTPServer):
+    """
+    Local stand-in for the external movie API, with a deterministic catalog
+    and configurable latency (seconds, gaussian with ``jitter`` as relative
+    deviation) and error rate. Use as a context manager::
+
+        with FakeMovieAPI(latency=0.05, error_rate=0.01) as upstream:
+            settings.EXTERNAL_MOVIES_API_URL = upstream.url
+
+    Pages carry ETag and Last-Modified validators, and conditional requests
+    for an unchanged page get 304 Not Modified, unless ``validators`` is
+    False. ``change()`` edits every movie of the catalog.
+    """
+    daemon_threads = True
+    handler_class = FakeMovieAPIHandler
+
+    def __init__(self, catalog_size=1000, page_size=10, latency=0.0, jitter=0.2, error_rate=0.0, seed=0,
+                 validators=True):
+        super().__init__(('127.0.0.1', 0), self.handler_class)
+        self.catalog_size = catalog_size
+        self.page_size = page_size
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.validators = validators
+        self.revision = 0
+        # Last-Modified has a resolution of one second.
+        self.modified = int(time.time()) - 1
+        self.requests = 0
+        self.not_modified = 0
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._thread = None
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}/movies/"
+
+    def count_request(self):
+        with self._lock:
+            self.requests += 1
+
+    def count_not_modified(self):
+        with self._lock:
+            self.not_modified += 1
+
+    def change(self):
+        with self._lock:
+            self.revision += 1
+            self.modified = max(int(time.time()), self.modified + 1)
+
+    def rng_random(self):
+        with self._lock:
+            return self._rng.random()
+
+    def rng_gauss(self, mu, sigma):
+        with self._lock:
+            return self._rng.gauss(mu, sigma)
+
+    def start(self):
+        self._thread = threading.Thread(target=self.serve_forever, name='fake-movie-api', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
@@ -0,0 +1,68 @@
+import pickle
+import statistics
+import time
+from movies.page_codec import PageCodec
+from movies.read_serializers import MOVIE_FIELDS
+from movies.serializers import MovieSerializer
+from movies.versioning import page_etag
+from .factories import MovieFactory, seed
+
+
+def build_pages(pages, page_size):
+    """Cache entries as MovieListView stores them, of factory-made movies."""
+    entries = []
+    for _ in range(pages):
+        movies = [{field: getattr(movie, field) for field in MOVIE_FIELDS} for movie in MovieFactory.build_batch(page_size)]
+        entry = {"count": pages * page_size, "movies": MovieSerializer(movies, many=True).data}
+        entries.append(dict(entry, fresh_until=time.time(), etag=page_etag(entry)))
+    return entries
+
+
+def pickle_format():
+    # What django_redis stores without a codec: the entry, pickled.
+    return (lambda entry: pickle.dumps(entry, pickle.HIGHEST_PROTOCOL)), pickle.loads
+
+
+def compact_format():
+    # PageCodec output, which django_redis then pickles as bytes.
+    codec = PageCodec()
+    return (
+        lambda entry: pickle.dumps(codec.encode(entry), pickle.HIGHEST_PROTOCOL),
+        lambda blob: codec.decode(pickle.loads(blob)),
+    )
+
+
+FORMATS = {'pickle': pickle_format, 'compact': compact_format}
+
+
+def measure(encode, decode, entries, rounds):
+    sizes, encode_us, decode_us = [], [], []
+    for entry in entries:
+        for _ in range(rounds):
+            started = time.perf_counter()
+            blob = encode(entry)
+            encoded = time.perf_counter()
+            decode(blob)
+            encode_us.append((encoded - started) * 1e6)
+            decode_us.append((time.perf_counter() - encoded) * 1e6)
+        sizes.append(len(blob))
+    return {
+        'bytes_per_page': round(statistics.mean(sizes)),
+        'encode_us': round(statistics.median(encode_us), 1),
+        'decode_us': round(statistics.median(decode_us), 1),
+    }
+
+
+def run_codec_benchmark(pages=20, page_size=10, rounds=20, seed_value=0):
+    """
+    Bytes per cached /movies/ page and median encode/decode time of each
+    format, on the same pages; the ratios compare compact to pickle.
+    """
+    seed(seed_value)
+    entries = build_pages(pages, page_size)
+    results = {name: measure(*make_format(), entries, rounds) for name, make_format in FORMATS.items()}
+    results['ratio'] = {
+        metric: round(results['compact'][metric] / results['pickle'][metric], 3)
+        for metric in results['pickle']
+    }
+    return results
@@ -0,0 +1,274 @@
+import itertools
+import json
+import logging
+import os
+import random
+import statistics
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from urllib.parse import urlsplit
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, connections
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+from movies.counters import REQUEST_COUNT_KEY, get_redis, get_request_counter
+from . import factories
+
+ENDPOINTS = (
+    'register', 'login', 'movies',
+    'collection-list', 'collection-detail', 'collection-create', 'collection-update', 'collection-delete',
+)
+
+
+@contextmanager
+def benchmark_environment(use_current_db=False, **overrides):
+    """
+    Run the block against a throwaway database (or the configured one with
+    ``use_current_db``) and BENCHMARK_REDIS_DB with its own cache key
+    prefix, with ``overrides`` applied to the settings. The request count
+    and metrics the middleware records meanwhile are dropped afterwards,
+    and the connection options and log levels changed here are restored.
+    """
+    old_options = dict(connection.settings_dict['OPTIONS'])
+    old_test_name = connection.settings_dict['TEST'].get('NAME')
+    loggers = [logging.getLogger(name) for name in ('django.request', 'movies.requests')]
+    old_levels = [logger.level for logger in loggers]
+    if connection.vendor == 'sqlite':
+        # Concurrent writers otherwise fail to upgrade their read locks instead of waiting.
+        connection.settings_dict['OPTIONS'].update(transaction_mode='IMMEDIATE', timeout=30)
+        connection.close()
+
+    old_name = None
+    if not use_current_db:
+        # A file database: SQLite's shared in-memory database does not wait on locks.
+        fd, path = tempfile.mkstemp(prefix='benchmark-', suffix='.sqlite3')
+        os.close(fd)
+        connection.settings_dict['TEST']['NAME'] = path
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+
+    try:
+        location = urlsplit(settings.CACHES['default']['LOCATION'])
+        caches = {'default': {
+            **settings.CACHES['default'],
+            'LOCATION': location._replace(path=f'/{settings.BENCHMARK_REDIS_DB}').geturl(),
+            'KEY_PREFIX': f'benchmark-{os.getpid()}',
+        }}
+        # Buffered request counts so far belong to the configured database.
+        get_request_counter().flush()
+        with override_settings(CACHES=caches, ALLOWED_HOSTS=['testserver'], **overrides):
+            # Expected 4xx/5xx (e.g. injected upstream failures) and every request are counted, not logged.
+            for logger in loggers:
+                logger.setLevel(logging.CRITICAL)
+            try:
+                yield
+            finally:
+                get_request_counter().flush()
+                cache.delete_pattern('*')
+                redis = get_redis()
+                redis.delete(REQUEST_COUNT_KEY, *redis.scan_iter('metrics:*'))
+    finally:
+        if old_name is not None:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            connection.settings_dict['TEST']['NAME'] = old_test_name
+        for logger, level in zip(loggers, old_levels):
+            logger.setLevel(level)
+        if connection.settings_dict['OPTIONS'] != old_options:
+            connection.settings_dict['OPTIONS'] = old_options
+            connection.close()
+
+
+def percentile(samples, q):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(q / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+class EndpointRun:
+    """
+    Drive ``requests`` calls of ``make_call(i, client)`` over ``concurrency``
+    threads, each with its own APIClient, and time them.
+    """
+
+    def __init__(self, make_call, requests, concurrency, authenticate=None):
+        self.make_call = make_call
+        self.requests = requests
+        self.concurrency = concurrency
+        self.authenticate = authenticate
+        self._local = threading.local()
+
+    def client(self):
+        client = getattr(self._local, 'client', None)
+        if client is None:
+            client = self._local.client = APIClient(raise_request_exception=False)
+            if self.authenticate:
+                client.credentials(HTTP_AUTHORIZATION=f'Bearer {self.authenticate}')
+        return client
+
+    def call(self, i):
+        client = self.client()
+        with CaptureQueriesContext(connection) as queries:
+            started = time.perf_counter()
+            response = self.make_call(i, client)
+            elapsed = (time.perf_counter() - started) * 1000
+        return elapsed, response.status_code, len(queries.captured_queries)
+
+    def run(self):
+        def worker(i):
+            try:
+                return self.call(i)
+            finally:
+                # Threads outlive the run; do not leak their connections.
+                connections.close_all()
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            results = list(executor.map(worker, range(self.requests)))
+        wall = time.perf_counter() - started
+
+        latencies = [latency for latency, _, _ in results]
+        queries = [count for _, _, count in results]
+        return {
+            'requests': len(results),
+            'errors': sum(1 for _, status, _ in results if status >= 400),
+            'rps': round(len(results) / wall, 1),
+            'p50_ms': round(percentile(latencies, 50), 2),
+            'p99_ms': round(percentile(latencies, 99), 2),
+            'mean_ms': round(statistics.fmean(latencies), 2),
+            'queries_mean': round(statistics.fmean(queries), 1),
+            'queries_max': max(queries),
+        }
+
+
+def run_scenario(collection_count, movies, requests, concurrency, movie_pages, counter):
+    """
+    Benchmark every endpoint for one user owning ``collection_count``
+    collections. ``counter`` hands out unique suffixes across scenarios.
+    """
+    user, collection_uuids = factories.create_user_with_collections(collection_count, movies)
+    token = str(RefreshToken.for_user(user).access_token)
+    rng = random.Random(collection_count)
+    movie_payload = [
+        {"uuid": movie.uuid, "title": movie.title, "description": movie.description, "genres": movie.genres}
+        for movie in movies[:20]
+    ]
+    created = []
+    created_lock = threading.Lock()
+
+    def register(i, client):
+        return client.post(reverse('register'), {
+            'username': f'bench_register_{next(counter)}', 'password': factories.PASSWORD,
+        }, format='json')
+
+    def login(i, client):
+        return client.post(reverse('login'), {'username': user.username, 'password': factories.PASSWORD}, format='json')
+
+    def movies_page(i, client):
+        return client.get(reverse('movie-list'), {'page': rng.randint(1, movie_pages)})
+
+    def collection_list(i, client):
+        return client.get(reverse('collection-list'))
+
+    def collection_detail(i, client):
+        return client.get(reverse('collection-detail', args=[rng.choice(collection_uuids)]))
+
+    def collection_create(i, client):
+        response = client.post(reverse('collection-list'), {
+            'title': f'Bench collection {next(counter)}', 'description': 'Benchmark', 'movies': movie_payload[:5],
+        }, format='json')
+        if response.status_code == 201:
+            with created_lock:
+                created.append(response.data['collection_uuid'])
+        return response
+
+    def collection_update(i, client):
+        return client.patch(reverse('collection-detail', args=[rng.choice(collection_uuids)]), {
+            'movies': rng.sample(movie_payload, 5),
+        }, format='json')
+
+    def collection_delete(i, client):
+        with created_lock:
+            collection_uuid = created.pop()
+        return client.delete(reverse('collection-detail', args=[collection_uuid]))
+
+    calls = {
+        'register': (register, None),
+        'login': (login, None),
+        'movies': (movies_page, token),
+        'collection-list': (collection_list, token),
+        'collection-detail': (collection_detail, token),
+        'collection-create': (collection_create, token),
+        'collection-update': (collection_update, token),
+        'collection-delete': (collection_delete, token),
+    }
+    results = {}
+    for endpoint in ENDPOINTS:
+        make_call, auth = calls[endpoint]
+        count = min(requests, len(created)) if endpoint == 'collection-delete' else requests
+        if count:
+            results[endpoint] = EndpointRun(make_call, count, concurrency, auth).run()
+    return results
+
+
+def run_benchmark(collection_counts, requests=50, concurrency=4, seed=0, catalog_pages=20):
+    """
+    Seed the database deterministically and benchmark each endpoint for
+    users owning each of ``collection_counts`` collections. The caller is
+    responsible for pointing the app at a disposable database and at an
+    upstream stand-in.
+    """
+    factories.seed(seed)
+    movies = factories.create_movies(200)
+    counter = itertools.count()
+
+    scenarios = {}
+    for collection_count in collection_counts:
+        scenarios[str(collection_count)] = run_scenario(
+            collection_count, movies, requests, concurrency, catalog_pages, counter
+        )
+
+    return {
+        'meta': {
+            'seed': seed,
+            'requests': requests,
+            'concurrency': concurrency,
+            'collection_counts': list(collection_counts),
+        },
+        'scenarios': scenarios,
+    }
+
+
+def compare(current, baseline, threshold=0.2):
+    """
+    Return the regressions of ``current`` against ``baseline``: p99 latency
+    or throughput worse by more than ``threshold``, or more SQL queries.
+    """
+    regressions = []
+    for scenario, endpoints in current['scenarios'].items():
+        for endpoint, stats in endpoints.items():
+            old = baseline.get('scenarios', {}).get(scenario, {}).get(endpoint)
+            if old is None:
+                continue
+            name = f'{scenario} collections / {endpoint}'
+            if stats['p99_ms'] > old['p99_ms'] * (1 + threshold):
+                regressions.append(f"{name}: p99 {old['p99_ms']}ms -> {stats['p99_ms']}ms")
+            if stats['rps'] < old['rps'] * (1 - threshold):
+                regressions.append(f"{name}: {old['rps']} -> {stats['rps']} req/s")
+            if stats['queries_max'] > old['queries_max']:
+                regressions.append(f"{name}: {old['queries_max']} -> {stats['queries_max']} queries")
+    return regressions
+
+
+def load(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+def save(results, path):
+    with open(path, 'w') as f:
+        json.dump(results, f, indent=2, sort_keys=True)
@@ -0,0 +1,124 @@
+from django.db import transaction
+from django.db.models.signals import m2m_changed
+from .models import Collection, Genre, Movie
+from .genre_counts import split_genres
+
+MOVIE_FIELDS = ('title', 'description', 'genres')
+
+
+def _unique_by_uuid(movies_data):
+    unique = {}
+    for movie_data in movies_data:
+        unique.setdefault(movie_data['uuid'], movie_data)
+    return unique
+
+
+def upsert_movies(movies_data):
+    """
+    Insert the movies whose uuid is not stored yet and return a mapping of
+    uuid -> (id, title) for every movie in ``movies_data``.
+
+    Existing rows are left untouched, like ``get_or_create`` did, and a
+    concurrent insert of the same uuid is absorbed by ``ignore_conflicts``.
+    """
+    unique = _unique_by_uuid(movies_data)
+    if not unique:
+        return {}
+
+    movies = {
+        uuid: (pk, title)
+        for pk, uuid, title in Movie.objects.filter(uuid__in=unique).values_list('id', 'uuid', 'title')
+    }
+
+    missing = [uuid for uuid in unique if uuid not in movies]
+    if missing:
+        Movie.objects.bulk_create(
+            [Movie(uuid=uuid, **{field: unique[uuid][field] for field in MOVIE_FIELDS}) for uuid in missing],
+            ignore_conflicts=True,
+        )
+        created = Movie.objects.filter(uuid__in=missing).values_list('id', 'uuid', 'title', 'genres')
+        movie_genres = {}
+        for pk, uuid, title, genres in created:
+            movies[uuid] = (pk, title)
+            movie_genres[pk] = genres
+        link_genres(movie_genres)
+
+    return movies
+
+
+def link_genres(movie_genres, replace=False):
+    """
+    Link movies to their normalised ``Genre`` rows, creating the missing
+    genres. ``movie_genres`` maps movie id -> comma-separated genres string.
+    With ``replace`` the movies' current genre links are dropped first.
+    """
+    through = Movie.genre_list.through
+    if replace and movie_genres:
+        through.objects.filter(movie_id__in=movie_genres).delete()
+
+    movie_genres = {pk: set(split_genres(genres)) for pk, genres in movie_genres.items()}
+    names = set().union(*movie_genres.values())
+    if not names:
+        return
+
+    Genre.objects.bulk_create([Genre(name=name) for name in names], ignore_conflicts=True)
+    genre_ids = dict(Genre.objects.filter(name__in=names).values_list('name', 'id'))
+
+    through.objects.bulk_create(
+        [
+            through(movie_id=pk, genre_id=genre_ids[name])
+            for pk, genres in movie_genres.items()
+            for name in genres
+        ],
+        ignore_conflicts=True,
+    )
+
+
+def link_movies(collection, movies_data, replace=False):
+    """
+    Add the movies in ``movies_data`` to ``collection`` using a fixed number
+    of queries and return a ``(title, added)`` pair per entry, in request
+    order. ``added`` is False when the movie was already in the collection.
+
+    With ``replace`` the current links are cleared first, as a PUT does.
+    """
+    through = Collection.movies.through
+
+    with transaction.atomic():
+        movies = upsert_movies(movies_data)
+
+        if replace:
+            collection.movies.clear()
+            linked = set()
+        else:
+            linked = set(through.objects.filter(collection=collection).values_list('movie_id', flat=True))
+
+        results = []
+        to_link = []
+
+        for movie_data in movies_data:
+            movie_id, title = movies[movie_data['uuid']]
+            if movie_id in linked:
+                results.append((title, False))
+            else:
+                linked.add(movie_id)
+                to_link.append(movie_id)
+                results.append((title, True))
+
+        if to_link:
+            signal_kwargs = {
+                'sender': through,
+                'instance': collection,
+                'reverse': False,
+                'model': Movie,
+                'pk_set': set(to_link),
+                'using': through.objects.db,
+            }
+            m2m_changed.send(action='pre_add', **signal_kwargs)
+            through.objects.bulk_create(
+                [through(collection_id=collection.pk, movie_id=movie_id) for movie_id in to_link],
+                ignore_conflicts=True,
+            )
+            m2m_changed.send(action='post_add', **signal_kwargs)
+
+    return results
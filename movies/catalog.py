@@ -0,0 +1,149 @@
+import math
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from .bulk import link_genres
+from .genre_counts import apply_links
+from .models import CatalogSyncState, Collection, Movie
+from .service import get_movie_api_client
+from .versioning import invalidate_movie_collections
+
+MOVIE_FIELDS = ('title', 'description', 'genres')
+
+
+def upsert_catalog_page(page, page_size, results):
+    """
+    Upsert one upstream page into the Movie table in a fixed number of
+    queries and give each movie its position in the upstream order.
+
+    Changed movies keep the genre counters, genre links and cached
+    collection responses of their users in step.
+    """
+    start = (page - 1) * page_size
+    rows = {}
+    for offset, movie in enumerate(results):
+        rows.setdefault(movie['uuid'], (start + offset, tuple(str(movie.get(field) or '') for field in MOVIE_FIELDS)))
+
+    existing = {
+        uuid: (pk, position, fields)
+        for pk, uuid, position, *fields in Movie.objects.filter(uuid__in=rows).values_list(
+            'id', 'uuid', 'upstream_position', *MOVIE_FIELDS
+        )
+    }
+    changed = {uuid for uuid, (pk, position, fields) in existing.items() if tuple(fields) != rows[uuid][1]}
+    changed_ids = [existing[uuid][0] for uuid in changed]
+    regenred = [uuid for uuid in changed if existing[uuid][2][2] != rows[uuid][1][2]]
+    regenred_links = Collection.movies.through.objects.filter(movie__uuid__in=regenred)
+
+    if regenred:
+        apply_links(regenred_links, sign=-1)
+
+    Movie.objects.filter(
+        upstream_position__gte=start, upstream_position__lt=start + page_size
+    ).exclude(uuid__in=rows).update(upstream_position=None)
+
+    # Only new and changed movies are upserted: SQLite fires the search
+    # index's UPDATE OF trigger whenever an indexed column is assigned, even
+    # to its current value.
+    upserts = [uuid for uuid in rows if uuid not in existing or uuid in changed]
+    if upserts:
+        Movie.objects.bulk_create(
+            [
+                Movie(uuid=uuid, upstream_position=rows[uuid][0], **dict(zip(MOVIE_FIELDS, rows[uuid][1])))
+                for uuid in upserts
+            ],
+            update_conflicts=True,
+            unique_fields=['uuid'],
+            update_fields=[*MOVIE_FIELDS, 'upstream_position'],
+        )
+    moved = [
+        Movie(pk=pk, upstream_position=rows[uuid][0])
+        for uuid, (pk, position, fields) in existing.items()
+        if uuid not in changed and position != rows[uuid][0]
+    ]
+    if moved:
+        Movie.objects.bulk_update(moved, ['upstream_position'])
+
+    relink = [uuid for uuid in rows if uuid not in existing] + regenred
+    if relink:
+        link_genres(dict(Movie.objects.filter(uuid__in=relink).values_list('id', 'genres')), replace=True)
+
+    if regenred:
+        apply_links(regenred_links, sign=1)
+    if changed_ids:
+        invalidate_movie_collections(changed_ids)
+
+    return len(rows)
+
+
+def sync_catalog(max_pages=None, restart=False, api_client=None, progress=None):
+    """
+    Mirror the upstream catalog into the Movie table, one page per
+    transaction, resuming from the checkpoint of the previous run.
+
+    Returns a summary dict; ``error`` is set when upstream failed, in which
+    case the next run resumes from the failed page.
+    """
+    api_client = api_client or get_movie_api_client()
+    url = settings.EXTERNAL_MOVIES_API_URL
+    auth = (settings.API_USERNAME, settings.API_PASSWORD)
+
+    state = CatalogSyncState.load()
+    if restart:
+        state.next_page = 1
+    if state.next_page == 1:
+        state.started_at = timezone.now()
+        state.completed_at = None
+        state.save()
+
+    summary = {'first_page': state.next_page, 'pages': 0, 'movies': 0, 'error': None}
+    while max_pages is None or summary['pages'] < max_pages:
+        page = state.next_page
+        result = api_client.fetch_movies(url, auth, page)
+        if "error" in result:
+            summary['error'] = f"page {page}: {result['error']}"
+            break
+
+        results = result.get("results", [])
+        if page == 1 or not state.page_size:
+            state.page_size = len(results)
+        state.total_count = result.get("count", 0)
+        last_page = math.ceil(state.total_count / state.page_size) if state.page_size else 0
+
+        with transaction.atomic():
+            if results:
+                summary['movies'] += upsert_catalog_page(page, state.page_size, results)
+            state.synced_through_page = max(state.synced_through_page, page)
+            done = page >= last_page or not results
+            if done:
+                state.synced_through_page = last_page
+                state.next_page = 1
+                state.completed_at = timezone.now()
+            else:
+                state.next_page = page + 1
+            state.save()
+
+        summary['pages'] += 1
+        if progress:
+            progress(page, last_page)
+        if done:
+            break
+
+    summary['completed'] = state.completed_at is not None and state.next_page == 1
+    return summary
+
+
+def get_mirrored_page(page):
+    """
+    Return ``page`` from the local mirror in the upstream cache entry shape,
+    or None when that page has not been synced yet.
+    """
+    state = CatalogSyncState.objects.filter(pk=1).first()
+    if state is None or not state.page_size or page > state.synced_through_page:
+        return None
+
+    start = (page - 1) * state.page_size
+    movies = Movie.objects.filter(
+        upstream_position__gte=start, upstream_position__lt=start + state.page_size
+    ).order_by('upstream_position').values('uuid', *MOVIE_FIELDS)
+    return {"count": state.total_count, "movies": list(movies)}
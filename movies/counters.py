@@ -0,0 +1,179 @@
+import atexit
+import logging
+import os
+import threading
+from collections import Counter
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django_redis import get_redis_connection
+from redis.exceptions import RedisError
+
+logger = logging.getLogger(__name__)
+
+REQUEST_COUNT_KEY = 'request_count'
+
+
+def get_redis():
+    """
+    Return a raw Redis client sharing the connection pool of the default
+    cache, instead of opening a new pool per call.
+    """
+    return get_redis_connection('default')
+
+
+class BufferedCounter:
+    """
+    Accumulate counter increments in process memory and flush them to Redis
+    in one pipeline, from a background thread, every ``flush_interval``
+    seconds or as soon as ``flush_every`` increments are pending.
+
+    Increments go to a plain key, or to a hash field when ``field`` is
+    given; ``ttl`` sets the key expiry on every flush.
+
+    Increments never touch Redis, so a Redis outage does not affect the
+    request; unflushed counts are kept and retried on the next flush.
+    """
+
+    def __init__(self, flush_interval=1.0, flush_every=100, redis_client=None):
+        self.flush_interval = flush_interval
+        self.flush_every = flush_every
+        self.redis_client = redis_client
+        self.pending = Counter()
+        self.pending_total = 0
+        self.ttls = {}
+        self.flushes = 0
+        self.flush_errors = 0
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='buffered-counter', daemon=True)
+        self._thread.start()
+        atexit.register(self.stop)
+
+    def incr(self, key, amount=1, field=None, ttl=None):
+        with self._lock:
+            self.pending[key, field] += amount
+            self.pending_total += 1
+            if ttl:
+                self.ttls[key] = ttl
+            due = self.pending_total >= self.flush_every
+        if due:
+            self._wake.set()
+
+    def discard(self, *keys):
+        with self._lock:
+            for key, field in list(self.pending):
+                if key in keys:
+                    del self.pending[key, field]
+            for key in keys:
+                self.ttls.pop(key, None)
+
+    def flush(self):
+        with self._lock:
+            batch, self.pending = self.pending, Counter()
+            ttls, self.ttls = self.ttls, {}
+            total, self.pending_total = self.pending_total, 0
+        if not batch:
+            return True
+
+        try:
+            pipe = (self.redis_client or get_redis()).pipeline(transaction=False)
+            for (key, field), amount in batch.items():
+                if field is None:
+                    pipe.incrby(key, amount)
+                else:
+                    pipe.hincrby(key, field, amount)
+            for key, ttl in ttls.items():
+                pipe.expire(key, ttl)
+            pipe.execute()
+        except RedisError as e:
+            logger.warning('Could not flush %d counter increments to Redis: %s', sum(batch.values()), e)
+            with self._lock:
+                self.pending.update(batch)
+                self.pending_total += total
+                self.ttls.update(ttls)
+                self.flush_errors += 1
+            return False
+
+        self.flushes += 1
+        return True
+
+    def _run(self):
+        while not self._stopped.is_set():
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            self.flush()
+
+    def stop(self):
+        self._stopped.set()
+        self._wake.set()
+        self.flush()
+
+
+_request_counter = None
+_request_counter_pid = None
+_request_counter_lock = threading.Lock()
+
+
+def get_request_counter():
+    # The flush thread does not survive a fork, so each worker builds its own.
+    global _request_counter, _request_counter_pid
+    pid = os.getpid()
+    if _request_counter is None or _request_counter_pid != pid:
+        with _request_counter_lock:
+            if _request_counter is None or _request_counter_pid != pid:
+                _request_counter = BufferedCounter(
+                    settings.REQUEST_COUNTER_FLUSH_INTERVAL, settings.REQUEST_COUNTER_FLUSH_EVERY
+                )
+                _request_counter_pid = pid
+    return _request_counter
+
+
+def incr_counters(increments, ttl=None):
+    """
+    Apply ``(key, field)`` increments (``field`` None for a plain key),
+    through the process buffer or, in direct mode, one Redis pipeline.
+    """
+    if settings.REQUEST_COUNTER_BUFFERED:
+        counter = get_request_counter()
+        for key, field in increments:
+            counter.incr(key, field=field, ttl=ttl)
+        return
+
+    try:
+        pipe = get_redis().pipeline(transaction=False)
+        for key, field in increments:
+            if field is None:
+                pipe.incr(key)
+            else:
+                pipe.hincrby(key, field, 1)
+            if ttl:
+                pipe.expire(key, ttl)
+        pipe.execute()
+    except RedisError as e:
+        logger.warning('Could not update counters in Redis: %s', e)
+
+
+async def aincr_counters(increments, ttl=None):
+    """incr_counters() for async code: only direct mode needs a thread."""
+    if settings.REQUEST_COUNTER_BUFFERED:
+        incr_counters(increments, ttl)
+    else:
+        await sync_to_async(incr_counters)(increments, ttl)
+
+
+def count_request():
+    incr_counters([(REQUEST_COUNT_KEY, None)])
+
+
+def read_counter_hash(key):
+    if settings.REQUEST_COUNTER_BUFFERED:
+        get_request_counter().flush()
+    return {field.decode(): int(value) for field, value in get_redis().hgetall(key).items()}
+
+
+def read_request_count():
+    if settings.REQUEST_COUNTER_BUFFERED:
+        get_request_counter().flush()
+    return int(get_redis().get(REQUEST_COUNT_KEY) or 0)
+
@@ -0,0 +1,204 @@
+import contextvars
+import itertools
+import time
+from contextlib import contextmanager
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+from rest_framework.permissions import SAFE_METHODS
+from .instrumentation import timed
+from .tiered_cache import get_async_redis
+
+_read_alias = contextvars.ContextVar('read_alias', default=None)
+_next_replica = itertools.count()
+
+
+def pin_key(user_id):
+    return f"db_primary_pin_{user_id}"
+
+
+def pin_to_primary(user_id):
+    """Keep the user's reads on the primary for REPLICA_PIN_SECONDS."""
+    cache.set(pin_key(user_id), 1, timeout=settings.REPLICA_PIN_SECONDS)
+
+
+def is_pinned(user_id):
+    return cache.get(pin_key(user_id)) is not None
+
+
+async def apin_to_primary(user_id):
+    with timed('cache'):
+        await get_async_redis().set(
+            cache.make_key(pin_key(user_id)), cache.client.encode(1), ex=settings.REPLICA_PIN_SECONDS
+        )
+
+
+async def ais_pinned(user_id):
+    with timed('cache'):
+        return await get_async_redis().exists(cache.make_key(pin_key(user_id))) > 0
+
+
+class ReplicaHealth:
+    """
+    Run REPLICA_HEALTH_CHECK_QUERY on a replica at most once every
+    REPLICA_HEALTH_CHECK_INTERVAL seconds and remember the outcome.
+    """
+
+    def __init__(self, clock=time.monotonic):
+        self.clock = clock
+        self._checked = {}
+
+    def is_healthy(self, alias):
+        healthy = self.last_outcome(alias)
+        if healthy is None:
+            healthy = self.record(alias, self.check(alias))
+        return healthy
+
+    async def ais_healthy(self, alias):
+        healthy = self.last_outcome(alias)
+        if healthy is None:
+            # The check queries the replica, in the request's database thread.
+            healthy = self.record(alias, await sync_to_async(self.check)(alias))
+        return healthy
+
+    def last_outcome(self, alias):
+        """The outcome of the last check, or None if it is older than the interval."""
+        checked = self._checked.get(alias)
+        if checked is not None and self.clock() - checked[0] < settings.REPLICA_HEALTH_CHECK_INTERVAL:
+            return checked[1]
+        return None
+
+    def record(self, alias, healthy):
+        self._checked[alias] = (self.clock(), healthy)
+        return healthy
+
+    def check(self, alias):
+        connection = connections[alias]
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute(settings.REPLICA_HEALTH_CHECK_QUERY)
+                cursor.fetchone()
+            return True
+        except DatabaseError:
+            connection.close()
+            return False
+
+    def reset(self):
+        self._checked.clear()
+
+
+health = ReplicaHealth()
+
+
+def _rotation():
+    replicas = settings.DATABASE_REPLICAS
+    start = next(_next_replica)
+    return [replicas[(start + offset) % len(replicas)] for offset in range(len(replicas))]
+
+
+def choose_replica():
+    """The next healthy replica in round-robin order, or None."""
+    for alias in _rotation():
+        if health.is_healthy(alias):
+            return alias
+    return None
+
+
+async def achoose_replica():
+    for alias in _rotation():
+        if await health.ais_healthy(alias):
+            return alias
+    return None
+
+
+@contextmanager
+def routing_scope():
+    """Route reads to the primary until use_replica() is called, and again after the block."""
+    token = _read_alias.set(None)
+    try:
+        yield
+    finally:
+        _read_alias.reset(token)
+
+
+def read_alias():
+    """The database reads are routed to, or None for the primary."""
+    return _read_alias.get()
+
+
+async def arouted(pieces, alias):
+    """
+    Iterate ``pieces``, such as an async response body that reads the
+    database, with reads routed to ``alias`` as in the view that built it.
+    """
+    with routing_scope():
+        _read_alias.set(alias)
+        async for piece in pieces:
+            yield piece
+
+
+def use_replica():
+    alias = choose_replica()
+    _read_alias.set(alias)
+    return alias
+
+
+def route_reads(user_id):
+    if not is_pinned(user_id):
+        use_replica()
+
+
+async def aroute_reads(user_id):
+    if not await ais_pinned(user_id):
+        _read_alias.set(await achoose_replica())
+
+
+class PrimaryReplicaRouter:
+    """
+    Send writes to the primary ('default'). Reads go to the primary too,
+    except after use_replica(), which ReplicaReadMixin calls for safe
+    requests; one replica then serves every read of that request.
+    """
+
+    def db_for_read(self, model, **hints):
+        return _read_alias.get() or DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {DEFAULT_DB_ALIAS, *settings.DATABASE_REPLICAS}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+
+class ReplicaReadMixin:
+    """
+    Serve safe requests from a read replica unless the user wrote within
+    the last REPLICA_PIN_SECONDS; successful writes start that window.
+    Streamed response bodies are read after the view returns, from the
+    primary; AsyncDispatchMixin reads them from the request's database.
+    """
+
+    def dispatch(self, request, *args, **kwargs):
+        with routing_scope():
+            return super().dispatch(request, *args, **kwargs)
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        if self.reads_from_replica(request):
+            route_reads(request.user.pk)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        if self.pins_to_primary(request, response):
+            pin_to_primary(request.user.pk)
+        return super().finalize_response(request, response, *args, **kwargs)
+
+    def reads_from_replica(self, request):
+        return request.method in SAFE_METHODS and bool(settings.DATABASE_REPLICAS)
+
+    def pins_to_primary(self, request, response):
+        return bool(settings.DATABASE_REPLICAS) and request.method not in SAFE_METHODS and response.status_code < 400
+
@@ -0,0 +1,106 @@
+from collections import Counter
+from django.db import transaction
+from django.db.models import Case, F, IntegerField, Value, When
+from .models import Collection, UserGenreCount
+
+
+def split_genres(genres):
+    return [genre.strip() for genre in genres.split(',') if genre.strip()]
+
+
+def apply_genre_delta(user_id, delta, sign=1):
+    """
+    Add (or with ``sign=-1`` subtract) ``delta`` to the stored counters of
+    one user in a fixed number of queries, whatever the number of genres.
+    """
+    delta = {genre: count for genre, count in delta.items() if count}
+    if not delta:
+        return
+
+    with transaction.atomic():
+        if sign > 0:
+            UserGenreCount.objects.bulk_create(
+                [UserGenreCount(user_id=user_id, genre=genre, count=0) for genre in delta],
+                ignore_conflicts=True,
+            )
+
+        rows = UserGenreCount.objects.filter(user_id=user_id, genre__in=delta)
+        rows.update(count=F('count') + Case(
+            *[When(genre=genre, then=Value(sign * count)) for genre, count in delta.items()],
+            default=Value(0),
+            output_field=IntegerField(),
+        ))
+
+        if sign < 0:
+            UserGenreCount.objects.filter(user_id=user_id, count__lte=0).delete()
+
+
+def count_links(links):
+    """
+    Count genres over a queryset of collection/movie through rows, returning
+    a mapping of user id -> Counter.
+    """
+    counts = {}
+    for user_id, genres in links.values_list('collection__user_id', 'movie__genres').iterator():
+        counts.setdefault(user_id, Counter()).update(split_genres(genres))
+    return counts
+
+
+def apply_links(links, sign=1):
+    for user_id, delta in count_links(links).items():
+        apply_genre_delta(user_id, delta, sign)
+
+
+def top_genres(user, limit):
+    return (
+        UserGenreCount.objects.filter(user=user)
+        .order_by('-count', 'genre')
+        .values_list('genre', flat=True)[:limit]
+    )
+
+
+def favourite_genres(user, limit=3):
+    return ', '.join(top_genres(user, limit))
+
+
+async def afavourite_genres(user, limit=3):
+    return ', '.join([genre async for genre in top_genres(user, limit)])
+
+
+def compute_genre_counts(user_ids=None):
+    links = Collection.movies.through.objects.all()
+    if user_ids is not None:
+        links = links.filter(collection__user_id__in=user_ids)
+    return count_links(links)
+
+
+def stored_genre_counts(user_ids=None):
+    rows = UserGenreCount.objects.all()
+    if user_ids is not None:
+        rows = rows.filter(user_id__in=user_ids)
+
+    counts = {}
+    for user_id, genre, count in rows.values_list('user_id', 'genre', 'count').iterator():
+        counts.setdefault(user_id, Counter())[genre] = count
+    return counts
+
+
+def rebuild_genre_counts(user_ids=None):
+    counts = compute_genre_counts(user_ids)
+
+    with transaction.atomic():
+        rows = UserGenreCount.objects.all()
+        if user_ids is not None:
+            rows = rows.filter(user_id__in=user_ids)
+        rows.delete()
+
+        UserGenreCount.objects.bulk_create(
+            [
+                UserGenreCount(user_id=user_id, genre=genre, count=count)
+                for user_id, counter in counts.items()
+                for genre, count in counter.items()
+            ],
+            batch_size=1000,
+        )
+
+    return counts
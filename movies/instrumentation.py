@@ -0,0 +1,106 @@
+import contextvars
+import functools
+import time
+from contextlib import contextmanager
+from django.db import connections
+from django_redis.cache import RedisCache
+
+KINDS = ('db', 'cache', 'upstream')
+
+_profile = contextvars.ContextVar('request_profile', default=None)
+
+
+class RequestProfile:
+    """
+    Number and total time (ms) of the SQL queries, cache calls and upstream
+    HTTP calls made while handling one request.
+    """
+
+    def __init__(self):
+        self.calls = dict.fromkeys(KINDS, 0)
+        self.ms = dict.fromkeys(KINDS, 0.0)
+        # Kinds currently being timed: calls made from within one, such as
+        # cache.add() going through cache.set(), are counted once.
+        self.active = set()
+
+    def as_dict(self):
+        fields = {}
+        for kind in KINDS:
+            fields[f'{kind}_calls'] = self.calls[kind]
+            fields[f'{kind}_ms'] = round(self.ms[kind], 2)
+        return fields
+
+    def server_timing(self, total_ms):
+        metrics = [
+            f'{kind};dur={self.ms[kind]:.2f};desc="{self.calls[kind]} calls"'
+            for kind in KINDS
+        ]
+        metrics.append(f'total;dur={total_ms:.2f}')
+        return ', '.join(metrics)
+
+
+@contextmanager
+def timed(kind):
+    """Count and time the block in the current request's profile, if any."""
+    profile = _profile.get()
+    if profile is None or kind in profile.active:
+        yield
+        return
+
+    profile.active.add(kind)
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        profile.active.discard(kind)
+        profile.calls[kind] += 1
+        profile.ms[kind] += (time.perf_counter() - started) * 1000
+
+
+def _time_query(execute, sql, params, many, context):
+    with timed('db'):
+        return execute(sql, params, many, context)
+
+
+def install_query_timer(connection):
+    """
+    Time every query of ``connection`` in the current profile, if any. The
+    profile is a context variable, so it follows the request into the
+    threads that asgiref runs sync code in.
+    """
+    if _time_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_time_query)
+
+
+@contextmanager
+def profile_request():
+    """Collect a RequestProfile for everything the block does."""
+    profile = RequestProfile()
+    token = _profile.set(profile)
+    try:
+        for connection in connections.all(initialized_only=True):
+            install_query_timer(connection)
+        yield profile
+    finally:
+        _profile.reset(token)
+
+
+def _timed_method(name):
+    method = getattr(RedisCache, name)
+
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with timed('cache'):
+            return method(self, *args, **kwargs)
+    return wrapper
+
+
+class InstrumentedRedisCache(RedisCache):
+    """django-redis cache backend whose calls show up in request profiles."""
+
+
+for _name in (
+    'get', 'set', 'add', 'delete', 'get_many', 'set_many', 'delete_many', 'delete_pattern',
+    'incr', 'decr', 'has_key', 'touch', 'ttl', 'expire', 'persist', 'get_or_set', 'clear',
+):
+    setattr(InstrumentedRedisCache, _name, _timed_method(_name))
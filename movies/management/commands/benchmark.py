@@ -0,0 +1,50 @@
+from django.core.management.base import BaseCommand, CommandError
+from movies.benchmark import runner
+from movies.benchmark.fake_upstream import FakeMovieAPI
+
+
+class Command(BaseCommand):
+    help = 'Measure latency, throughput and queries per request of every endpoint against seeded data.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--collections', type=int, nargs='+', default=[10, 1000, 10000],
+                            help='Collection counts of the seeded users, one scenario each.')
+        parser.add_argument('--requests', type=int, default=50, help='Requests per endpoint and scenario.')
+        parser.add_argument('--concurrency', type=int, default=4)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--upstream-latency', type=float, default=0.05, help='Fake movie API latency in seconds.')
+        parser.add_argument('--upstream-error-rate', type=float, default=0.0)
+        parser.add_argument('--output', help='Write the results as JSON to this file.')
+        parser.add_argument('--baseline', help='Compare against a previous --output file.')
+        parser.add_argument('--threshold', type=float, default=0.2,
+                            help='Tolerated relative slowdown before a result counts as a regression.')
+        parser.add_argument('--use-current-db', action='store_true',
+                            help='Seed the configured database instead of a throwaway one.')
+
+    def handle(self, *args, collections, requests, concurrency, seed, upstream_latency, upstream_error_rate,
+               output, baseline, threshold, use_current_db, **options):
+        if concurrency < 1 or requests < 1:
+            raise CommandError('--requests and --concurrency must be at least 1.')
+        baseline = runner.load(baseline) if baseline else None
+
+        with FakeMovieAPI(latency=upstream_latency, error_rate=upstream_error_rate, seed=seed) as upstream:
+            with runner.benchmark_environment(use_current_db, EXTERNAL_MOVIES_API_URL=upstream.url):
+                results = runner.run_benchmark(collections, requests, concurrency, seed)
+
+        for scenario, endpoints in results['scenarios'].items():
+            self.stdout.write(f'\n{scenario} collections')
+            self.stdout.write(f'{"endpoint":<20}{"req/s":>9}{"p50 ms":>9}{"p99 ms":>9}{"queries":>9}{"errors":>8}')
+            for endpoint, stats in endpoints.items():
+                self.stdout.write(
+                    f'{endpoint:<20}{stats["rps"]:>9}{stats["p50_ms"]:>9}{stats["p99_ms"]:>9}'
+                    f'{stats["queries_max"]:>9}{stats["errors"]:>8}'
+                )
+
+        if output:
+            runner.save(results, output)
+            self.stdout.write(f'\nWrote {output}.')
+        if baseline:
+            regressions = runner.compare(results, baseline, threshold)
+            if regressions:
+                raise CommandError('Regressions against the baseline:\n' + '\n'.join(regressions))
+            self.stdout.write(self.style.SUCCESS('No regressions against the baseline.'))
@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand, CommandError
+from movies.benchmark import runner
+from movies.benchmark.asgi import MODES, run_asgi_benchmark
+
+
+class Command(BaseCommand):
+    help = 'Compare concurrency and latency of the sync and async movie and collection views under ASGI.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--collections', type=int, default=100, help='Collections owned by each mode\'s user.')
+        parser.add_argument('--requests', type=int, default=200, help='Requests per endpoint and mode.')
+        parser.add_argument('--concurrency', type=int, default=50, help='Requests in flight at a time.')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--upstream-latency', type=float, default=0.05, help='Fake movie API latency in seconds.')
+        parser.add_argument('--output', help='Write the results as JSON to this file.')
+        parser.add_argument('--use-current-db', action='store_true',
+                            help='Seed the configured database instead of a throwaway one.')
+
+    def handle(self, *args, collections, requests, concurrency, seed, upstream_latency, output, use_current_db, **options):
+        if concurrency < 1 or requests < 1:
+            raise CommandError('--requests and --concurrency must be at least 1.')
+
+        with runner.benchmark_environment(use_current_db):
+            results = run_asgi_benchmark(collections, requests, concurrency, seed, upstream_latency=upstream_latency)
+
+        self.stdout.write(f'{"endpoint":<20}{"mode":<7}{"req/s":>9}{"p50 ms":>9}{"p99 ms":>9}{"in flight":>11}{"threads":>9}{"errors":>8}')
+        for endpoint in results['modes']['sync']:
+            for mode in MODES:
+                stats = results['modes'][mode][endpoint]
+                self.stdout.write(
+                    f'{endpoint:<20}{mode:<7}{stats["rps"]:>9}{stats["p50_ms"]:>9}{stats["p99_ms"]:>9}'
+                    f'{stats["max_in_flight"]:>11}{stats["threads_max"]:>9}{stats["errors"]:>8}'
+                )
+
+        if output:
+            runner.save(results, output)
+            self.stdout.write(f'\nWrote {output}.')
@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand, CommandError
+from movies.benchmark import runner
+from movies.benchmark.page_codec import run_codec_benchmark
+
+
+class Command(BaseCommand):
+    help = 'Compare bytes per cached /movies/ page and encode/decode time of the pickle and compact formats.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--pages', type=int, default=20)
+        parser.add_argument('--page-size', type=int, default=10, help='Movies per page.')
+        parser.add_argument('--rounds', type=int, default=20, help='Encode/decode rounds per page.')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--output', help='Write the results as JSON to this file.')
+
+    def handle(self, *args, pages, page_size, rounds, seed, output, **options):
+        if min(pages, page_size, rounds) < 1:
+            raise CommandError('--pages, --page-size and --rounds must be at least 1.')
+
+        results = run_codec_benchmark(pages, page_size, rounds, seed)
+        self.stdout.write(f'{"format":<10}{"bytes/page":>12}{"encode us":>12}{"decode us":>12}')
+        for name, stats in results.items():
+            self.stdout.write(
+                f'{name:<10}{stats["bytes_per_page"]:>12}{stats["encode_us"]:>12}{stats["decode_us"]:>12}'
+            )
+
+        if output:
+            runner.save(results, output)
+            self.stdout.write(f'\nWrote {output}.')
@@ -0,0 +1,34 @@
+from collections import Counter
+from django.core.management.base import BaseCommand, CommandError
+from movies.genre_counts import compute_genre_counts, rebuild_genre_counts, stored_genre_counts
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the per-user favourite genre counters, or verify them against the collections.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', type=int, action='append', dest='user_ids', help='Only this user id (repeatable).')
+        parser.add_argument('--verify', action='store_true', help='Compare the counters without rewriting them.')
+
+    def handle(self, *args, user_ids=None, verify=False, **options):
+        if not verify:
+            counts = rebuild_genre_counts(user_ids)
+            self.stdout.write(self.style.SUCCESS(f'Rebuilt genre counters for {len(counts)} users.'))
+            return
+
+        expected = compute_genre_counts(user_ids)
+        stored = stored_genre_counts(user_ids)
+
+        mismatched = []
+        for user_id in sorted(set(expected) | set(stored)):
+            if +expected.get(user_id, Counter()) != +stored.get(user_id, Counter()):
+                mismatched.append(user_id)
+
+        if mismatched:
+            for user_id in mismatched:
+                self.stderr.write(
+                    f'user {user_id}: expected {dict(expected.get(user_id, {}))}, stored {dict(stored.get(user_id, {}))}'
+                )
+            raise CommandError(f'Genre counters differ for {len(mismatched)} users; run without --verify to rebuild.')
+
+        self.stdout.write(self.style.SUCCESS(f'Genre counters verified for {len(expected)} users.'))
@@ -0,0 +1,17 @@
+import time
+from django.core.management.base import BaseCommand, CommandError
+from movies import search
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the full-text search index of the movie table.'
+
+    def handle(self, *args, **options):
+        if not search.is_available():
+            raise CommandError('Movie search requires an SQLite database with FTS5.')
+
+        started = time.monotonic()
+        indexed = search.rebuild_search_index()
+        self.stdout.write(self.style.SUCCESS(
+            f'Indexed {indexed} movies in {time.monotonic() - started:.2f}s.'
+        ))
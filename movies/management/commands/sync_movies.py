@@ -0,0 +1,30 @@
+import time
+from django.core.management.base import BaseCommand, CommandError
+from movies.catalog import sync_catalog
+
+
+class Command(BaseCommand):
+    help = 'Mirror the upstream movie catalog into the database, resuming from the last checkpoint.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--max-pages', type=int, help='Stop after this many pages; the next run resumes.')
+        parser.add_argument('--restart', action='store_true', help='Start again from page 1.')
+
+    def handle(self, *args, max_pages=None, restart=False, **options):
+        started = time.monotonic()
+
+        def progress(page, last_page):
+            if options['verbosity'] > 1:
+                self.stdout.write(f'page {page}/{last_page}')
+
+        summary = sync_catalog(max_pages=max_pages, restart=restart, progress=progress)
+        elapsed = time.monotonic() - started
+
+        self.stdout.write(
+            f"Synced {summary['pages']} pages from page {summary['first_page']} "
+            f"({summary['movies']} movies) in {elapsed:.2f}s."
+        )
+        if summary['error']:
+            raise CommandError(f"Stopped at {summary['error']}; run again to resume.")
+        if summary['completed']:
+            self.stdout.write(self.style.SUCCESS('Catalog fully synced.'))
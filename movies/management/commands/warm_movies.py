@@ -0,0 +1,74 @@
+import math
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from movies.page_cache import fetch_page, store_page
+from movies.service import MovieAPIClient
+
+
+class Command(BaseCommand):
+    help = 'Fetch the upstream movie catalog into the /movies/ page cache.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', type=int, default=8, help='Number of pages fetched at once.')
+        parser.add_argument('--start-page', type=int, default=1)
+        parser.add_argument('--end-page', type=int, help='Last page to warm. Defaults to the last upstream page.')
+        parser.add_argument('--jitter', type=float, default=0.1, help='Spread the TTLs by up to this fraction.')
+        parser.add_argument('--dry-run', action='store_true', help='Only fetch page 1 and print the plan.')
+
+    def handle(self, *args, concurrency, start_page, end_page, jitter, dry_run, **options):
+        if concurrency < 1:
+            raise CommandError('--concurrency must be at least 1.')
+
+        api_client = MovieAPIClient(pool_size=concurrency)
+        started = time.monotonic()
+
+        first = fetch_page(1, api_client)
+        if "error" in first:
+            raise CommandError(f"Failed to fetch page 1: {first['error']}")
+
+        page_size = len(first["movies"])
+        last_page = math.ceil(first["count"] / page_size) if page_size else 0
+        end_page = min(end_page or last_page, last_page)
+        pages = list(range(max(start_page, 1), end_page + 1))
+
+        self.stdout.write(
+            f'{first["count"]} movies in {last_page} pages of {page_size}; '
+            f'warming pages {pages[0] if pages else "-"}..{end_page} with concurrency {concurrency}.'
+        )
+        if dry_run:
+            return
+
+        def warm(page):
+            entry = first if page == 1 else fetch_page(page, api_client)
+            if "error" not in entry:
+                spread = 1 + random.uniform(-jitter, jitter)
+                store_page(
+                    page,
+                    entry,
+                    soft_ttl=settings.MOVIES_CACHE_SOFT_TTL * spread,
+                    hard_ttl=int(settings.MOVIES_CACHE_HARD_TTL * spread),
+                )
+            return entry
+
+        warmed = movies = 0
+        errors = {}
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            futures = {executor.submit(warm, page): page for page in pages}
+            for future in as_completed(futures):
+                entry = future.result()
+                if "error" in entry:
+                    errors[futures[future]] = entry["error"]
+                else:
+                    warmed += 1
+                    movies += len(entry["movies"])
+
+        elapsed = time.monotonic() - started
+        for page, error in sorted(errors.items()):
+            self.stderr.write(f'page {page}: {error}')
+        self.stdout.write(self.style.SUCCESS(
+            f'Warmed {warmed}/{len(pages)} pages ({movies} movies) in {elapsed:.2f}s: '
+            f'{warmed / elapsed:.1f} pages/s, {movies / elapsed:.1f} movies/s, {len(errors)} errors.'
+        ))
@@ -0,0 +1,128 @@
+import math
+import time
+from collections import Counter
+from django.conf import settings
+from .counters import REQUEST_COUNT_KEY, get_redis, get_request_counter, incr_counters
+
+WINDOWS = (1, 5, 60)
+PERCENTILES = (50, 95, 99)
+
+# Latency histogram upper bounds in milliseconds: 1ms to ~32s, each bucket
+# sqrt(2) wider than the previous one. Anything slower goes to the last one.
+LATENCY_BOUNDS_MS = tuple(2 ** (i / 2) for i in range(31))
+
+
+def current_minute(now=None):
+    return int((time.time() if now is None else now) // 60)
+
+
+def requests_key(minute):
+    return f'metrics:requests:{minute}'
+
+
+def latency_key(minute):
+    return f'metrics:latency:{minute}'
+
+
+def latency_bucket(duration_ms):
+    if duration_ms <= 1:
+        return 0
+    return min(math.ceil(2 * math.log2(duration_ms)), len(LATENCY_BOUNDS_MS) - 1)
+
+
+def route_name(request):
+    match = getattr(request, 'resolver_match', None)
+    return f"{request.method} {match.view_name if match else 'unmatched'}"
+
+
+def record_request(route, status_code, duration_ms):
+    """
+    Count one request in the current minute bucket of its route and status
+    class, and add its duration to the route's latency histogram.
+    """
+    minute = current_minute()
+    increments = (
+        (requests_key(minute), f'{route}|{status_code // 100}xx'),
+        (latency_key(minute), f'{route}|{latency_bucket(duration_ms)}'),
+    )
+    incr_counters(increments, ttl=settings.METRICS_RETENTION)
+
+
+def percentile(histogram, q):
+    total = sum(histogram.values())
+    threshold = total * q / 100
+    seen = 0
+    for bucket in sorted(histogram):
+        seen += histogram[bucket]
+        if seen >= threshold:
+            return round(LATENCY_BOUNDS_MS[bucket], 1)
+    return None
+
+
+def read_metrics(windows=WINDOWS):
+    """
+    Return request rates per route and status class, and latency
+    percentiles per route, over each of the last ``windows`` minutes.
+    Rates are per second actually elapsed, the current minute counting
+    only as far as it has run.
+    """
+    if settings.REQUEST_COUNTER_BUFFERED:
+        get_request_counter().flush()
+
+    timestamp = time.time()
+    now = current_minute(timestamp)
+    # At least a second, so that the first moments of a minute do not inflate the rate.
+    elapsed = max(timestamp - now * 60, 1)
+    minutes = range(now - max(windows) + 1, now + 1)
+    pipe = get_redis().pipeline(transaction=False)
+    for minute in minutes:
+        pipe.hgetall(requests_key(minute))
+        pipe.hgetall(latency_key(minute))
+    replies = pipe.execute()
+    buckets = dict(zip(minutes, zip(replies[::2], replies[1::2])))
+
+    result = {}
+    for window in windows:
+        status_counts = {}
+        histograms = {}
+        for minute in range(now - window + 1, now + 1):
+            request_counts, latencies = buckets[minute]
+            for field, count in request_counts.items():
+                route, status_class = field.decode().rsplit('|', 1)
+                status_counts.setdefault(route, Counter())[status_class] += int(count)
+            for field, count in latencies.items():
+                route, bucket = field.decode().rsplit('|', 1)
+                histograms.setdefault(route, Counter())[int(bucket)] += int(count)
+
+        seconds = (window - 1) * 60 + elapsed
+        routes = {}
+        for route in sorted(status_counts):
+            requests = sum(status_counts[route].values())
+            routes[route] = {
+                'requests': requests,
+                'rate': round(requests / seconds, 3),
+                'status': dict(sorted(status_counts[route].items())),
+                'latency_ms': {f'p{q}': percentile(histograms.get(route, {}), q) for q in PERCENTILES},
+            }
+        total = sum(route['requests'] for route in routes.values())
+        result[f'{window}m'] = {'requests': total, 'rate': round(total / seconds, 3), 'routes': routes}
+
+    return result
+
+
+def reset_metrics():
+    """
+    Reset the request count and drop every metrics bucket in one MULTI/EXEC
+    transaction. Bucket keys are derived from the retention, not scanned.
+    """
+    now = current_minute()
+    minutes = range(now - settings.METRICS_RETENTION // 60 - 1, now + 1)
+    keys = [key(minute) for minute in minutes for key in (requests_key, latency_key)]
+
+    if settings.REQUEST_COUNTER_BUFFERED:
+        get_request_counter().discard(REQUEST_COUNT_KEY, *keys)
+
+    pipe = get_redis().pipeline(transaction=True)
+    pipe.set(REQUEST_COUNT_KEY, 0)
+    pipe.delete(*keys)
+    pipe.execute()
@@ -1,35 +1,89 @@
-import redis
+import json
+import logging
+import time
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
 from django.conf import settings
-# import threading
+from .counters import count_request
+from .instrumentation import profile_request
+from .metrics import record_request, route_name
 
+logger = logging.getLogger('movies.requests')
+
+
+class AsyncCapableMiddleware:
+    """
+    Middleware that runs on the event loop when the next handler is async
+    (async views under ASGI), so that those are not moved to a thread.
+    Subclasses implement ``__call__`` and ``__acall__``.
+    """
+    sync_capable = True
+    async_capable = True
 
-class RequestCounterMiddleware:
     def __init__(self, get_response):
         self.get_response = get_response
-        self.redis_client = redis.StrictRedis.from_url(settings.CACHES['default']['LOCATION'])
-    
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+
+class InstrumentationMiddleware(AsyncCapableMiddleware):
+    """
+    Count and time the SQL queries, cache calls and upstream HTTP calls of
+    each request; report them in a Server-Timing header and a log line.
+    """
+
     def __call__(self, request):
-        self.redis_client.incr('request_count')
-        
-        response = self.get_response(request)
-        return response
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        started = time.perf_counter()
+        with profile_request() as profile:
+            response = self.get_response(request)
+        return self.report(request, response, profile, started)
 
+    async def __acall__(self, request):
+        started = time.perf_counter()
+        with profile_request() as profile:
+            response = await self.get_response(request)
+        return self.report(request, response, profile, started)
+
+    def report(self, request, response, profile, started):
+        total_ms = (time.perf_counter() - started) * 1000
+        if settings.SERVER_TIMING:
+            response['Server-Timing'] = profile.server_timing(total_ms)
+        logger.info(json.dumps({
+            'method': request.method,
+            'path': request.path,
+            'route': route_name(request),
+            'status': response.status_code,
+            'duration_ms': round(total_ms, 2),
+            **profile.as_dict(),
+        }))
+        return response
 
 
+class RequestCounterMiddleware(AsyncCapableMiddleware):
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        count_request()
+        started = time.perf_counter()
 
-# request_count = 0
+        response = self.get_response(request)
 
-# counter_lock = threading.Lock()
+        record_request(route_name(request), response.status_code, (time.perf_counter() - started) * 1000)
+        return response
 
-# class RequestCountMiddleware:
+    async def __acall__(self, request):
+        await self.count(count_request)
+        started = time.perf_counter()
 
-#     def __init__(self, get_response):
-#         self.get_response = get_response
+        response = await self.get_response(request)
 
-#     def __call__(self, request):
-#         global request_count
-#         with counter_lock:
-#             request_count += 1
+        await self.count(record_request, route_name(request), response.status_code, (time.perf_counter() - started) * 1000)
+        return response
 
-#         response = self.get_response(request)
-#         return response
+    async def count(self, func, *args):
+        # Buffered counts stay in process memory; direct mode writes to Redis, so it runs in a thread.
+        if settings.REQUEST_COUNTER_BUFFERED:
+            func(*args)
+        else:
+            await sync_to_async(func)(*args)
@@ -0,0 +1,52 @@
+# Generated by Django 5.1.3 on 2026-10-18 08:58
+
+import django.db.models.deletion
+from django.conf import settings
+from collections import Counter
+from django.db import migrations, models
+
+
+def backfill_genre_counts(apps, schema_editor):
+    Collection = apps.get_model('movies', 'Collection')
+    UserGenreCount = apps.get_model('movies', 'UserGenreCount')
+
+    counts = {}
+    links = Collection.movies.through.objects.values_list('collection__user_id', 'movie__genres')
+    for user_id, genres in links.iterator():
+        counts.setdefault(user_id, Counter()).update(
+            genre.strip() for genre in genres.split(',') if genre.strip()
+        )
+
+    UserGenreCount.objects.bulk_create(
+        [
+            UserGenreCount(user_id=user_id, genre=genre, count=count)
+            for user_id, counter in counts.items()
+            for genre, count in counter.items()
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movies', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserGenreCount',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('genre', models.CharField(max_length=255)),
+                ('count', models.IntegerField(default=0)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='genre_counts', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['user', '-count'], name='user_genre_count_idx')],
+                'constraints': [models.UniqueConstraint(fields=('user', 'genre'), name='unique_user_genre')],
+            },
+        ),
+        migrations.RunPython(backfill_genre_counts, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.1.3 on 2026-10-18 09:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movies', '0002_user_genre_count'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Genre',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255, unique=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='movie',
+            name='genre_list',
+            field=models.ManyToManyField(blank=True, related_name='movies', to='movies.genre'),
+        ),
+    ]
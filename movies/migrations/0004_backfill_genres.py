@@ -0,0 +1,37 @@
+from django.db import migrations
+
+
+def backfill_genres(apps, schema_editor):
+    Genre = apps.get_model('movies', 'Genre')
+    Movie = apps.get_model('movies', 'Movie')
+    MovieGenre = Movie.genre_list.through
+
+    movie_genres = {
+        movie_id: {genre.strip() for genre in genres.split(',') if genre.strip()}
+        for movie_id, genres in Movie.objects.values_list('id', 'genres').iterator()
+    }
+
+    names = set().union(*movie_genres.values())
+    Genre.objects.bulk_create([Genre(name=name) for name in names], ignore_conflicts=True, batch_size=1000)
+    genre_ids = dict(Genre.objects.values_list('name', 'id'))
+
+    MovieGenre.objects.bulk_create(
+        [
+            MovieGenre(movie_id=movie_id, genre_id=genre_ids[name])
+            for movie_id, genres in movie_genres.items()
+            for name in genres
+        ],
+        ignore_conflicts=True,
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movies', '0003_genre'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_genres, migrations.RunPython.noop),
+    ]
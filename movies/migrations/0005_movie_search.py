@@ -0,0 +1,60 @@
+from django.db import migrations
+
+CREATE_SQL = [
+    """
+    CREATE VIRTUAL TABLE movies_movie_fts USING fts5(
+        title, description, genres,
+        content='movies_movie', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )
+    """,
+    """
+    CREATE TRIGGER movies_movie_fts_insert AFTER INSERT ON movies_movie BEGIN
+        INSERT INTO movies_movie_fts(rowid, title, description, genres)
+        VALUES (new.id, new.title, new.description, new.genres);
+    END
+    """,
+    """
+    CREATE TRIGGER movies_movie_fts_delete AFTER DELETE ON movies_movie BEGIN
+        INSERT INTO movies_movie_fts(movies_movie_fts, rowid, title, description, genres)
+        VALUES ('delete', old.id, old.title, old.description, old.genres);
+    END
+    """,
+    """
+    CREATE TRIGGER movies_movie_fts_update AFTER UPDATE OF title, description, genres ON movies_movie BEGIN
+        INSERT INTO movies_movie_fts(movies_movie_fts, rowid, title, description, genres)
+        VALUES ('delete', old.id, old.title, old.description, old.genres);
+        INSERT INTO movies_movie_fts(rowid, title, description, genres)
+        VALUES (new.id, new.title, new.description, new.genres);
+    END
+    """,
+    "INSERT INTO movies_movie_fts(movies_movie_fts) VALUES ('rebuild')",
+]
+
+DROP_SQL = [
+    "DROP TRIGGER IF EXISTS movies_movie_fts_update",
+    "DROP TRIGGER IF EXISTS movies_movie_fts_delete",
+    "DROP TRIGGER IF EXISTS movies_movie_fts_insert",
+    "DROP TABLE IF EXISTS movies_movie_fts",
+]
+
+
+def run_sqlite(statements):
+    def run(apps, schema_editor):
+        # The search index is an SQLite FTS5 table; other databases skip it.
+        if schema_editor.connection.vendor != 'sqlite':
+            return
+        for statement in statements:
+            schema_editor.execute(statement)
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movies', '0004_backfill_genres'),
+    ]
+
+    operations = [
+        migrations.RunPython(run_sqlite(CREATE_SQL), run_sqlite(DROP_SQL)),
+    ]
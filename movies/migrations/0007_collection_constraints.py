@@ -0,0 +1,46 @@
+# Generated by Django 5.1.3 on 2026-10-18 09:30
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def rename_duplicate_titles(apps, schema_editor):
+    # Titles were only checked for uniqueness on create, so renames may have
+    # produced duplicates; number all but the oldest so the constraint holds.
+    Collection = apps.get_model('movies', 'Collection')
+    duplicates = (
+        Collection.objects.values('user_id', 'title')
+        .annotate(n=Count('id'))
+        .filter(n__gt=1)
+    )
+    for duplicate in duplicates:
+        taken = set(Collection.objects.filter(user_id=duplicate['user_id']).values_list('title', flat=True))
+        collections = Collection.objects.filter(user_id=duplicate['user_id'], title=duplicate['title']).order_by('id')
+        for collection in collections[1:]:
+            number = 2
+            while f"{collection.title} ({number})" in taken:
+                number += 1
+            collection.title = f"{collection.title} ({number})"
+            taken.add(collection.title)
+            collection.save(update_fields=['title'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movies', '0006_catalog_mirror'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='collection',
+            index=models.Index(fields=['user', 'id'], name='collection_user_id_idx'),
+        ),
+        migrations.RunPython(rename_duplicate_titles, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='collection',
+            constraint=models.UniqueConstraint(fields=('user', 'title'), name='collection_user_title_uniq'),
+        ),
+    ]
@@ -2,16 +2,48 @@ import uuid
 from django.db import models
 from django.contrib.auth.models import User
 
+class Genre(models.Model):
+    name = models.CharField(max_length=255, unique=True)
+
+    def __str__(self):
+        return self.name
+
+
 class Movie(models.Model):
     title = models.CharField(max_length=255)
     description = models.TextField()
     genres = models.CharField(max_length=255)
     uuid = models.CharField(max_length=255, unique=True)
+    genre_list = models.ManyToManyField(Genre, related_name='movies', blank=True)
+    upstream_position = models.PositiveIntegerField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['upstream_position'], name='movie_upstream_position_idx'),
+        ]
 
     def __str__(self):
         return self.title
 
 
+class CatalogSyncState(models.Model):
+    page_size = models.PositiveIntegerField(default=0)
+    total_count = models.PositiveIntegerField(default=0)
+    synced_through_page = models.PositiveIntegerField(default=0)
+    next_page = models.PositiveIntegerField(default=1)
+    started_at = models.DateTimeField(null=True, blank=True)
+    completed_at = models.DateTimeField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    @classmethod
+    def load(cls):
+        state, _ = cls.objects.get_or_create(pk=1)
+        return state
+
+    def __str__(self):
+        return f'synced through page {self.synced_through_page}'
+
+
 class Collection(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='collections')
     title = models.CharField(max_length=255)
@@ -19,6 +51,31 @@ class Collection(models.Model):
     movies = models.ManyToManyField(Movie, related_name='collections')
     uuid = models.UUIDField(default=uuid.uuid4, editable=False, unique=True)
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'title'], name='collection_user_title_uniq'),
+        ]
+        indexes = [
+            models.Index(fields=['user', 'id'], name='collection_user_id_idx'),
+        ]
+
     def __str__(self):
         return self.title
 
+
+
+class UserGenreCount(models.Model):
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='genre_counts')
+    genre = models.CharField(max_length=255)
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'genre'], name='unique_user_genre'),
+        ]
+        indexes = [
+            models.Index(fields=['user', '-count'], name='user_genre_count_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.genre}: {self.count}'
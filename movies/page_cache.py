@@ -0,0 +1,296 @@
+import asyncio
+import threading
+import time
+from functools import partial
+from django.conf import settings
+from django.core.cache import cache
+from redis.exceptions import LockError
+from . import read_serializers
+from .async_service import get_async_movie_api_client
+from .instrumentation import timed
+from .serializers import MovieSerializer
+from .service import get_movie_api_client
+from .tiered_cache import get_async_redis, get_tier
+from .versioning import page_etag
+
+
+def page_cache_key(page):
+    return f"movies_list_page_{page}"
+
+
+def fresh_until_key(page):
+    return f"{page_cache_key(page)}:fresh_until"
+
+
+def fetch_page(page, api_client=None, validators=None):
+    """
+    Fetch one page from the upstream movie API and return a cache entry, or
+    a dict with an ``error`` key when upstream failed. With the
+    ``validators`` of the cached entry, an unchanged page returns
+    ``{"not_modified": True}``.
+    """
+    api_client = api_client or get_movie_api_client()
+    url = settings.EXTERNAL_MOVIES_API_URL
+    auth = (settings.API_USERNAME, settings.API_PASSWORD)
+    return page_entry(api_client.fetch_movies(url, auth, page, validators=validators))
+
+
+async def afetch_page(page, api_client=None, validators=None):
+    api_client = api_client or get_async_movie_api_client()
+    url = settings.EXTERNAL_MOVIES_API_URL
+    auth = (settings.API_USERNAME, settings.API_PASSWORD)
+    return page_entry(await api_client.fetch_movies(url, auth, page, validators=validators))
+
+
+def page_entry(result):
+    if "error" in result or "not_modified" in result:
+        return result
+
+    movie_data = result.get("results", [])
+    if read_serializers.enabled():
+        movies = [read_serializers.movie_dict(movie) for movie in movie_data]
+    else:
+        movies = MovieSerializer(movie_data, many=True).data
+    entry = {
+        "count": result.get("count", 0),
+        "movies": movies,
+    }
+    if result.get("validators"):
+        entry["validators"] = result["validators"]
+    return entry
+
+
+def stamp(entry, soft_ttl=None):
+    soft_ttl = settings.MOVIES_CACHE_SOFT_TTL if soft_ttl is None else soft_ttl
+    return dict(entry, fresh_until=time.time() + soft_ttl, etag=entry.get("etag") or page_etag(entry))
+
+
+def store_page(page, entry, soft_ttl=None, hard_ttl=None):
+    entry = stamp(entry, soft_ttl)
+    hard_ttl = settings.MOVIES_CACHE_HARD_TTL if hard_ttl is None else hard_ttl
+    get_tier('movies').set(page_cache_key(page), entry, timeout=hard_ttl)
+    # The new entry's fresh_until replaces any extension of the previous one.
+    cache.delete(fresh_until_key(page))
+    return entry
+
+
+async def astore_page(page, entry, soft_ttl=None, hard_ttl=None):
+    entry = stamp(entry, soft_ttl)
+    hard_ttl = settings.MOVIES_CACHE_HARD_TTL if hard_ttl is None else hard_ttl
+    await get_tier('movies').aset(page_cache_key(page), entry, timeout=hard_ttl)
+    with timed('cache'):
+        await get_async_redis().delete(cache.make_key(fresh_until_key(page)))
+    return entry
+
+
+def extend_page(page, current, soft_ttl=None, hard_ttl=None):
+    """
+    Keep the cached ``current`` entry of ``page``, unchanged upstream, fresh
+    for another soft TTL: the new ``fresh_until`` goes to a side key and the
+    page's own TTL is extended, so the stored page is neither re-encoded nor
+    rewritten. This process's local copy gets the new ``fresh_until``; other
+    processes pick it up from the side key (is_fresh()).
+    """
+    soft_ttl = settings.MOVIES_CACHE_SOFT_TTL if soft_ttl is None else soft_ttl
+    hard_ttl = settings.MOVIES_CACHE_HARD_TTL if hard_ttl is None else hard_ttl
+    fresh_until = time.time() + soft_ttl
+    tier = get_tier('movies')
+    generation = tier.local.generation
+    cache.set(fresh_until_key(page), fresh_until, timeout=hard_ttl)
+    cache.expire(page_cache_key(page), timeout=hard_ttl)
+    entry = dict(current, fresh_until=fresh_until)
+    tier.set_local(page_cache_key(page), entry, timeout=hard_ttl, generation=generation)
+    return entry
+
+
+async def aextend_page(page, current, soft_ttl=None, hard_ttl=None):
+    soft_ttl = settings.MOVIES_CACHE_SOFT_TTL if soft_ttl is None else soft_ttl
+    hard_ttl = settings.MOVIES_CACHE_HARD_TTL if hard_ttl is None else hard_ttl
+    fresh_until = time.time() + soft_ttl
+    tier = get_tier('movies')
+    generation = tier.local.generation
+    with timed('cache'):
+        async with get_async_redis().pipeline(transaction=False) as pipe:
+            pipe.set(cache.make_key(fresh_until_key(page)), cache.client.encode(fresh_until), ex=hard_ttl)
+            pipe.expire(cache.make_key(page_cache_key(page)), hard_ttl)
+            await pipe.execute()
+    entry = dict(current, fresh_until=fresh_until)
+    tier.set_local(page_cache_key(page), entry, timeout=hard_ttl, generation=generation)
+    return entry
+
+
+def is_fresh(page, entry):
+    """
+    Whether ``entry`` is within its soft TTL, or within an extension of it
+    (extend_page()). An extension found in Redis is copied to this
+    process's local tier, so later hits do not read the side key again.
+    """
+    if time.time() < entry["fresh_until"]:
+        return True
+    tier = get_tier('movies')
+    generation = tier.local.generation
+    return _extended(tier, page, entry, cache.get(fresh_until_key(page)), generation)
+
+
+async def ais_fresh(page, entry):
+    if time.time() < entry["fresh_until"]:
+        return True
+    tier = get_tier('movies')
+    generation = tier.local.generation
+    with timed('cache'):
+        raw = await get_async_redis().get(cache.make_key(fresh_until_key(page)))
+    return _extended(tier, page, entry, None if raw is None else cache.client.decode(raw), generation)
+
+
+def _extended(tier, page, entry, fresh_until, generation):
+    if fresh_until is None or time.time() >= fresh_until:
+        return False
+    tier.set_local(page_cache_key(page), dict(entry, fresh_until=fresh_until), generation=generation)
+    return True
+
+
+def refresh_page(page, current=None):
+    """
+    Fetch ``page`` again and store it. When ``current`` (the cached entry)
+    has upstream validators and upstream answers 304 Not Modified, it is
+    kept as it is and only its freshness is extended (extend_page()).
+    """
+    validators = current.get("validators") if current else None
+    entry = fetch_page(page, validators=validators)
+    if "not_modified" in entry:
+        return extend_page(page, current)
+    if "error" in entry:
+        return entry
+    return store_page(page, entry)
+
+
+async def arefresh_page(page, current=None):
+    validators = current.get("validators") if current else None
+    entry = await afetch_page(page, validators=validators)
+    if "not_modified" in entry:
+        return await aextend_page(page, current)
+    if "error" in entry:
+        return entry
+    return await astore_page(page, entry)
+
+
+def _release(lock):
+    try:
+        lock.release()
+    except LockError:
+        # The lock expired while upstream was slow; another worker may own it now.
+        pass
+
+
+def _refresh_in_background(page, lock, current):
+    try:
+        refresh_page(page, current)
+    finally:
+        _release(lock)
+
+
+def _lock(page):
+    # Not thread-local: a stale page is released by the background refresh thread.
+    return cache.lock(f"{page_cache_key(page)}:lock", timeout=settings.MOVIES_CACHE_LOCK_TIMEOUT, thread_local=False)
+
+
+def get_movies_page(page):
+    """
+    Return the cached entry for ``page``, refreshing it from upstream with at
+    most one worker per page at a time.
+
+    A fresh entry is returned as is. A stale one (past its soft TTL but
+    within the hard TTL) is returned immediately while the worker holding
+    the refresh lock fetches a new copy in the background, unless the
+    upstream circuit breaker would reject it. On a miss the
+    lock holder fetches the page and the other workers wait for it, up to
+    ``MOVIES_CACHE_LOCK_WAIT`` seconds, before fetching it themselves.
+    """
+    entry = get_tier('movies').get(page_cache_key(page))
+    if isinstance(entry, dict):
+        if is_fresh(page, entry):
+            return entry
+
+        lock = _lock(page)
+        if get_movie_api_client().breaker.available() and lock.acquire(blocking=False):
+            threading.Thread(target=_refresh_in_background, args=(page, lock, entry), daemon=True).start()
+        return entry
+
+    lock = _lock(page)
+    if lock.acquire(blocking=True, blocking_timeout=settings.MOVIES_CACHE_LOCK_WAIT):
+        try:
+            entry = get_tier('movies').get(page_cache_key(page))
+            if isinstance(entry, dict):
+                return entry
+            return refresh_page(page)
+        finally:
+            _release(lock)
+
+    entry = get_tier('movies').get(page_cache_key(page))
+    if isinstance(entry, dict):
+        return entry
+    return refresh_page(page)
+
+
+async def _arelease(lock):
+    try:
+        await lock.release()
+    except LockError:
+        pass
+
+
+async def _arefresh_in_background(page, lock, current):
+    try:
+        await arefresh_page(page, current)
+    finally:
+        await _arelease(lock)
+
+
+def _alock(page):
+    # The same Redis key as _lock(), so sync and async workers take turns.
+    key = cache.make_key(f"{page_cache_key(page)}:lock")
+    return get_async_redis().lock(key, timeout=settings.MOVIES_CACHE_LOCK_TIMEOUT, thread_local=False)
+
+
+# Background refreshes in flight; the event loop only keeps weak references to tasks.
+_refreshes = set()
+
+
+async def aget_movies_page(page):
+    """
+    get_movies_page() for async views: the same caching, stale refreshes
+    and single-flight locking, with the asyncio Redis and upstream clients.
+    Only one miss of a page per event loop takes the lock.
+    """
+    tier = get_tier('movies')
+    entry = await tier.aget(page_cache_key(page))
+    if isinstance(entry, dict):
+        if await ais_fresh(page, entry):
+            return entry
+
+        lock = _alock(page)
+        if get_async_movie_api_client().breaker.available() and await lock.acquire(blocking=False):
+            task = asyncio.create_task(_arefresh_in_background(page, lock, entry))
+            _refreshes.add(task)
+            task.add_done_callback(_refreshes.discard)
+        return entry
+
+    # Misses of the page on this event loop wait for one load, rather than each polling the lock.
+    return await tier.ashared(page_cache_key(page), partial(_aload_page, tier, page))
+
+
+async def _aload_page(tier, page):
+    lock = _alock(page)
+    if await lock.acquire(blocking_timeout=settings.MOVIES_CACHE_LOCK_WAIT):
+        try:
+            entry = await tier.aget(page_cache_key(page))
+            if isinstance(entry, dict):
+                return entry
+            return await arefresh_page(page)
+        finally:
+            await _arelease(lock)
+
+    entry = await tier.aget(page_cache_key(page))
+    if isinstance(entry, dict):
+        return entry
+    return await arefresh_page(page)
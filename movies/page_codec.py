@@ -0,0 +1,53 @@
+import json
+import zlib
+from django.conf import settings
+from .read_serializers import MOVIE_FIELDS
+
+# b'MP', then the layout version and a flag byte (1: zlib compressed).
+MAGIC = b'MP'
+VERSION = 1
+COMPRESSED = 1
+
+
+class PageCodec:
+    """
+    Compact Redis encoding of /movies/ cache entries: the movies as rows of
+    MOVIE_FIELDS rather than one dict each, as JSON, compressed with zlib
+    when longer than MOVIES_CACHE_COMPRESS_THRESHOLD bytes.
+
+    Entries pickled before this codec (plain dicts) decode as they are;
+    bytes of an unknown layout version, or that fail to decode, decode to
+    None, a cache miss.
+    """
+
+    def encode(self, entry):
+        layout = {
+            'count': entry['count'],
+            'fresh_until': entry.get('fresh_until'),
+            'etag': entry.get('etag'),
+            'movies': [[movie[field] for field in MOVIE_FIELDS] for movie in entry['movies']],
+        }
+        if entry.get('validators'):
+            layout['validators'] = entry['validators']
+        payload = json.dumps(layout, ensure_ascii=False, separators=(',', ':')).encode()
+        flags = 0
+        if len(payload) > settings.MOVIES_CACHE_COMPRESS_THRESHOLD:
+            payload = zlib.compress(payload, settings.MOVIES_CACHE_COMPRESS_LEVEL)
+            flags |= COMPRESSED
+        return MAGIC + bytes((VERSION, flags)) + payload
+
+    def decode(self, value):
+        if value is None or isinstance(value, dict):
+            return value
+        if not isinstance(value, bytes) or value[:2] != MAGIC or len(value) < 4 or value[2] != VERSION:
+            return None
+
+        try:
+            payload = value[4:]
+            if value[3] & COMPRESSED:
+                payload = zlib.decompress(payload)
+            layout = json.loads(payload)
+        except (zlib.error, ValueError):
+            return None
+        layout['movies'] = [dict(zip(MOVIE_FIELDS, row)) for row in layout['movies']]
+        return layout
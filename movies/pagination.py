@@ -0,0 +1,61 @@
+from django.conf import settings
+from rest_framework.pagination import CursorPagination
+
+
+class CollectionCursorPagination(CursorPagination):
+    ordering = 'id'
+    page_size = settings.COLLECTIONS_PAGE_SIZE
+    page_size_query_param = 'page_size'
+    max_page_size = settings.COLLECTIONS_MAX_PAGE_SIZE
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        """
+        paginate_queryset() for async views, with the page read by the async
+        ORM. The cursor is read with decode_cursor(), and get_next_link() and
+        get_previous_link() encode the links from the page as usual.
+        """
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+        self.cursor = self.decode_cursor(request)
+        offset, reverse, current_position = self.cursor or (0, False, None)
+
+        if reverse:
+            queryset = queryset.order_by(*(f[1:] if f.startswith('-') else f'-{f}' for f in self.ordering))
+        else:
+            queryset = queryset.order_by(*self.ordering)
+
+        if current_position is not None:
+            order = self.ordering[0]
+            lookup = 'lt' if reverse != order.startswith('-') else 'gt'
+            queryset = queryset.filter(**{f"{order.lstrip('-')}__{lookup}": current_position})
+
+        # One extra row tells whether a following page exists.
+        results = [row async for row in queryset[offset:offset + self.page_size + 1]]
+        self.page = results[:self.page_size]
+        following_position = None
+        if len(results) > len(self.page):
+            following_position = self.position(results[-1])
+
+        if reverse:
+            self.page.reverse()
+            self.has_next = current_position is not None or offset > 0
+            self.has_previous = following_position is not None
+            self.next_position, self.previous_position = current_position, following_position
+        else:
+            self.has_next = following_position is not None
+            self.has_previous = current_position is not None or offset > 0
+            self.next_position, self.previous_position = following_position, current_position
+
+        if (self.has_previous or self.has_next) and self.template is not None:
+            self.display_page_controls = True
+        return self.page
+
+    def position(self, item):
+        # The ordering field of a model instance or values() row, as the cursor stores it.
+        field = self.ordering[0].lstrip('-')
+        return str(item[field] if isinstance(item, dict) else getattr(item, field))
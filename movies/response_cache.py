@@ -0,0 +1,69 @@
+from django.conf import settings
+from .counters import aincr_counters, incr_counters, read_counter_hash
+from .tiered_cache import get_tier
+from .versioning import digest
+
+STATS_KEY = 'collection_response_cache'
+
+
+def enabled(endpoint):
+    return settings.COLLECTION_RESPONSE_CACHE.get(endpoint, False)
+
+
+def response_cache_key(request, version):
+    return f"collection_response:{request.user.pk}:{version}:{digest(request.get_full_path())}"
+
+
+def get_cached_response(endpoint, request, version):
+    """
+    Return the cached response data of a collection read, or None.
+
+    Keys embed the user's collection version, so a write makes every older
+    entry unreachable without deleting anything; they expire on their own.
+    """
+    if not enabled(endpoint):
+        return None
+
+    data = get_tier('collections').get(response_cache_key(request, version))
+    incr_counters([(STATS_KEY, f"{endpoint}:{'hits' if data is not None else 'misses'}")])
+    return data
+
+
+def set_cached_response(endpoint, request, version, data):
+    if enabled(endpoint):
+        get_tier('collections').set(response_cache_key(request, version), data, timeout=settings.COLLECTION_RESPONSE_CACHE_TTL)
+
+
+async def aget_or_build_response(endpoint, request, version, build):
+    """
+    get_cached_response() for async views, with the response data built by
+    ``await build()`` and stored on a miss. Concurrent misses of the same
+    response on this event loop share one build.
+    """
+    if not enabled(endpoint):
+        return await build()
+
+    built = False
+
+    async def load():
+        nonlocal built
+        built = True
+        return await build()
+
+    data = await get_tier('collections').aget_or_set(
+        response_cache_key(request, version), load, timeout=settings.COLLECTION_RESPONSE_CACHE_TTL
+    )
+    await aincr_counters([(STATS_KEY, f"{endpoint}:{'misses' if built else 'hits'}")])
+    return data
+
+
+def response_cache_stats():
+    counts = read_counter_hash(STATS_KEY)
+    return {
+        endpoint: {
+            'enabled': enabled(endpoint),
+            'hits': counts.get(f'{endpoint}:hits', 0),
+            'misses': counts.get(f'{endpoint}:misses', 0),
+        }
+        for endpoint in settings.COLLECTION_RESPONSE_CACHE
+    }
@@ -0,0 +1,94 @@
+import base64
+import json
+import re
+from django.db import connection, connections, router
+from .models import Movie
+
+FTS_TABLE = 'movies_movie_fts'
+
+# bm25() weights of the title, description and genres columns.
+BM25_WEIGHTS = (10.0, 1.0, 4.0)
+
+SEARCH_SQL = f"""
+    WITH matches AS (
+        SELECT m.id, m.uuid, m.title, m.description, m.genres,
+               bm25({FTS_TABLE}, %s, %s, %s) AS score
+        FROM {FTS_TABLE}
+        JOIN movies_movie m ON m.id = {FTS_TABLE}.rowid
+        WHERE {FTS_TABLE} MATCH %s
+    )
+    SELECT id, uuid, title, description, genres, score
+    FROM matches
+    {{after}}
+    ORDER BY score, id
+    LIMIT %s
+"""
+
+
+def is_available():
+    return connection.vendor == 'sqlite'
+
+
+def to_fts_query(q):
+    """
+    Turn free text into an FTS5 query matching every word, the last one as
+    a prefix, so that user input never reaches the FTS5 query syntax.
+    """
+    words = re.findall(r'\w+', q)
+    if not words:
+        return None
+    terms = [f'"{word}"' for word in words]
+    terms[-1] += '*'
+    return ' '.join(terms)
+
+
+def encode_cursor(score, movie_id):
+    return base64.urlsafe_b64encode(json.dumps([score, movie_id]).encode()).decode()
+
+
+def decode_cursor(cursor):
+    try:
+        score, movie_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return float(score), int(movie_id)
+    except (ValueError, TypeError):
+        return None
+
+
+def search_movies(q, after=None, limit=20):
+    """
+    Return up to ``limit`` movies matching ``q`` ranked by BM25, and the
+    cursor of the next page (None on the last one). ``after`` is a
+    ``(score, id)`` cursor position; pages are keyset-paginated on it.
+    """
+    fts_query = to_fts_query(q)
+    if fts_query is None:
+        return [], None
+
+    params = [*BM25_WEIGHTS, fts_query]
+    after_sql = ''
+    if after is not None:
+        after_sql = 'WHERE score > %s OR (score = %s AND id > %s)'
+        params += [after[0], after[0], after[1]]
+    params.append(limit + 1)
+
+    with connections[router.db_for_read(Movie)].cursor() as cursor:
+        cursor.execute(SEARCH_SQL.format(after=after_sql), params)
+        rows = cursor.fetchall()
+
+    movies = [
+        {'uuid': uuid, 'title': title, 'description': description, 'genres': genres}
+        for _, uuid, title, description, genres, _ in rows[:limit]
+    ]
+    next_cursor = None
+    if len(rows) > limit:
+        movie_id, score = rows[limit - 1][0], rows[limit - 1][5]
+        next_cursor = encode_cursor(score, movie_id)
+    return movies, next_cursor
+
+
+def rebuild_search_index():
+    with connection.cursor() as cursor:
+        cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+        cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('optimize')")
+        cursor.execute(f"SELECT count(*) FROM {FTS_TABLE}")
+        return cursor.fetchone()[0]
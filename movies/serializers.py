@@ -1,7 +1,20 @@
 from rest_framework import serializers
 from django.contrib.auth.models import User
+from contextlib import nullcontext
+from django.db import IntegrityError, transaction
+from functools import partial
 import re
 from .models import Collection, Movie
+from .bulk import link_movies
+from .versioning import bump_collection_version
+
+def savepoint_if_needed():
+    """
+    Inside a transaction, a failed INSERT must be rolled back to a savepoint
+    before the transaction can be used again; in autocommit mode it needs
+    nothing, which saves a round trip.
+    """
+    return transaction.atomic() if transaction.get_connection().in_atomic_block else nullcontext()
 
 class RegisterSerializer(serializers.ModelSerializer):
     password = serializers.CharField(
@@ -25,8 +38,7 @@ class RegisterSerializer(serializers.ModelSerializer):
         fields = ['username', 'password']
 
     def validate_username(self, value):
-        if User.objects.filter(username=value).exists():
-            raise serializers.ValidationError("A user with this username already exists.")
+        # Uniqueness is left to the database constraint, see create().
         if not re.match(r'^[a-zA-Z0-9_]+$', value):
             raise serializers.ValidationError(
                 "Username can only contain letters, numbers, and underscores."
@@ -48,19 +60,30 @@ class RegisterSerializer(serializers.ModelSerializer):
         return value
 
     def create(self, validated_data):
-        user = User.objects.create_user(
-            username=validated_data['username'],
-            password=validated_data['password']
-        )
+        try:
+            with savepoint_if_needed():
+                user = User.objects.create_user(
+                    username=validated_data['username'],
+                    password=validated_data['password']
+                )
+        except IntegrityError:
+            if User.objects.filter(username=validated_data['username']).exists():
+                raise serializers.ValidationError({'username': ["A user with this username already exists."]})
+            raise
         return user
 
 class MovieSerializer(serializers.ModelSerializer):
-    uuid = serializers.CharField()
+    uuid = serializers.CharField(max_length=64)
     
     class Meta:
         model = Movie
         fields = ['uuid', 'title', 'description', 'genres']
 
+class CollectionSummarySerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Collection
+        fields = ['uuid', 'title', 'description']
+
 class CollectionSerializer(serializers.ModelSerializer):
     movies = MovieSerializer(many=True, required=False)
 
@@ -68,22 +91,26 @@ class CollectionSerializer(serializers.ModelSerializer):
         model = Collection
         fields = ['uuid', 'title', 'description', 'movies']
 
-    def validate(self, attrs):
-        user = self.context['request'].user
-        title = attrs.get('title')
-
-        if self.context['request'].method == 'POST':
-            if Collection.objects.filter(user=user, title=title).exists():
-                raise serializers.ValidationError({'title': 'A collection with this title already exists.'})
-
-        return attrs
+    def duplicate_title_error(self, user_id, title, pk=None):
+        # Called after an IntegrityError: tell a duplicate title from other failures.
+        # ``pk`` is the collection being updated, which may keep its own title.
+        if Collection.objects.filter(user_id=user_id, title=title).exclude(pk=pk).exists():
+            return serializers.ValidationError({'title': ['A collection with this title already exists.']})
+        return None
 
     def create(self, validated_data):
         movies_data = validated_data.pop('movies', [])
-        
-        collection = Collection.objects.create(**validated_data)
 
-        new_movies_data = []
+        try:
+            with transaction.atomic():
+                collection = Collection.objects.create(**validated_data)
+                transaction.on_commit(partial(bump_collection_version, collection.user_id))
+                linked = link_movies(collection, movies_data) if movies_data else None
+        except IntegrityError:
+            error = self.duplicate_title_error(validated_data['user'].pk, validated_data.get('title'))
+            if error:
+                raise error
+            raise
 
         if not movies_data:
             response_message = {
@@ -91,20 +118,11 @@ class CollectionSerializer(serializers.ModelSerializer):
             }
             return collection, response_message
 
-        for movie_data in movies_data:
-            movie, _ = Movie.objects.get_or_create(
-                uuid=movie_data['uuid'],
-                defaults={'title': movie_data['title'], 'description': movie_data['description'], 'genres': movie_data['genres']}
-            )
-
-            new_movies_data.append(movie.title)
-
         response_message = {
             'collection_uuid': collection.uuid,
             'message': 'Collection created with some new movies.',
-            'new_movies_added': new_movies_data
+            'new_movies_added': [title for title, _ in linked]
         }
-        
 
         return collection, response_message
 
@@ -113,27 +131,25 @@ class CollectionSerializer(serializers.ModelSerializer):
 
         instance.title = validated_data.get('title', instance.title)
         instance.description = validated_data.get('description', instance.description)
-        instance.save()
 
-        already_added_movies = []
-        new_movies_added = []
+        request_method = self.context['request'].method
 
-        if movies_data:
-            request_method = self.context['request'].method
+        try:
+            with transaction.atomic():
+                instance.save()
+                transaction.on_commit(partial(bump_collection_version, instance.user_id))
 
-            if request_method == 'PUT':
-                instance.movies.clear()
+                if movies_data:
+                    linked = link_movies(instance, movies_data, replace=request_method == 'PUT')
+        except IntegrityError:
+            error = self.duplicate_title_error(instance.user_id, instance.title, instance.pk)
+            if error:
+                raise error
+            raise
 
-            for movie_data in movies_data:
-                movie, _ = Movie.objects.get_or_create(
-                    uuid=movie_data['uuid'],
-                    defaults={'title': movie_data['title'], 'description': movie_data['description'], 'genres': movie_data['genres']}
-                )
-                if instance.movies.filter(uuid=movie.uuid).exists():
-                    already_added_movies.append(movie.title)
-                else:
-                    instance.movies.add(movie)
-                    new_movies_added.append(movie.title)
+        if movies_data:
+            new_movies_added = [title for title, added in linked if added]
+            already_added_movies = [title for title, added in linked if not added]
 
             response_message = {
                 'collection_uuid': instance.uuid,
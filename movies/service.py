@@ -1,24 +1,247 @@
+import os
+import threading
+import time
 import requests
+from django.conf import settings
 from requests.adapters import HTTPAdapter
-from urllib3.util.retry import Retry
+from .instrumentation import timed
+
+RETRY_STATUSES = (500, 502, 503, 504)
+
+
+class CircuitBreaker:
+    """
+    Stop calling upstream after ``failure_threshold`` consecutive failures.
+
+    While open every call is rejected until ``reset_timeout`` seconds have
+    passed; then a single trial call is let through (half-open) and its
+    outcome closes or re-opens the breaker.
+    """
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, failure_threshold=5, reset_timeout=30, clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = None
+        self.times_opened = 0
+        self.rejected = 0
+        self._lock = threading.Lock()
+
+    def allow(self):
+        with self._lock:
+            if self.state == self.OPEN and self.clock() - self.opened_at >= self.reset_timeout:
+                self.state = self.HALF_OPEN
+                return True
+            if self.state == self.CLOSED:
+                return True
+            self.rejected += 1
+            return False
+
+    def available(self):
+        """
+        Whether allow() would let a call through now, without changing the
+        state or counting a rejection: closed, or open for at least
+        ``reset_timeout`` seconds.
+        """
+        with self._lock:
+            if self.state == self.OPEN:
+                return self.clock() - self.opened_at >= self.reset_timeout
+            return self.state == self.CLOSED
+
+    def record_success(self):
+        with self._lock:
+            self.state = self.CLOSED
+            self.failures = 0
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    self.times_opened += 1
+                self.state = self.OPEN
+                self.opened_at = self.clock()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'state': self.state,
+                'consecutive_failures': self.failures,
+                'times_opened': self.times_opened,
+                'rejected': self.rejected,
+            }
+
 
 class MovieAPIClient:
-    def __init__(self):
-        self.session = requests.Session()
-        retries = Retry(
-            total=5,
-            backoff_factor=1,
-            status_forcelist=[500, 502, 503, 504],
+    def __init__(self, pool_size=None, connect_timeout=None, read_timeout=None, deadline=None,
+                 retries=None, backoff_factor=None, breaker=None):
+        self.pool_size = pool_size or settings.MOVIES_API_POOL_SIZE
+        self.timeout = (
+            connect_timeout or settings.MOVIES_API_CONNECT_TIMEOUT,
+            read_timeout or settings.MOVIES_API_READ_TIMEOUT,
+        )
+        self.deadline = deadline or settings.MOVIES_API_DEADLINE
+        self.retries = settings.MOVIES_API_RETRIES if retries is None else retries
+        self.backoff_factor = settings.MOVIES_API_BACKOFF if backoff_factor is None else backoff_factor
+        self.breaker = breaker or CircuitBreaker(
+            settings.MOVIES_API_BREAKER_THRESHOLD, settings.MOVIES_API_BREAKER_RESET
         )
-        adapter = HTTPAdapter(max_retries=retries)
-        self.session.mount('http://', adapter)
-        self.session.mount('https://', adapter)
 
-    def fetch_movies(self, url, auth, page=1):
+        self.session = requests.Session()
+        # Retries are done in fetch_movies so that they respect the total deadline.
+        self.adapter = HTTPAdapter(max_retries=0, pool_connections=self.pool_size, pool_maxsize=self.pool_size)
+        self.session.mount('http://', self.adapter)
+        self.session.mount('https://', self.adapter)
+
+        self.requests = 0
+        self.failures = 0
+        self.not_modified = 0
+        self.bytes_saved = 0
+        self.ms_saved = 0.0
+        self._stats_lock = threading.Lock()
+
+    def _count(self, failed):
+        with self._stats_lock:
+            self.requests += 1
+            self.failures += failed
+
+    def _count_not_modified(self, validators, ms):
+        with self._stats_lock:
+            self.not_modified += 1
+            self.bytes_saved += validators.get('bytes', 0)
+            self.ms_saved += validators.get('ms', 0) - ms
+
+    def fetch_movies(self, url, auth, page=1, validators=None):
+        """
+        Fetch one page of movies, or a dict with an ``error`` key.
+
+        With ``validators`` (the ``validators`` of an earlier result), the
+        request is conditional, and an unchanged page returns
+        ``{"not_modified": True}`` instead of its movies. A page that came
+        with an ETag or Last-Modified header carries ``validators``, along
+        with its size and download time to count what a 304 saved.
+        """
+        if not self.breaker.allow():
+            return {"error": "Movie API circuit breaker is open."}
         try:
-            params = {'page': page}
-            response = self.session.get(url, auth=auth, params=params, timeout=10, verify=False)
-            response.raise_for_status()
-            return response.json()
-        except requests.exceptions.RequestException as e:
-            return {"error": str(e)}
+            return self._fetch_movies(url, auth, page, validators)
+        except Exception:
+            # Any outcome must be recorded: a half-open breaker rejects every call until one is.
+            self.breaker.record_failure()
+            raise
+
+    def _fetch_movies(self, url, auth, page, validators):
+        params = {'page': page}
+        headers = {}
+        if validators and validators.get('etag'):
+            headers['If-None-Match'] = validators['etag']
+        if validators and validators.get('last_modified'):
+            headers['If-Modified-Since'] = validators['last_modified']
+        deadline = time.monotonic() + self.deadline
+        error = None
+
+        for attempt in range(self.retries + 1):
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                timeout = (min(self.timeout[0], remaining), min(self.timeout[1], remaining))
+                started = time.perf_counter()
+                with timed('upstream'):
+                    response = self.session.get(
+                        url, auth=auth, params=params, headers=headers, timeout=timeout, verify=False
+                    )
+                ms = (time.perf_counter() - started) * 1000
+                if response.status_code == 304 and headers:
+                    self._count(failed=False)
+                    self._count_not_modified(validators, ms)
+                    self.breaker.record_success()
+                    return {"not_modified": True}
+                if response.status_code not in RETRY_STATUSES:
+                    response.raise_for_status()
+                    # A body that is not a JSON object is counted once, as a client error below.
+                    result = response.json()
+                    if not isinstance(result, dict):
+                        raise requests.exceptions.InvalidJSONError(
+                            f"Expected a JSON object, got {type(result).__name__}", response=response
+                        )
+                    self._count(failed=False)
+                    self.breaker.record_success()
+                    etag, last_modified = response.headers.get('ETag'), response.headers.get('Last-Modified')
+                    if etag or last_modified:
+                        result['validators'] = {
+                            'etag': etag,
+                            'last_modified': last_modified,
+                            'bytes': len(response.content),
+                            'ms': round(ms, 3),
+                        }
+                    return result
+                error = f"{response.status_code} Server Error for url: {response.url}"
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                error = str(e)
+            except requests.exceptions.RequestException as e:
+                # Client errors are not retried and do not mean upstream is down.
+                self._count(failed=False)
+                self.breaker.record_success()
+                return {"error": str(e)}
+
+            self._count(failed=True)
+            if attempt < self.retries:
+                time.sleep(max(0, min(self.backoff_factor * 2 ** attempt, deadline - time.monotonic())))
+
+        self.breaker.record_failure()
+        return {"error": error or "Movie API deadline exceeded."}
+
+    def stats(self):
+        pools = []
+        for key in self.adapter.poolmanager.pools.keys():
+            pool = self.adapter.poolmanager.pools.get(key)
+            if pool is None:
+                continue
+            pools.append({
+                'host': f"{key.key_scheme}://{key.key_host}:{key.key_port}",
+                'connections_opened': pool.num_connections,
+                'requests': pool.num_requests,
+                # urllib3 fills the queue with None up to maxsize; only the rest are open connections.
+                'idle_connections': sum(conn is not None for conn in list(pool.pool.queue)) if pool.pool else 0,
+                'max_size': self.pool_size,
+            })
+        with self._stats_lock:
+            requests_count, failures = self.requests, self.failures
+            revalidation = {
+                'not_modified': self.not_modified,
+                'bytes_saved': self.bytes_saved,
+                'ms_saved': round(self.ms_saved, 1),
+            }
+        return {
+            'requests': requests_count,
+            'failures': failures,
+            'revalidation': revalidation,
+            'pools': pools,
+            'breaker': self.breaker.stats(),
+        }
+
+
+_client = None
+_client_pid = None
+_client_lock = threading.Lock()
+
+
+def get_movie_api_client():
+    """
+    Return the process-wide MovieAPIClient, so that connections to upstream
+    are pooled and reused across requests. A forked worker gets its own.
+    """
+    global _client, _client_pid
+    pid = os.getpid()
+    if _client is None or _client_pid != pid:
+        with _client_lock:
+            if _client is None or _client_pid != pid:
+                _client = MovieAPIClient()
+                _client_pid = pid
+    return _client
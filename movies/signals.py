@@ -0,0 +1,78 @@
+from functools import partial
+from django.conf import settings
+from django.db import transaction
+from django.db.backends.signals import connection_created
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete
+from django.dispatch import receiver
+from .authentication import invalidate_user
+from .models import Collection, Movie
+from .genre_counts import apply_links
+from .instrumentation import install_query_timer
+from .versioning import invalidate_movie_collections
+
+CollectionMovie = Collection.movies.through
+MovieGenre = Movie.genre_list.through
+
+
+@receiver(m2m_changed, sender=CollectionMovie)
+def update_genre_counts_on_links(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'pre_remove', 'pre_clear'):
+        return
+
+    if reverse:
+        links = CollectionMovie.objects.filter(movie=instance)
+        if pk_set is not None:
+            links = links.filter(collection_id__in=pk_set)
+    else:
+        links = CollectionMovie.objects.filter(collection=instance)
+        if pk_set is not None:
+            links = links.filter(movie_id__in=pk_set)
+
+    if action == 'pre_clear' or pk_set:
+        apply_links(links, sign=1 if action == 'post_add' else -1)
+
+
+@receiver(pre_delete, sender=Collection)
+def update_genre_counts_on_collection_delete(sender, instance, **kwargs):
+    apply_links(CollectionMovie.objects.filter(collection=instance), sign=-1)
+
+
+@receiver(pre_delete, sender=Movie)
+def update_genre_counts_on_movie_delete(sender, instance, **kwargs):
+    apply_links(CollectionMovie.objects.filter(movie=instance), sign=-1)
+
+
+@receiver(post_save, sender=Movie)
+def invalidate_collections_on_movie_save(sender, instance, created, **kwargs):
+    if not created:
+        invalidate_movie_collections([instance.pk])
+
+
+@receiver(pre_delete, sender=Movie)
+def invalidate_collections_on_movie_delete(sender, instance, **kwargs):
+    invalidate_movie_collections([instance.pk])
+
+
+@receiver(m2m_changed, sender=MovieGenre)
+def invalidate_collections_on_movie_genres(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'pre_clear'):
+        return
+    if not reverse:
+        invalidate_movie_collections([instance.pk])
+    elif pk_set is not None:
+        invalidate_movie_collections(pk_set)
+    else:
+        invalidate_movie_collections(instance.movies.values_list('pk', flat=True))
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+@receiver(post_delete, sender=settings.AUTH_USER_MODEL)
+def invalidate_cached_user(sender, instance, **kwargs):
+    # Again after commit, in case a request re-cached the old row meanwhile.
+    invalidate_user(instance.pk)
+    transaction.on_commit(partial(invalidate_user, instance.pk))
+
+
+@receiver(connection_created)
+def time_queries(sender, connection, **kwargs):
+    install_query_timer(connection)
@@ -0,0 +1,127 @@
+import json
+from collections.abc import AsyncIterator, Iterator
+from django.http import StreamingHttpResponse
+from rest_framework.renderers import BaseRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+NDJSON = 'application/x-ndjson'
+
+# Encoded pieces are joined into writes of about this many bytes.
+BUFFER_SIZE = 64 * 1024
+
+
+def dumps(value):
+    # Same output as DRF's JSONRenderer with its default settings.
+    return json.dumps(value, cls=JSONEncoder, ensure_ascii=False, allow_nan=False, separators=(',', ':'))
+
+
+class NDJSONRenderer(BaseRenderer):
+    """Renders a list as one JSON document per line, anything else as one line."""
+    media_type = NDJSON
+    format = 'ndjson'
+    charset = None
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        items = data if isinstance(data, list) else [data]
+        return ''.join(dumps(item) + '\n' for item in items).encode()
+
+
+def stream_mode(request):
+    """'ndjson' or 'json' when the response should be streamed, else None."""
+    if request.accepted_renderer.format == NDJSONRenderer.format:
+        return 'ndjson'
+    if request.query_params.get('stream', '').lower() in ('1', 'true', 'yes'):
+        return 'json'
+    return None
+
+
+def iter_json(value):
+    """
+    Encode ``value`` piece by piece. Iterators anywhere in it, such as a
+    queryset's ``.iterator()``, are encoded as arrays while they are consumed.
+    """
+    if isinstance(value, dict):
+        yield '{'
+        for i, (key, item) in enumerate(value.items()):
+            yield f"{',' if i else ''}{dumps(str(key))}:"
+            yield from iter_json(item)
+        yield '}'
+    elif isinstance(value, Iterator):
+        yield '['
+        for i, item in enumerate(value):
+            yield f"{',' if i else ''}{dumps(item)}"
+        yield ']'
+    else:
+        yield dumps(value)
+
+
+async def aiter_json(value):
+    """iter_json() for async views: async iterators, such as ``.aiterator()``, are encoded as arrays."""
+    if isinstance(value, dict):
+        yield '{'
+        for i, (key, item) in enumerate(value.items()):
+            yield f"{',' if i else ''}{dumps(str(key))}:"
+            async for piece in aiter_json(item):
+                yield piece
+        yield '}'
+    elif isinstance(value, AsyncIterator):
+        yield '['
+        i = 0
+        async for item in value:
+            yield f"{',' if i else ''}{dumps(item)}"
+            i += 1
+        yield ']'
+    else:
+        yield dumps(value)
+
+
+def iter_ndjson(items):
+    for item in items:
+        yield dumps(item) + '\n'
+
+
+async def aiter_ndjson(items, first=()):
+    """iter_ndjson() of an async iterator, after the items in ``first``."""
+    for item in first:
+        yield dumps(item) + '\n'
+    async for item in items:
+        yield dumps(item) + '\n'
+
+
+def buffered(pieces, size=BUFFER_SIZE):
+    buffer, length = [], 0
+    for piece in pieces:
+        piece = piece.encode()
+        buffer.append(piece)
+        length += len(piece)
+        if length >= size:
+            yield b''.join(buffer)
+            buffer, length = [], 0
+    if buffer:
+        yield b''.join(buffer)
+
+
+async def abuffered(pieces, size=BUFFER_SIZE):
+    buffer, length = [], 0
+    async for piece in pieces:
+        piece = piece.encode()
+        buffer.append(piece)
+        length += len(piece)
+        if length >= size:
+            yield b''.join(buffer)
+            buffer, length = [], 0
+    if buffer:
+        yield b''.join(buffer)
+
+
+def streaming_response(pieces, mode, headers=None):
+    """
+    A StreamingHttpResponse of ``pieces``. Async pieces make an async
+    response, which ASGI sends as it is read instead of reading it into a
+    list in a thread first.
+    """
+    content_type = NDJSON if mode == 'ndjson' else 'application/json'
+    content = abuffered(pieces) if isinstance(pieces, AsyncIterator) else buffered(pieces)
+    return StreamingHttpResponse(content, content_type=content_type, headers=headers)
@@ -3,3 +3,55 @@ import django
 
 os.environ['DJANGO_SETTINGS_MODULE'] = 'movielist.settings'
 django.setup()
+
+import pytest
+from django.db import connections
+from movies.tiered_cache import clear_local_tiers
+
+# SQL queries each route may run in test_instrumentation.py, with JWT
+# authentication and the collection response cache disabled. Lower a budget
+# when a change saves queries; a change that needs more must raise it here.
+QUERY_BUDGETS = {
+    'POST register': 3,
+    'POST login': 1,
+    'GET movie-list': 0,
+    'GET movie-search': 1,
+    'GET collection-list': 3,
+    'POST collection-list': 18,
+    'GET collection-detail': 2,
+    'PATCH collection-detail': 19,
+    'PUT collection-detail': 24,
+    'DELETE collection-detail': 8,
+}
+
+# Replicas for test_db_router.py, each an in-memory SQLite database that the
+# test run creates and migrates like the default one.
+TEST_REPLICAS = ['test_replica_0', 'test_replica_1']
+
+
+@pytest.fixture(scope='session')
+def django_db_modify_db_settings(django_db_modify_db_settings):
+    for alias in TEST_REPLICAS:
+        connections.settings[alias] = connections.configure_settings({
+            'default': connections.settings['default'],
+            alias: {'ENGINE': 'django.db.backends.sqlite3', 'NAME': ':memory:'},
+        })[alias]
+
+
+@pytest.fixture
+def query_budget(django_assert_max_num_queries):
+    """
+    ``with query_budget('GET collection-list'):`` fails the test, listing the
+    SQL, when the block runs more queries than the route's budget.
+    """
+    def check(route):
+        return django_assert_max_num_queries(QUERY_BUDGETS[route])
+    return check
+
+
+@pytest.fixture(autouse=True)
+def local_cache_tiers():
+    # Tests reset Redis keys directly, behind the back of the local tiers.
+    clear_local_tiers()
+    yield
+    clear_local_tiers()
@@ -0,0 +1,390 @@
+import asyncio
+import base64
+import json
+import time
+from collections.abc import AsyncIterator
+import pytest
+from asgiref.sync import async_to_sync
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import AsyncClient
+from rest_framework import status
+from rest_framework.authentication import BasicAuthentication
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+from movies import page_cache
+from movies import async_views
+from movies.async_views import AsyncCollectionViewSet
+from movies.async_service import AsyncMovieAPIClient, get_async_movie_api_client
+from movies.authentication import CachedJWTAuthentication
+from movies.benchmark.async_fake_upstream import AsyncFakeMovieAPI
+from movies.benchmark.fake_upstream import fake_movie
+from movies.bulk import link_movies
+from movies.models import Collection, UserGenreCount
+from movies.service import CircuitBreaker
+from movies.tiered_cache import get_async_redis
+from movies.versioning import collection_version
+
+PAGE = 9003
+
+
+def run(requests):
+    """async_to_sync(requests)(), closing the loop's Redis and upstream connections before the loop is closed."""
+    async def main():
+        try:
+            return await requests()
+        finally:
+            await get_async_redis().aclose()
+            await get_async_movie_api_client().aclose()
+    return async_to_sync(main)()
+
+
+def test_hundreds_of_fetches_in_flight_over_a_shared_pool():
+    async def fetch_all():
+        async with AsyncFakeMovieAPI(latency=0.2) as upstream:
+            async with AsyncMovieAPIClient(pool_size=250, retries=0) as client:
+                started = time.monotonic()
+                results = await asyncio.gather(*(client.fetch_movies(upstream.url, ("u", "p"), page % 50 + 1) for page in range(250)))
+                elapsed = time.monotonic() - started
+                await asyncio.gather(*(client.fetch_movies(upstream.url, ("u", "p")) for _ in range(250)))
+                return upstream, client, results, elapsed
+
+    upstream, client, results, elapsed = asyncio.run(fetch_all())
+    assert elapsed < 2
+    assert upstream.max_in_flight == 250
+    assert [movie["uuid"] for movie in results[1]["results"]][:1] == ["fake-10"]
+    assert all(result["count"] == 1000 for result in results)
+    # The second batch reused the first batch's connections.
+    assert client.stats()["pool"]["connections_opened"] == upstream.connections == 250
+    assert client.stats()["requests"] == 500
+
+
+def test_retries_with_backoff_until_the_breaker_opens():
+    async def fetch():
+        async with AsyncFakeMovieAPI(statuses=[503, 502]) as upstream:
+            async with AsyncMovieAPIClient(retries=3, backoff_factor=0) as client:
+                page = await client.fetch_movies(upstream.url, None, 2)
+                revalidated = await client.fetch_movies(upstream.url, None, 2, validators=page["validators"])
+
+            async with AsyncMovieAPIClient(retries=1, backoff_factor=0) as failing:
+                failing.breaker.failure_threshold = 1
+                upstream.statuses = [500, 500]
+                error = await failing.fetch_movies(upstream.url, None)
+                rejected = await failing.fetch_movies(upstream.url, None)
+            return client, page, revalidated, error, rejected
+
+    client, page, revalidated, error, rejected = asyncio.run(fetch())
+    assert page["results"][0] == fake_movie(10)
+    assert revalidated == {"not_modified": True}
+    assert client.stats()["failures"] == 2
+    assert client.stats()["revalidation"]["bytes_saved"] == page["validators"]["bytes"]
+    assert error == {"error": "500 Server Error for url: " + error["error"].split("url: ")[1]}
+    assert rejected == {"error": "Movie API circuit breaker is open."}
+
+
+def test_deadline_bounds_retries():
+    async def fetch():
+        async with AsyncMovieAPIClient(retries=10, backoff_factor=1, deadline=0.5, connect_timeout=0.2) as client:
+            return await client.fetch_movies("http://127.0.0.1:9/", None)
+
+    started = time.monotonic()
+    # Port 9 (discard) is closed locally, so every attempt fails.
+    assert "error" in asyncio.run(fetch())
+    assert time.monotonic() - started < 1.5
+
+
+def test_stale_page_is_refreshed_once_the_breaker_may_close(settings):
+    async def refresh():
+        async with AsyncFakeMovieAPI(catalog_size=PAGE * 10) as upstream:
+            settings.EXTERNAL_MOVIES_API_URL = upstream.url
+            entry = await page_cache.afetch_page(PAGE)
+            del entry["validators"]
+            await page_cache.astore_page(PAGE, dict(entry, count=0), soft_ttl=-1)
+            now = [0]
+            client = get_async_movie_api_client()
+            client.breaker = CircuitBreaker(failure_threshold=1, reset_timeout=30, clock=lambda: now[0])
+            client.breaker.record_failure()
+
+            rejected = await page_cache.aget_movies_page(PAGE)
+            refreshes = len(page_cache._refreshes)
+            now[0] = 31
+            stale = await page_cache.aget_movies_page(PAGE)
+            await asyncio.gather(*page_cache._refreshes)
+            fresh = await page_cache.get_tier('movies').aget(page_cache.page_cache_key(PAGE))
+            return upstream, rejected, refreshes, stale, fresh
+
+    try:
+        upstream, rejected, refreshes, stale, fresh = run(refresh)
+    finally:
+        cache.delete(page_cache.page_cache_key(PAGE))
+
+    assert rejected["count"] == 0 and refreshes == 0
+    assert stale["count"] == 0
+    assert fresh["count"] == PAGE * 10
+    assert upstream.requests == 2
+
+
+def test_concurrent_misses_of_a_page_share_one_fetch(settings, monkeypatch):
+    locks = []
+    alock = page_cache._alock
+    monkeypatch.setattr(page_cache, '_alock', lambda page: locks.append(page) or alock(page))
+
+    async def fetch_all():
+        async with AsyncFakeMovieAPI(catalog_size=PAGE * 10, latency=0.05) as upstream:
+            settings.EXTERNAL_MOVIES_API_URL = upstream.url
+            pages = await asyncio.gather(*(page_cache.aget_movies_page(PAGE) for _ in range(20)))
+            return upstream, pages
+
+    try:
+        upstream, pages = run(fetch_all)
+    finally:
+        cache.delete_many([page_cache.page_cache_key(PAGE), page_cache.fresh_until_key(PAGE)])
+
+    # The other misses waited for the first one's fetch, without polling the Redis lock.
+    assert upstream.requests == 1 and locks == [PAGE]
+    assert all(page == pages[0] for page in pages) and pages[0]["count"] == PAGE * 10
+
+
+@pytest.mark.urls('movielist.async_urls')
+@pytest.mark.django_db
+def test_async_movie_list_view(settings):
+    user = User.objects.create_user(username="asyncuser", password="testpassword")
+    token = str(RefreshToken.for_user(user).access_token)
+
+    async def requests():
+        async with AsyncFakeMovieAPI(catalog_size=PAGE * 10) as upstream:
+            settings.EXTERNAL_MOVIES_API_URL = upstream.url
+            client = AsyncClient()
+            headers = {'Authorization': f'Bearer {token}'}
+            first = await client.get('/movies/', {'page': PAGE}, headers=headers)
+            second = await client.get('/movies/', {'page': PAGE}, headers=headers)
+            conditional = await client.get('/movies/', {'page': PAGE}, headers={**headers, 'If-None-Match': first['ETag']})
+            anonymous = await client.get('/movies/')
+            return upstream, first, second, conditional, anonymous
+
+    try:
+        upstream, first, second, conditional, anonymous = run(requests)
+    finally:
+        cache.delete(page_cache.page_cache_key(PAGE))
+
+    assert first.status_code == status.HTTP_200_OK
+    body = first.json()
+    assert body["page"] == PAGE and body["count"] == PAGE * 10
+    assert body["movies"][0] == fake_movie((PAGE - 1) * 10)
+    assert 'upstream;dur=' in first['Server-Timing']
+    assert second.content == first.content
+    assert upstream.requests == 1
+    assert conditional.status_code == status.HTTP_304_NOT_MODIFIED
+    assert anonymous.status_code == status.HTTP_401_UNAUTHORIZED
+    assert anonymous.json() == {"detail": "Authentication credentials were not provided."}
+    assert anonymous['WWW-Authenticate'].startswith('Bearer')
+
+
+@pytest.fixture
+def owner():
+    owner = User.objects.create_user(username="asyncowner", password="testpassword")
+    for i in range(3):
+        collection = Collection.objects.create(user=owner, title=f"Collection {i}", description="Async")
+        link_movies(collection, [
+            {"uuid": f"async-{i}-{j}", "title": f"Movie {j}", "description": "", "genres": "Drama" if j else "Action"}
+            for j in range(i + 1)
+        ])
+    return owner
+
+
+def bearer(user):
+    return {'Authorization': f'Bearer {RefreshToken.for_user(user).access_token}'}
+
+
+def get_all(paths, headers):
+    async def requests():
+        client = AsyncClient()
+        return [await client.get(path, headers=headers) for path in paths]
+    return run(requests)
+
+
+def get_streamed(paths, headers):
+    """Streamed responses and their bodies, each read on the event loop as ASGI does."""
+    async def requests():
+        client = AsyncClient()
+        streamed = []
+        for path in paths:
+            response = await client.get(path, headers=headers)
+            assert isinstance(response.streaming_content, AsyncIterator), path
+            streamed.append((response, b''.join([chunk async for chunk in response.streaming_content])))
+        return streamed
+    return run(requests)
+
+
+@pytest.mark.parametrize('serializers', ['fast', 'standard'])
+@pytest.mark.django_db
+def test_async_collection_reads_match_the_viewset(settings, owner, serializers):
+    settings.READ_SERIALIZERS = serializers
+    settings.COLLECTION_RESPONSE_CACHE = {'list': False, 'retrieve': False}
+    headers = bearer(owner)
+    client = APIClient()
+    client.credentials(HTTP_AUTHORIZATION=headers['Authorization'])
+
+    collection_uuid = Collection.objects.filter(user=owner).first().uuid
+    paths = [
+        '/collection/', '/collection/?include_movies=false', '/collection/?genre=Drama',
+        f'/collection/{collection_uuid}/', f'/collection/{collection_uuid}/?genre=Drama',
+    ]
+    page = client.get('/collection/', {'page_size': 2}).data['data']
+    paths += [page['next'], client.get(page['next']).data['data']['previous']]
+    expected = [client.get(path) for path in paths]
+
+    settings.ROOT_URLCONF = 'movielist.async_urls'
+    for path, sync_response, async_response in zip(paths, expected, get_all(paths, headers)):
+        assert async_response.status_code == sync_response.status_code == status.HTTP_200_OK, path
+        assert async_response.content == sync_response.content, path
+        assert async_response['ETag'] == sync_response['ETag'], path
+
+
+@pytest.mark.urls('movielist.async_urls')
+@pytest.mark.django_db
+def test_async_collection_writes(owner):
+    headers = bearer(owner)
+    version = collection_version(owner.pk)
+    movie = {"uuid": "async-new", "title": "New movie", "description": "New", "genres": "Comedy"}
+    shared = {"uuid": "async-1-0", "title": "Movie 0", "description": "Shared", "genres": "Action"}
+
+    async def requests():
+        client = AsyncClient()
+
+        async def send(method, url, data):
+            return await getattr(client, method)(url, data, content_type='application/json', headers=headers)
+
+        created = await send('post', '/collection/', {"title": "Async", "description": "New", "movies": [movie]})
+        duplicate = await send('post', '/collection/', {"title": "Async", "description": "Again"})
+        url = f"/collection/{created.json()['collection_uuid']}/"
+        patched = await send('patch', url, {"movies": [movie, shared]})
+        invalid = await send('patch', url, '{"title":')
+        deleted = await client.delete(url, headers=headers)
+        missing = await client.get(url, headers=headers)
+        return created, duplicate, patched, invalid, deleted, missing
+
+    created, duplicate, patched, invalid, deleted, missing = run(requests)
+    assert created.status_code == status.HTTP_201_CREATED
+    assert created.json()["new_movies_added"] == ["New movie"]
+    assert duplicate.status_code == status.HTTP_400_BAD_REQUEST
+    assert duplicate.json() == {"title": ["A collection with this title already exists."]}
+    assert patched.status_code == status.HTTP_200_OK
+    assert patched.json()["new_movies_added"] == ["Movie 0"]
+    assert patched.json()["already_added_movies"] == ["New movie"]
+    assert invalid.status_code == status.HTTP_400_BAD_REQUEST
+    assert invalid.json()["detail"].startswith("JSON parse error")
+    assert deleted.status_code == status.HTTP_204_NO_CONTENT
+    assert missing.status_code == status.HTTP_404_NOT_FOUND
+    assert missing.json() == {"detail": "No Collection matches the given query."}
+    assert collection_version(owner.pk) > version
+    assert not Collection.objects.filter(title="Async").exists()
+    assert dict(UserGenreCount.objects.filter(user=owner).values_list('genre', 'count')) == {"Action": 3, "Drama": 3}
+
+
+@pytest.mark.urls('movielist.async_urls')
+@pytest.mark.django_db
+def test_async_collection_views_render_other_formats(owner):
+    ndjson, body = get_streamed(['/collection/?include_movies=false'], {**bearer(owner), 'Accept': 'application/x-ndjson'})[0]
+    html = get_all(['/collection/'], {**bearer(owner), 'Accept': 'text/html'})[0]
+    anonymous = get_all(['/collection/'], {})[0]
+
+    lines = body.decode().splitlines()
+    assert ndjson['Content-Type'] == 'application/x-ndjson'
+    assert [json.loads(line)["title"] for line in lines] == ["Collection 0", "Collection 1", "Collection 2"]
+    assert html.status_code == status.HTTP_200_OK
+    assert html['Content-Type'].startswith('text/html') and b'Collection 2' in html.content
+    assert anonymous.status_code == status.HTTP_401_UNAUTHORIZED
+    assert anonymous['WWW-Authenticate'].startswith('Bearer')
+
+
+@pytest.mark.urls('movielist.async_urls')
+@pytest.mark.django_db
+def test_authenticators_without_aauthenticate_run_in_a_thread(monkeypatch, owner):
+    # BasicAuthentication looks the user up with the synchronous ORM.
+    monkeypatch.setattr(AsyncCollectionViewSet, 'authentication_classes', [BasicAuthentication])
+    credentials = base64.b64encode(b'asyncowner:testpassword').decode()
+
+    response = get_all(['/collection/'], {'Authorization': f'Basic {credentials}'})[0]
+    anonymous = get_all(['/collection/'], {})[0]
+    assert response.status_code == status.HTTP_200_OK
+    assert len(response.json()["data"]["collections"]) == 3
+    assert anonymous.status_code == status.HTTP_401_UNAUTHORIZED
+
+
+@pytest.mark.django_db
+def test_async_streamed_responses_match_the_viewset(settings, owner):
+    headers = bearer(owner)
+    client = APIClient()
+    client.credentials(HTTP_AUTHORIZATION=headers['Authorization'])
+
+    collection_uuid = Collection.objects.filter(user=owner).last().uuid
+    paths = ['/collection/?stream=1', f'/collection/{collection_uuid}/?stream=1']
+    expected = [b''.join(client.get(path).streaming_content) for path in paths]
+    ndjson = b''.join(client.get(paths[1], HTTP_ACCEPT='application/x-ndjson').streaming_content)
+
+    settings.ROOT_URLCONF = 'movielist.async_urls'
+    assert [body for _, body in get_streamed(paths, headers)] == expected
+    assert [body for _, body in get_streamed(paths[1:], {**headers, 'Accept': 'application/x-ndjson'})] == [ndjson]
+
+
+@pytest.mark.urls('movielist.async_urls')
+@pytest.mark.django_db
+def test_concurrent_async_reads_share_one_build(settings, monkeypatch, owner):
+    settings.COLLECTION_RESPONSE_CACHE = {'list': True, 'retrieve': True}
+    cache.delete_pattern('collection_response:*')
+    headers = bearer(owner)
+    calls = []
+
+    def counted(method):
+        async def wrapper(*args, **kwargs):
+            calls.append(method.__name__)
+            return await method(*args, **kwargs)
+        return wrapper
+
+    monkeypatch.setattr(AsyncCollectionViewSet, 'alist_data', counted(AsyncCollectionViewSet.alist_data))
+    monkeypatch.setattr(CachedJWTAuthentication, 'aload_values', counted(CachedJWTAuthentication.aload_values))
+
+    async def requests():
+        client = AsyncClient()
+        return await asyncio.gather(*(client.get('/collection/', headers=headers) for _ in range(10)))
+
+    responses = run(requests)
+    assert [response.status_code for response in responses] == [status.HTTP_200_OK] * 10
+    assert len({response.content for response in responses}) == 1
+    assert sorted(calls) == ['alist_data', 'aload_values']
+
+
+@pytest.mark.urls('movielist.async_urls')
+@pytest.mark.django_db
+def test_concurrent_async_writes_take_turns(settings, monkeypatch, owner):
+    settings.ASYNC_DB_WRITERS = 1
+    write_slot = async_views.write_slot
+    writing = []
+    peak = []
+
+    class CountedSlot:
+        async def __aenter__(self):
+            self.slot = write_slot()
+            await self.slot.acquire()
+            writing.append(self)
+            peak.append(len(writing))
+
+        async def __aexit__(self, *exc_info):
+            writing.remove(self)
+            self.slot.release()
+
+    monkeypatch.setattr(async_views, 'write_slot', CountedSlot)
+    headers = bearer(owner)
+
+    async def requests():
+        client = AsyncClient()
+        return await asyncio.gather(*(
+            client.post('/collection/', {"title": f"Turn {i}", "description": "Concurrent"}, content_type='application/json', headers=headers)
+            for i in range(5)
+        ))
+
+    responses = run(requests)
+    assert [response.status_code for response in responses] == [status.HTTP_201_CREATED] * 5
+    assert Collection.objects.filter(user=owner, title__startswith="Turn").count() == 5
+    assert peak == [1] * 5
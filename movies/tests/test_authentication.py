@@ -0,0 +1,75 @@
+import pytest
+from django.contrib.auth.models import User
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+from movies import views
+from movies.authentication import user_cache_key
+from movies.tiered_cache import get_tier
+
+
+@pytest.fixture
+def user():
+    return User.objects.create_user(username="testuser", password="testpassword")
+
+
+@pytest.fixture
+def client(user, monkeypatch):
+    monkeypatch.setattr(views, 'get_movies_page', lambda page: {"count": 0, "movies": []})
+    client = APIClient()
+    client.credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(user).access_token}')
+    return client
+
+
+@pytest.mark.django_db
+def test_users_are_resolved_from_cache_until_saved(client, user, django_assert_num_queries):
+    url = reverse('movie-list')
+    with django_assert_num_queries(1):
+        assert client.get(url).status_code == status.HTTP_200_OK
+    with django_assert_num_queries(0):
+        assert client.get(url).status_code == status.HTTP_200_OK
+    assert set(get_tier('users').get(user_cache_key(user.pk))) == {
+        'id', 'username', 'is_active', 'is_staff', 'is_superuser'
+    }
+
+    user.is_active = False
+    user.save()
+    assert client.get(url).status_code == status.HTTP_401_UNAUTHORIZED
+
+
+@pytest.mark.django_db
+def test_trusted_claims_skip_the_lookup_for_safe_requests(client, user, settings, django_assert_num_queries):
+    settings.AUTH_TRUST_TOKEN_CLAIMS = True
+    user.is_active = False
+    user.save()
+
+    with django_assert_num_queries(0):
+        assert client.get(reverse('movie-list')).status_code == status.HTTP_200_OK
+
+    response = client.post(reverse('collection-list'), {"title": "T", "description": "D"}, format='json')
+    assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+
+
+@pytest.mark.django_db
+def test_revoke_checks_use_the_cached_password_md5(user, monkeypatch, django_assert_num_queries):
+    # simplejwt's modules share one api_settings object, which SIMPLE_JWT overrides would replace.
+    monkeypatch.setattr(api_settings, 'CHECK_REVOKE_TOKEN', True)
+    monkeypatch.setattr(views, 'get_movies_page', lambda page: {"count": 0, "movies": []})
+    client = APIClient()
+    client.credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(user).access_token}')
+    url = reverse('movie-list')
+
+    with django_assert_num_queries(1):
+        assert client.get(url).status_code == status.HTTP_200_OK
+    with django_assert_num_queries(0):
+        assert client.get(url).status_code == status.HTTP_200_OK
+    assert 'password' not in get_tier('users').get(user_cache_key(user.pk))
+
+    user.set_password('changed')
+    user.save()
+    response = client.get(url)
+    assert response.status_code == status.HTTP_401_UNAUTHORIZED
+    assert response.data['code'] == 'password_changed'
@@ -0,0 +1,70 @@
+import pytest
+import requests
+from django.core.cache import cache
+from django.db import connection
+from movies.benchmark import runner
+from movies.benchmark.asgi import ENDPOINTS, run_asgi_benchmark
+from movies.benchmark.fake_upstream import FakeMovieAPI
+from movies.counters import REQUEST_COUNT_KEY, count_request, get_redis, read_request_count
+
+
+def test_fake_upstream_pages_and_errors():
+    with FakeMovieAPI(catalog_size=25, page_size=10) as upstream:
+        page = requests.get(upstream.url, params={'page': 3}).json()
+        assert page["count"] == 25
+        assert [movie["uuid"] for movie in page["results"]] == ["fake-20", "fake-21", "fake-22", "fake-23", "fake-24"]
+        assert requests.get(upstream.url, params={'page': 4}).status_code == 404
+
+    with FakeMovieAPI(error_rate=1) as upstream:
+        assert requests.get(upstream.url).status_code == 500
+        assert upstream.requests == 1
+
+
+@pytest.mark.django_db(transaction=True)
+def test_run_benchmark_and_compare(settings):
+    settings.CACHES = {'default': {**settings.CACHES['default'], 'KEY_PREFIX': 'test-benchmark'}}
+    with FakeMovieAPI() as upstream:
+        settings.EXTERNAL_MOVIES_API_URL = upstream.url
+        try:
+            results = runner.run_benchmark([3], requests=2, concurrency=1, catalog_pages=2)
+        finally:
+            cache.delete_pattern('*')
+
+    endpoints = results["scenarios"]["3"]
+    assert list(endpoints) == list(runner.ENDPOINTS)
+    assert all(stats["errors"] == 0 for stats in endpoints.values())
+    assert endpoints["collection-list"]["queries_max"] > 0
+    assert runner.compare(results, results) == []
+
+    slower = {"scenarios": {"3": {"login": {**endpoints["login"], "p99_ms": endpoints["login"]["p99_ms"] * 2}}}}
+    assert runner.compare(slower, results) == [
+        f"3 collections / login: p99 {endpoints['login']['p99_ms']}ms -> {endpoints['login']['p99_ms'] * 2}ms"
+    ]
+
+
+@pytest.mark.django_db(transaction=True)
+def test_run_asgi_benchmark(settings):
+    settings.CACHES = {'default': {**settings.CACHES['default'], 'KEY_PREFIX': 'test-asgi-benchmark'}}
+    try:
+        # One at a time: SQLite's shared in-memory test database does not wait on locks.
+        results = run_asgi_benchmark(3, requests=2, concurrency=1, catalog_pages=2, upstream_latency=0)
+    finally:
+        cache.delete_pattern('*')
+
+    assert list(results["modes"]) == ["sync", "async"]
+    for endpoints in results["modes"].values():
+        assert list(endpoints) == list(ENDPOINTS)
+        assert all(stats["errors"] == 0 and stats["max_in_flight"] == 1 for stats in endpoints.values())
+
+
+def test_benchmark_environment_keeps_request_counts_apart():
+    options = dict(connection.settings_dict['OPTIONS'])
+    before = read_request_count()
+    with runner.benchmark_environment(use_current_db=True):
+        count_request()
+        assert read_request_count() >= 1
+        benchmark_redis = get_redis()
+
+    assert read_request_count() == before
+    assert benchmark_redis.get(REQUEST_COUNT_KEY) is None
+    assert connection.settings_dict['OPTIONS'] == options
@@ -0,0 +1,96 @@
+import pytest
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+from movies import views
+from movies.catalog import get_mirrored_page, sync_catalog
+from movies.genre_counts import compute_genre_counts, stored_genre_counts
+from movies.models import CatalogSyncState, Collection, Movie
+from movies.service import MovieAPIClient
+
+PAGE_SIZE = 10
+
+
+class FakeCatalog:
+    def __init__(self, size=25):
+        self.movies = [
+            {"uuid": f"m{i}", "title": f"Movie {i}", "description": "D", "genres": "Drama"}
+            for i in range(size)
+        ]
+        self.calls = []
+        self.fail_on = None
+
+    def __call__(self, url, auth, page=1):
+        self.calls.append(page)
+        if page == self.fail_on:
+            return {"error": "boom"}
+        start = (page - 1) * PAGE_SIZE
+        return {"count": len(self.movies), "results": self.movies[start:start + PAGE_SIZE]}
+
+
+@pytest.fixture
+def upstream(monkeypatch):
+    catalog = FakeCatalog()
+    monkeypatch.setattr(MovieAPIClient, 'fetch_movies', catalog)
+    return catalog
+
+
+@pytest.mark.django_db
+def test_sync_resumes_from_checkpoint(upstream):
+    upstream.fail_on = 2
+    with pytest.raises(CommandError):
+        call_command('sync_movies')
+    assert CatalogSyncState.load().next_page == 2
+    assert get_mirrored_page(2) is None
+
+    upstream.fail_on = None
+    summary = sync_catalog(max_pages=1)
+    assert summary == {'first_page': 2, 'pages': 1, 'movies': 10, 'error': None, 'completed': False}
+
+    call_command('sync_movies')
+    state = CatalogSyncState.load()
+    assert (state.synced_through_page, state.next_page, state.total_count) == (3, 1, 25)
+    assert upstream.calls == [1, 2, 2, 3]
+
+    page = get_mirrored_page(3)
+    assert page["count"] == 25
+    assert [movie["uuid"] for movie in page["movies"]] == ["m20", "m21", "m22", "m23", "m24"]
+    assert list(page["movies"][0]) == ["uuid", "title", "description", "genres"]
+
+
+@pytest.mark.django_db
+def test_sync_updates_changed_movies(upstream):
+    user = User.objects.create_user(username="testuser", password="testpassword")
+    collection = Collection.objects.create(user=user, title="Mine", description="D")
+    sync_catalog()
+    collection.movies.add(Movie.objects.get(uuid="m1"))
+
+    upstream.movies[1] = {"uuid": "m1", "title": "Renamed", "description": "D", "genres": "Comedy"}
+    upstream.movies.insert(0, {"uuid": "new", "title": "New", "description": "D", "genres": "Drama"})
+    sync_catalog()
+
+    movie = Movie.objects.get(uuid="m1")
+    assert (movie.title, movie.upstream_position) == ("Renamed", 2)
+    assert list(movie.genre_list.values_list('name', flat=True)) == ["Comedy"]
+    assert stored_genre_counts([user.id]) == compute_genre_counts([user.id])
+    assert [m["uuid"] for m in get_mirrored_page(1)["movies"]][:3] == ["new", "m0", "m1"]
+
+
+@pytest.mark.django_db
+def test_movie_list_serves_mirror_and_falls_back_upstream(upstream, settings, monkeypatch):
+    settings.MOVIES_SOURCE = 'mirror'
+    sync_catalog(max_pages=1)
+    client = APIClient()
+    client.force_authenticate(user=User.objects.create_user(username="testuser", password="testpassword"))
+
+    response = client.get(reverse('movie-list'), {'page': 1})
+    assert response.status_code == status.HTTP_200_OK
+    assert response.data["count"] == 25
+    assert response.data["movies"][0] == {"uuid": "m0", "title": "Movie 0", "description": "D", "genres": "Drama"}
+
+    monkeypatch.setattr(views, 'get_movies_page', lambda page: {"count": 25, "movies": [{"uuid": "upstream"}]})
+    response = client.get(reverse('movie-list'), {'page': 2})
+    assert response.data["movies"] == [{"uuid": "upstream"}]
@@ -0,0 +1,108 @@
+from types import SimpleNamespace
+import pytest
+import redis
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+from movies.counters import BufferedCounter, get_redis
+from movies import metrics
+from movies.metrics import LATENCY_BOUNDS_MS, current_minute, latency_bucket, percentile
+
+
+@pytest.fixture
+def client():
+    return APIClient()
+
+
+def test_buffered_counter_flushes_in_one_pipeline():
+    counter = BufferedCounter(flush_interval=60, flush_every=1000)
+    get_redis().delete('test_counter_a', 'test_counter_b')
+    for _ in range(5):
+        counter.incr('test_counter_a')
+    counter.incr('test_counter_b', 3)
+
+    assert get_redis().get('test_counter_a') is None
+    assert counter.flush()
+    assert int(get_redis().get('test_counter_a')) == 5
+    assert int(get_redis().get('test_counter_b')) == 3
+    counter.stop()
+    get_redis().delete('test_counter_a', 'test_counter_b')
+
+
+def test_buffered_counter_keeps_counts_while_redis_is_down():
+    down = redis.StrictRedis(host='127.0.0.1', port=9, socket_connect_timeout=0.1)
+    counter = BufferedCounter(flush_interval=60, flush_every=1000, redis_client=down)
+    get_redis().delete('test_counter_a', 'test_counter_b')
+    counter.incr('test_counter_a', 2)
+    counter.incr('test_counter_b')
+    counter.incr('test_counter_b')
+
+    assert not counter.flush()
+    assert counter.pending['test_counter_a', None] == 2
+    assert counter.pending_total == 3
+    assert counter.flush_errors == 1
+    counter.redis_client = None
+    counter.stop()
+    assert int(get_redis().get('test_counter_a')) == 2
+    assert int(get_redis().get('test_counter_b')) == 2
+    get_redis().delete('test_counter_a', 'test_counter_b')
+
+
+@pytest.mark.django_db
+def test_request_count_and_reset(client):
+    response = client.post(reverse('reset_request_count'))
+    assert response.status_code == status.HTTP_200_OK
+
+    for _ in range(3):
+        client.get(reverse('upstream_stats'))
+
+    response = client.get(reverse('request_count'))
+    assert response.status_code == status.HTTP_200_OK
+    assert response.data['requests'] == 4
+
+
+@pytest.mark.django_db
+def test_requests_are_served_while_redis_is_down(client, monkeypatch):
+    def unavailable():
+        raise redis.exceptions.ConnectionError("Redis is down")
+
+    monkeypatch.setattr('movies.counters.get_redis', unavailable)
+    response = client.get(reverse('upstream_stats'))
+    assert response.status_code == status.HTTP_200_OK
+    response = client.get(reverse('request_count'))
+    assert response.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+
+
+def test_latency_buckets_are_log_scaled():
+    assert latency_bucket(0.3) == 0
+    assert LATENCY_BOUNDS_MS[latency_bucket(3)] >= 3 > LATENCY_BOUNDS_MS[latency_bucket(3) - 1]
+    assert latency_bucket(10 ** 9) == len(LATENCY_BOUNDS_MS) - 1
+    histogram = {latency_bucket(10): 90, latency_bucket(500): 10}
+    assert percentile(histogram, 50) == round(LATENCY_BOUNDS_MS[latency_bucket(10)], 1)
+    assert percentile(histogram, 99) == round(LATENCY_BOUNDS_MS[latency_bucket(500)], 1)
+
+
+@pytest.mark.django_db
+def test_request_count_reports_rates_and_latencies(client, monkeypatch):
+    # Half a minute into the current minute.
+    now = current_minute() * 60 + 30
+    monkeypatch.setattr(metrics, 'time', SimpleNamespace(time=lambda: now))
+    client.post(reverse('reset_request_count'))
+    for _ in range(3):
+        client.get(reverse('upstream_stats'))
+    client.get('/does-not-exist/')
+
+    windows = client.get(reverse('request_count')).data['windows']
+    assert set(windows) == {'1m', '5m', '60m'}
+    route = windows['5m']['routes']['GET upstream_stats']
+    assert route['requests'] == 3
+    assert route['status'] == {'2xx': 3}
+    assert route['rate'] == round(3 / 270, 3)
+    assert windows['1m']['routes']['GET upstream_stats']['rate'] == round(3 / 30, 3)
+    assert route['latency_ms']['p50'] is not None
+    assert windows['60m']['routes']['GET unmatched']['status'] == {'4xx': 1}
+    assert windows['5m']['requests'] == 5
+
+    client.post(reverse('reset_request_count'))
+    windows = client.get(reverse('request_count')).data['windows']
+    assert list(windows['60m']['routes']) == ['POST reset_request_count']
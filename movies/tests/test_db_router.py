@@ -0,0 +1,81 @@
+import pytest
+from asgiref.sync import async_to_sync
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import AsyncClient
+from django.urls import reverse
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+from movies.db_router import health, pin_key
+from movies.models import Collection
+from movies.tiered_cache import get_async_redis
+from .conftest import TEST_REPLICAS
+
+
+@pytest.fixture
+def client(settings):
+    settings.COLLECTION_RESPONSE_CACHE = {'list': False, 'retrieve': False}
+    settings.DATABASE_REPLICAS = TEST_REPLICAS
+    user = User.objects.create_user(username="testuser", password="testpassword")
+    cache.delete(pin_key(user.pk))
+    health.reset()
+    for alias in TEST_REPLICAS:
+        replica_user = User.objects.using(alias).create(pk=user.pk, username=user.username)
+        Collection.objects.using(alias).create(user=replica_user, title=f"On {alias}", description="D")
+
+    client = APIClient()
+    client.force_authenticate(user=user)
+    yield client
+    health.reset()
+
+
+def titles(client):
+    return [c['title'] for c in client.get(reverse('collection-list')).data['data']['collections']]
+
+
+@pytest.mark.django_db(databases=['default', *TEST_REPLICAS])
+def test_reads_rotate_over_replicas_and_writes_pin_to_primary(client):
+    assert sorted(titles(client)[0] for _ in range(2)) == ["On test_replica_0", "On test_replica_1"]
+
+    response = client.post(reverse('collection-list'), {"title": "On primary", "description": "D"}, format='json')
+    assert response.status_code == 201
+    assert not Collection.objects.using('test_replica_0').filter(title="On primary").exists()
+    assert titles(client) == ["On primary"]
+
+
+@pytest.mark.django_db(databases=['default', *TEST_REPLICAS])
+def test_unhealthy_replicas_are_skipped(client, settings):
+    settings.REPLICA_HEALTH_CHECK_QUERY = "SELECT 1 FROM missing_table"
+    assert health.is_healthy('test_replica_0') is False
+
+    # The failed check is remembered for REPLICA_HEALTH_CHECK_INTERVAL.
+    settings.REPLICA_HEALTH_CHECK_QUERY = "SELECT 1 FROM django_migrations LIMIT 1"
+    assert [titles(client) for _ in range(2)] == [["On test_replica_1"]] * 2
+    assert health.is_healthy('test_replica_0') is False
+
+    settings.DATABASE_REPLICAS = ['test_replica_0']
+    assert titles(client) == []
+
+
+@pytest.mark.urls('movielist.async_urls')
+@pytest.mark.django_db(databases=['default', *TEST_REPLICAS])
+def test_async_views_read_from_replicas(client):
+    user = User.objects.get(username="testuser")
+    headers = {'Authorization': f'Bearer {RefreshToken.for_user(user).access_token}'}
+
+    async def requests():
+        client = AsyncClient()
+        try:
+            reads = [await client.get('/collection/', headers=headers) for _ in range(2)]
+            created = await client.post('/collection/', {"title": "On primary", "description": "D"},
+                                        content_type='application/json', headers=headers)
+            pinned = await client.get('/collection/', headers=headers)
+        finally:
+            await get_async_redis().aclose()
+        return reads, created, pinned
+
+    reads, created, pinned = async_to_sync(requests)()
+    async_titles = [[c['title'] for c in response.json()['data']['collections']] for response in [*reads, pinned]]
+    assert sorted(async_titles[0] + async_titles[1]) == ["On test_replica_0", "On test_replica_1"]
+    assert created.status_code == 201
+    assert async_titles[2] == ["On primary"]
@@ -0,0 +1,82 @@
+import pytest
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from movies.genre_counts import compute_genre_counts, favourite_genres, stored_genre_counts
+from movies.models import Collection, Movie, UserGenreCount
+from movies.serializers import CollectionSerializer
+
+
+class FakeRequest:
+    def __init__(self, user, method):
+        self.user = user
+        self.method = method
+
+
+def movie_data(uuid, genres):
+    return {"uuid": uuid, "title": uuid, "description": "d", "genres": genres}
+
+
+def save_collection(user, method, data, instance=None):
+    serializer = CollectionSerializer(
+        instance, data=data, partial=method == 'PATCH', context={'request': FakeRequest(user, method)}
+    )
+    assert serializer.is_valid(), serializer.errors
+    collection, _ = serializer.save(**({'user': user} if instance is None else {}))
+    return collection
+
+
+def assert_counters_match(user):
+    assert stored_genre_counts([user.id]) == compute_genre_counts([user.id])
+
+
+@pytest.fixture
+def user():
+    return User.objects.create_user(username="testuser", password="testpassword")
+
+
+@pytest.mark.django_db
+def test_counters_follow_collection_writes(user):
+    collection = save_collection(user, 'POST', {
+        "title": "First",
+        "description": "d",
+        "movies": [movie_data("a", "Action, Drama"), movie_data("b", "Drama")],
+    })
+    assert favourite_genres(user) == "Drama, Action"
+    assert_counters_match(user)
+
+    save_collection(user, 'PATCH', {"movies": [movie_data("c", "Comedy"), movie_data("a", "Action, Drama")]}, collection)
+    assert_counters_match(user)
+
+    save_collection(user, 'PUT', {"title": "First", "description": "d", "movies": [movie_data("c", "Comedy")]}, collection)
+    assert dict(stored_genre_counts([user.id])[user.id]) == {"Comedy": 1}
+    assert_counters_match(user)
+
+    collection.movies.add(Movie.objects.get(uuid="a"))
+    Movie.objects.get(uuid="b").collections.add(collection)
+    collection.movies.remove(Movie.objects.get(uuid="c"))
+    assert_counters_match(user)
+
+    collection.delete()
+    assert not UserGenreCount.objects.filter(user=user).exists()
+
+
+@pytest.mark.django_db
+def test_counters_count_movies_once_per_collection(user):
+    for title in ("First", "Second"):
+        save_collection(user, 'POST', {"title": title, "description": "d", "movies": [movie_data("a", "Action")]})
+    assert dict(stored_genre_counts([user.id])[user.id]) == {"Action": 2}
+
+
+@pytest.mark.django_db
+def test_rebuild_genre_counts_command(user):
+    collection = Collection.objects.create(user=user, title="First", description="d")
+    save_collection(user, 'PATCH', {"movies": [movie_data("a", "Action, Drama")]}, collection)
+    UserGenreCount.objects.filter(user=user, genre="Action").update(count=7)
+
+    with pytest.raises(CommandError):
+        call_command('rebuild_genre_counts', '--verify')
+
+    call_command('rebuild_genre_counts')
+    call_command('rebuild_genre_counts', '--verify')
+    assert_counters_match(user)
@@ -0,0 +1,80 @@
+import json
+import pytest
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.urls import reverse
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+from movies import views
+from movies.benchmark.fake_upstream import FakeMovieAPI
+from movies.instrumentation import profile_request
+from movies.service import MovieAPIClient
+from movies.versioning import collection_version_key
+from .conftest import QUERY_BUDGETS
+
+
+def movies_payload(prefix, count=3):
+    return [
+        {"uuid": f"{prefix}-{i}", "title": f"Movie {prefix} {i}", "description": "D", "genres": "Action,Drama"}
+        for i in range(count)
+    ]
+
+
+@pytest.fixture
+def client(settings):
+    settings.COLLECTION_RESPONSE_CACHE = {'list': False, 'retrieve': False}
+    user = User.objects.create_user(username="testuser", password="testpassword")
+    cache.delete(collection_version_key(user.pk))
+    client = APIClient()
+    client.credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(user).access_token}')
+    # Enough collections and movies for a per-row query to exceed the budget.
+    client.uuids = [
+        client.post(reverse('collection-list'), {
+            "title": f"Collection {i}", "description": "D", "movies": movies_payload(f"c{i}"),
+        }, format='json').data['collection_uuid']
+        for i in range(5)
+    ]
+    return client
+
+
+def request(client, route):
+    method, name = route.split(' ')
+    if name == 'collection-detail':
+        url = reverse(name, args=[client.uuids[0]])
+    else:
+        url = reverse(name)
+    data = {
+        'POST register': {"username": "newuser", "password": "StrongPassword123!"},
+        'POST login': {"username": "testuser", "password": "testpassword"},
+        'GET movie-list': {"page": 1},
+        'GET movie-search': {"q": "movie"},
+        'POST collection-list': {"title": "New", "description": "D", "movies": movies_payload("new", 10)},
+        'PATCH collection-detail': {"movies": movies_payload("patch", 10)},
+        'PUT collection-detail': {"title": "Replaced", "description": "D", "movies": movies_payload("put", 10)},
+    }.get(route)
+    if method == 'GET':
+        return client.get(url, data)
+    return client.generic(method, url, json.dumps(data) if data else '', content_type='application/json')
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('route', QUERY_BUDGETS)
+def test_route_stays_within_its_query_budget(client, route, query_budget, monkeypatch):
+    monkeypatch.setattr(views, 'get_movies_page', lambda page: {"count": 0, "movies": []})
+    with query_budget(route):
+        response = request(client, route)
+    assert response.status_code < 300
+    assert response['Server-Timing'].startswith('db;dur=')
+
+
+@pytest.mark.django_db
+def test_profile_counts_queries_cache_and_upstream_calls():
+    with FakeMovieAPI() as upstream, profile_request() as profile:
+        User.objects.count()
+        cache.delete("instrumentation-test")
+        cache.add("instrumentation-test", 1)
+        MovieAPIClient(retries=0).fetch_movies(upstream.url, None)
+    cache.delete("instrumentation-test")
+
+    assert profile.calls == {'db': 1, 'cache': 2, 'upstream': 1}
+    assert 'cache;dur=' in profile.server_timing(10)
@@ -0,0 +1,270 @@
+import pickle
+import threading
+import time
+from io import StringIO
+import pytest
+from asgiref.sync import async_to_sync
+from django.core.cache import cache
+from django.core.management import call_command
+from movies import page_cache
+from movies.async_service import get_async_movie_api_client
+from movies.benchmark.fake_upstream import FakeMovieAPI
+from movies.page_codec import PageCodec
+from movies.tiered_cache import InvalidationBus, TieredCache, clear_local_tiers, get_async_redis
+from movies.service import CircuitBreaker, MovieAPIClient, get_movie_api_client
+
+PAGE = 9001
+
+
+def cached_page(page):
+    return page_cache.get_tier('movies').get(page_cache.page_cache_key(page))
+
+
+class FakeUpstream:
+    def __init__(self, delay=0):
+        self.delay = delay
+        self.calls = 0
+        self.lock = threading.Lock()
+
+    def __call__(self, url, auth, page=1, validators=None):
+        with self.lock:
+            self.calls += 1
+            call = self.calls
+        time.sleep(self.delay)
+        return {
+            "count": 1,
+            "results": [{"uuid": f"m{call}", "title": f"Call {call}", "description": "D", "genres": "Drama"}],
+        }
+
+
+@pytest.fixture
+def upstream(monkeypatch):
+    fake = FakeUpstream()
+    monkeypatch.setattr(MovieAPIClient, 'fetch_movies', fake)
+    cache.delete_many([page_cache.page_cache_key(PAGE), f"{page_cache.page_cache_key(PAGE)}:lock"])
+    yield fake
+    cache.delete_many([page_cache.page_cache_key(PAGE), f"{page_cache.page_cache_key(PAGE)}:lock"])
+
+
+def test_concurrent_misses_fetch_once(upstream):
+    upstream.delay = 0.3
+    results = []
+
+    def worker():
+        results.append(page_cache.get_movies_page(PAGE))
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert upstream.calls == 1
+    assert all(result["movies"][0]["title"] == "Call 1" for result in results)
+
+
+def test_stale_page_is_served_while_refreshing(upstream):
+    page_cache.store_page(PAGE, page_cache.fetch_page(PAGE), soft_ttl=-1)
+    upstream.delay = 0.2
+
+    started = time.monotonic()
+    result = page_cache.get_movies_page(PAGE)
+    assert time.monotonic() - started < 0.2
+    assert result["movies"][0]["title"] == "Call 1"
+
+    deadline = time.monotonic() + 5
+    while upstream.calls < 2 or cached_page(PAGE)["movies"][0]["title"] != "Call 2":
+        assert time.monotonic() < deadline
+        time.sleep(0.05)
+    assert page_cache.get_movies_page(PAGE)["movies"][0]["title"] == "Call 2"
+    assert upstream.calls == 2
+
+
+def test_stale_page_is_refreshed_once_the_breaker_may_close(monkeypatch, upstream):
+    page_cache.store_page(PAGE, page_cache.fetch_page(PAGE), soft_ttl=-1)
+    now = [0]
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=30, clock=lambda: now[0])
+    breaker.record_failure()
+    monkeypatch.setattr(get_movie_api_client(), 'breaker', breaker)
+
+    assert page_cache.get_movies_page(PAGE)["movies"][0]["title"] == "Call 1"
+    time.sleep(0.1)
+    assert upstream.calls == 1
+
+    now[0] = 31
+    page_cache.get_movies_page(PAGE)
+    deadline = time.monotonic() + 5
+    while cached_page(PAGE)["movies"][0]["title"] != "Call 2":
+        assert time.monotonic() < deadline
+        time.sleep(0.05)
+    assert upstream.calls == 2
+
+
+def test_upstream_errors_are_not_cached(monkeypatch, upstream):
+    monkeypatch.setattr(MovieAPIClient, 'fetch_movies', lambda *args, **kwargs: {"error": "down"})
+    assert page_cache.get_movies_page(PAGE) == {"error": "down"}
+    assert cache.get(page_cache.page_cache_key(PAGE)) is None
+
+
+def test_warm_movies_command(monkeypatch):
+    def fetch_movies(client, url, auth, page=1, validators=None):
+        if page == 3:
+            return {"error": "boom"}
+        results = [{"uuid": f"p{page}-{i}", "title": "T", "description": "D", "genres": "G"} for i in range(10)]
+        return {"count": 35, "results": results}
+
+    monkeypatch.setattr(MovieAPIClient, 'fetch_movies', fetch_movies)
+    keys = [page_cache.page_cache_key(page) for page in range(1, 5)]
+    cache.delete_many(keys)
+
+    out, err = StringIO(), StringIO()
+    call_command('warm_movies', '--concurrency', '2', stdout=out, stderr=err)
+
+    assert "4 pages of 10" in out.getvalue()
+    assert "Warmed 3/4 pages (30 movies)" in out.getvalue()
+    assert "page 3: boom" in err.getvalue()
+    cached = {key: cached_page(page) for page, key in enumerate(keys, 1)}
+    assert [key for key in keys if cached[key] is not None] == [keys[0], keys[1], keys[3]]
+    assert cached[keys[1]]["movies"][0]["uuid"] == "p2-0"
+    cache.delete_many(keys)
+
+
+def test_warm_movies_dry_run(monkeypatch):
+    monkeypatch.setattr(MovieAPIClient, 'fetch_movies', lambda *args, **kwargs: {"count": 0, "results": []})
+    out = StringIO()
+    call_command('warm_movies', '--dry-run', stdout=out)
+    assert "0 movies in 0 pages" in out.getvalue()
+
+
+def test_page_codec_round_trip(settings):
+    codec = PageCodec()
+    movies = [{"uuid": f"m{i}", "title": f"Title {i}", "description": f"Déjà vu {i} " * 20, "genres": None} for i in range(20)]
+    entry = {"count": 20, "movies": movies, "fresh_until": 1.5, "etag": '"abc"'}
+
+    settings.MOVIES_CACHE_COMPRESS_THRESHOLD = 1 << 20
+    plain = codec.encode(entry)
+    settings.MOVIES_CACHE_COMPRESS_THRESHOLD = 1024
+    compressed = codec.encode(entry)
+
+    assert plain[:4] == b'MP\x01\x00' and compressed[:4] == b'MP\x01\x01'
+    assert len(compressed) < len(plain)
+    assert len(compressed) < len(pickle.dumps(entry)) / 2
+    assert codec.decode(plain) == codec.decode(compressed) == entry
+
+
+def test_page_codec_reads_old_entries_safely():
+    codec = PageCodec()
+    legacy = {"count": 0, "movies": [], "fresh_until": 0, "etag": '"e"'}
+    assert codec.decode(legacy) is legacy
+    assert codec.decode(b'MP\x02\x00{}') is None
+    assert codec.decode(b'MP\x01\x01not zlib') is None
+    assert codec.decode(b'garbage') is None
+
+
+def test_codec_benchmark_command():
+    out = StringIO()
+    call_command('benchmark_page_codec', '--pages', '2', '--rounds', '2', stdout=out)
+    lines = out.getvalue().splitlines()
+    assert [line.split()[0] for line in lines[1:]] == ['pickle', 'compact', 'ratio']
+    assert float(lines[3].split()[1]) < 1
+
+
+def test_expired_pages_are_revalidated_with_upstream(settings, monkeypatch):
+    client = MovieAPIClient(retries=0)
+    monkeypatch.setattr(page_cache, 'get_movie_api_client', lambda: client)
+    with FakeMovieAPI(catalog_size=PAGE * 10) as upstream:
+        settings.EXTERNAL_MOVIES_API_URL = upstream.url
+        try:
+            entry = page_cache.refresh_page(PAGE)
+            assert entry["validators"]["etag"] and entry["validators"]["bytes"] > 0
+
+            revalidated = page_cache.refresh_page(PAGE, cached_page(PAGE))
+            assert upstream.not_modified == 1
+            assert revalidated["etag"] == entry["etag"]
+            assert revalidated["fresh_until"] > entry["fresh_until"]
+            assert cached_page(PAGE)["movies"] == entry["movies"]
+
+            # Without an ETag, Last-Modified is used.
+            page_cache.refresh_page(PAGE, dict(revalidated, validators=dict(revalidated["validators"], etag=None)))
+            assert upstream.not_modified == 2
+
+            upstream.change()
+            changed = page_cache.refresh_page(PAGE, cached_page(PAGE))
+            assert upstream.not_modified == 2
+            assert changed["movies"][0]["title"].endswith("(revision 1)")
+            assert changed["etag"] != entry["etag"]
+        finally:
+            cache.delete(page_cache.page_cache_key(PAGE))
+
+    revalidation = client.stats()["revalidation"]
+    assert revalidation["not_modified"] == 2
+    assert revalidation["bytes_saved"] == 2 * entry["validators"]["bytes"]
+
+
+def test_not_modified_pages_are_not_rewritten(settings, monkeypatch):
+    client = MovieAPIClient(retries=0)
+    monkeypatch.setattr(page_cache, 'get_movie_api_client', lambda: client)
+
+    async def arefresh(current):
+        try:
+            return await page_cache.arefresh_page(PAGE, current)
+        finally:
+            await get_async_redis().aclose()
+            await get_async_movie_api_client().aclose()
+
+    with FakeMovieAPI(catalog_size=PAGE * 10) as upstream:
+        settings.EXTERNAL_MOVIES_API_URL = upstream.url
+        try:
+            stale = page_cache.store_page(PAGE, page_cache.fetch_page(PAGE), soft_ttl=-1)
+            monkeypatch.setattr(PageCodec, 'encode', lambda *args: pytest.fail("page re-encoded"))
+            for method in ('set', 'aset'):
+                monkeypatch.setattr(TieredCache, method, lambda *args, **kwargs: pytest.fail("page rewritten"))
+            for method in ('publish', 'apublish'):
+                monkeypatch.setattr(InvalidationBus, method, lambda *args: pytest.fail("invalidation published"))
+
+            assert not page_cache.is_fresh(PAGE, cached_page(PAGE))
+            assert page_cache.refresh_page(PAGE, stale)["fresh_until"] > time.time()
+            assert page_cache.is_fresh(PAGE, cached_page(PAGE))
+            assert page_cache.get_movies_page(PAGE)["movies"] == stale["movies"]
+
+            cache.delete(page_cache.fresh_until_key(PAGE))
+            assert async_to_sync(arefresh)(stale)["fresh_until"] > time.time()
+            assert page_cache.is_fresh(PAGE, cached_page(PAGE))
+            assert upstream.requests == 3 and upstream.not_modified == 2
+            assert cache.ttl(page_cache.page_cache_key(PAGE)) > settings.MOVIES_CACHE_HARD_TTL - 60
+        finally:
+            cache.delete_many([page_cache.page_cache_key(PAGE), page_cache.fresh_until_key(PAGE)])
+
+
+def test_extended_pages_are_fresh_without_redis(settings, monkeypatch):
+    client = MovieAPIClient(retries=0)
+    monkeypatch.setattr(page_cache, 'get_movie_api_client', lambda: client)
+    assert page_cache.get_tier('movies').bus.connected.wait(5)
+
+    def no_redis(*args, **kwargs):
+        pytest.fail("Redis read")
+
+    async def aget_page():
+        return await page_cache.aget_movies_page(PAGE)
+
+    with FakeMovieAPI(catalog_size=PAGE * 10) as upstream:
+        settings.EXTERNAL_MOVIES_API_URL = upstream.url
+        try:
+            stale = page_cache.store_page(PAGE, page_cache.fetch_page(PAGE), soft_ttl=-1)
+            page_cache.refresh_page(PAGE, stale)
+            with monkeypatch.context() as patched:
+                patched.setattr(cache, 'get', no_redis)
+                patched.setattr(page_cache, 'get_async_redis', no_redis)
+                patched.setattr('movies.tiered_cache.get_async_redis', no_redis)
+                assert page_cache.get_movies_page(PAGE)["movies"] == stale["movies"]
+                assert async_to_sync(aget_page)()["movies"] == stale["movies"]
+
+            # Another process reads the extension from Redis once.
+            clear_local_tiers()
+            assert page_cache.get_movies_page(PAGE)["movies"] == stale["movies"]
+            with monkeypatch.context() as patched:
+                patched.setattr(cache, 'get', no_redis)
+                assert page_cache.get_movies_page(PAGE)["movies"] == stale["movies"]
+            assert upstream.requests == 2 and upstream.not_modified == 1
+        finally:
+            cache.delete_many([page_cache.page_cache_key(PAGE), page_cache.fresh_until_key(PAGE)])
@@ -0,0 +1,71 @@
+import random
+import pytest
+from django.contrib.auth.models import User
+from django.urls import reverse
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+from movies.bulk import link_genres
+from movies.models import Collection, Movie
+from movies.read_serializers import movie_dict
+from movies.serializers import MovieSerializer
+
+
+@pytest.fixture
+def client(settings):
+    settings.COLLECTION_RESPONSE_CACHE = {'list': False, 'retrieve': False}
+    user = User.objects.create_user(username="testuser", password="testpassword")
+    rng = random.Random(0)
+    movies = Movie.objects.bulk_create(
+        Movie(uuid=f"m{i}", title=f"Film «{i}»", description="Line\nbreak \"quoted\"", genres=rng.choice(["Drama", "Action,Comedy"]))
+        for i in range(30)
+    )
+    link_genres({movie.pk: movie.genres for movie in movies})
+    client = APIClient()
+    client.force_authenticate(user=user)
+    client.uuids = []
+    for i in range(6):
+        collection = Collection.objects.create(user=user, title=f"Collection {i}", description=f"Description {i}")
+        collection.movies.add(*rng.sample(movies, 8))
+        client.uuids.append(str(collection.uuid))
+    Collection.objects.create(user=user, title="Empty", description="")
+    return client
+
+
+def both(client, settings, url, params=None):
+    responses = []
+    for mode in ('standard', 'fast'):
+        settings.READ_SERIALIZERS = mode
+        response = client.get(url, params)
+        assert response.status_code == 200
+        responses.append(response.content)
+    return responses
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('params', [
+    {},
+    {'page_size': 4},
+    {'include_movies': 'false'},
+    {'genre': 'Comedy'},
+    {'genre': 'Nothing'},
+])
+def test_collection_list_parity(client, settings, params):
+    standard, fast = both(client, settings, reverse('collection-list'), params)
+    assert fast == standard
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('params', [{}, {'genre': 'Drama'}])
+def test_collection_detail_parity(client, settings, params):
+    for uuid in client.uuids:
+        standard, fast = both(client, settings, reverse('collection-detail', args=[uuid]), params)
+        assert fast == standard
+
+
+@pytest.mark.parametrize('movie', [
+    {"uuid": "u1", "title": "Title", "description": "D", "genres": "Drama"},
+    {"uuid": 7, "title": "Ünïcode ✓", "description": None, "genres": "", "extra": "ignored"},
+])
+def test_movie_dict_parity(movie):
+    renderer = JSONRenderer()
+    assert renderer.render(movie_dict(movie)) == renderer.render(MovieSerializer(movie).data)
@@ -0,0 +1,108 @@
+import pytest
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db import connection
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+from movies.catalog import upsert_catalog_page
+from movies.models import Movie
+from movies.search import search_movies, to_fts_query
+
+
+@pytest.fixture
+def client():
+    client = APIClient()
+    client.force_authenticate(user=User.objects.create_user(username="testuser", password="testpassword"))
+    return client
+
+
+@pytest.fixture
+def movies():
+    Movie.objects.bulk_create([
+        Movie(uuid="1", title="The Dark Knight", description="Batman fights crime.", genres="Action,Crime"),
+        Movie(uuid="2", title="Knight and Day", description="A spy comedy.", genres="Action,Comedy"),
+        Movie(uuid="3", title="Heat", description="A knight of the streets.", genres="Crime,Drama"),
+        Movie(uuid="4", title="Amélie", description="A whimsical romance.", genres="Comedy,Romance"),
+    ])
+
+
+def test_to_fts_query_quotes_user_input():
+    assert to_fts_query('dark "knight OR') == '"dark" "knight" "OR"*'
+    assert to_fts_query('  ***  ') is None
+
+
+@pytest.mark.django_db
+def test_search_ranks_title_matches_first(movies):
+    results, next_cursor = search_movies("knight")
+    assert [movie["uuid"] for movie in results][-1] == "3"
+    assert sorted(movie["uuid"] for movie in results) == ["1", "2", "3"]
+    assert next_cursor is None
+    assert [movie["uuid"] for movie in search_movies("amelie")[0]] == ["4"]
+    assert sorted(movie["uuid"] for movie in search_movies("crim")[0]) == ["1", "3"]
+
+
+@pytest.mark.django_db
+def test_search_index_follows_movie_changes(movies):
+    movie = Movie.objects.get(uuid="4")
+    movie.title = "Knightfall"
+    movie.save()
+    assert "4" in [m["uuid"] for m in search_movies("knight")[0]]
+
+    Movie.objects.filter(uuid="1").delete()
+    assert "1" not in [m["uuid"] for m in search_movies("knight")[0]]
+
+
+def total_changes():
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT total_changes()")
+        return cursor.fetchone()[0]
+
+
+@pytest.mark.django_db
+def test_unindexed_columns_do_not_touch_the_search_index(movies):
+    before = total_changes()
+    Movie.objects.filter(uuid="2").update(upstream_position=7)
+    # Only the movie row: the FTS update trigger did not fire.
+    assert total_changes() - before == 1
+
+
+@pytest.mark.django_db
+def test_catalog_resync_does_not_rewrite_the_search_index():
+    results = [
+        {"uuid": f"m{i}", "title": f"Movie {i}", "description": "D", "genres": "Drama"} for i in range(3)
+    ]
+    upsert_catalog_page(1, 10, results)
+
+    before = total_changes()
+    upsert_catalog_page(1, 10, results)
+    assert total_changes() == before
+
+    # A reordered page only moves the movies' positions.
+    upsert_catalog_page(1, 10, results[::-1])
+    assert total_changes() - before == 2
+    assert sorted(m["uuid"] for m in search_movies("movie")[0]) == ["m0", "m1", "m2"]
+
+
+@pytest.mark.django_db
+def test_search_endpoint_paginates_with_a_cursor(client, movies):
+    url = reverse('movie-search')
+    response = client.get(url, {'q': 'knight', 'page_size': 2})
+    assert response.status_code == status.HTTP_200_OK
+    assert len(response.data['movies']) == 2
+    assert response.data['took_ms'] >= 0
+    uuids = [movie['uuid'] for movie in response.data['movies']]
+
+    response = client.get(response.data['next'])
+    assert response.data['next'] is None
+    uuids += [movie['uuid'] for movie in response.data['movies']]
+    assert sorted(uuids) == ["1", "2", "3"]
+
+    assert client.get(url).status_code == status.HTTP_400_BAD_REQUEST
+    assert client.get(url, {'q': 'knight', 'cursor': 'nope'}).status_code == status.HTTP_400_BAD_REQUEST
+
+
+@pytest.mark.django_db
+def test_rebuild_movie_search_command(movies):
+    call_command('rebuild_movie_search')
+    assert len(search_movies("knight")[0]) == 3
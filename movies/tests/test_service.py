@@ -0,0 +1,173 @@
+import asyncio
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pytest
+from movies.async_service import AsyncMovieAPIClient
+from movies.service import CircuitBreaker, MovieAPIClient, get_movie_api_client
+
+
+class FakeMovieAPI(BaseHTTPRequestHandler):
+    statuses = []
+    bodies = []
+
+    def do_GET(self):
+        if not self.path.startswith("/movies/"):
+            # /moved/ redirects to /movies/, /loop/ to itself.
+            target = self.path if self.path.startswith("/loop/") else self.path.replace("/moved/", "/movies/", 1)
+            self.send_response(301)
+            self.send_header("Location", target)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        status = self.statuses.pop(0) if self.statuses else 200
+        body = self.bodies.pop(0) if self.bodies else json.dumps({"count": 0, "results": []}).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def upstream():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FakeMovieAPI)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    FakeMovieAPI.statuses = []
+    FakeMovieAPI.bodies = []
+    yield f"http://127.0.0.1:{server.server_address[1]}/movies/"
+    server.shutdown()
+    server.server_close()
+
+
+def test_retries_server_errors_and_reuses_connections(upstream):
+    FakeMovieAPI.statuses = [503, 502]
+    client = MovieAPIClient(retries=3, backoff_factor=0)
+
+    assert client.fetch_movies(upstream, None) == {"count": 0, "results": []}
+    assert client.fetch_movies(upstream, None) == {"count": 0, "results": []}
+
+    stats = client.stats()
+    assert stats["requests"] == 4
+    assert stats["failures"] == 2
+    assert stats["pools"][0]["connections_opened"] == 1
+    assert stats["pools"][0]["idle_connections"] == 1
+    assert stats["breaker"]["state"] == CircuitBreaker.CLOSED
+
+
+def test_invalid_json_is_counted_once(upstream):
+    FakeMovieAPI.bodies = [b'{"count":', b'{"count":']
+    client = MovieAPIClient(retries=3, backoff_factor=0)
+    async_client = AsyncMovieAPIClient(retries=3, backoff_factor=0)
+
+    async def afetch():
+        async with async_client:
+            return await async_client.fetch_movies(upstream, None)
+
+    assert "error" in client.fetch_movies(upstream, None)
+    assert "error" in asyncio.run(afetch())
+
+    for stats in (client.stats(), async_client.stats()):
+        assert (stats["requests"], stats["failures"]) == (1, 0)
+        assert stats["breaker"]["state"] == CircuitBreaker.CLOSED
+
+
+def test_sync_and_async_clients_agree(upstream):
+    page = json.dumps({"count": 1, "results": [{"uuid": "a", "title": "A"}]}).encode()
+    cases = [
+        ("/movies/", [], [page]),
+        ("/moved/", [], [page]),
+        ("/movies/", [503], [b"", page]),
+        ("/movies/", [404], []),
+        ("/movies/", [], [b"not json"]),
+        ("/movies/", [], [b"[]"]),
+        ("/loop/", [], []),
+    ]
+    client = MovieAPIClient(retries=1, backoff_factor=0)
+    async_client = AsyncMovieAPIClient(retries=1, backoff_factor=0)
+
+    def script(path, statuses, bodies):
+        FakeMovieAPI.statuses, FakeMovieAPI.bodies = list(statuses), list(bodies)
+        return upstream.replace("/movies/", path)
+
+    async def afetch_all():
+        async with async_client:
+            return [await async_client.fetch_movies(script(*case), ("user", "pass")) for case in cases]
+
+    results = [client.fetch_movies(script(*case), ("user", "pass")) for case in cases]
+    async_results = asyncio.run(afetch_all())
+
+    assert results[0] == results[1] == json.loads(page) == results[2]
+    assert results[3] == {"error": f"404 Client Error: Not Found for url: {upstream}?page=1"}
+    # Only the wording of a redirect loop differs.
+    assert async_results[:-1] == results[:-1]
+    assert "error" in async_results[-1] and "error" in results[-1]
+    for stats in (client.stats(), async_client.stats()):
+        assert (stats["requests"], stats["failures"]) == (8, 1)
+        assert stats["breaker"]["state"] == CircuitBreaker.CLOSED
+
+
+def test_circuit_breaker_fails_fast_then_recovers(upstream):
+    now = [0]
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=30, clock=lambda: now[0])
+    client = MovieAPIClient(retries=0, breaker=breaker)
+    FakeMovieAPI.statuses = [500, 500, 500]
+
+    assert "error" in client.fetch_movies(upstream, None)
+    assert "error" in client.fetch_movies(upstream, None)
+    assert breaker.state == CircuitBreaker.OPEN
+
+    assert client.fetch_movies(upstream, None) == {"error": "Movie API circuit breaker is open."}
+    assert FakeMovieAPI.statuses == [500]
+    assert breaker.stats()["rejected"] == 1
+
+    now[0] = 31
+    assert "error" in client.fetch_movies(upstream, None)
+    assert breaker.state == CircuitBreaker.OPEN
+
+    now[0] = 62
+    assert client.fetch_movies(upstream, None) == {"count": 0, "results": []}
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_half_open_breaker_always_records_the_trial(upstream, monkeypatch):
+    now = [0]
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=30, clock=lambda: now[0])
+    client = MovieAPIClient(retries=0, breaker=breaker)
+    FakeMovieAPI.statuses = [500]
+    FakeMovieAPI.bodies = [b"", b'[{"uuid": "a"}]']
+
+    assert "error" in client.fetch_movies(upstream, None)
+    now[0] = 31
+    # A JSON body that is not an object is a client error, which closes the breaker.
+    assert client.fetch_movies(upstream, None) == {"error": "Expected a JSON object, got list"}
+    assert breaker.state == CircuitBreaker.CLOSED
+
+    def broken_get(*args, **kwargs):
+        raise RuntimeError("boom")
+
+    monkeypatch.setattr(client.session, 'get', broken_get)
+    with pytest.raises(RuntimeError):
+        client.fetch_movies(upstream, None)
+    assert breaker.state == CircuitBreaker.OPEN
+    now[0] = 62
+    with pytest.raises(RuntimeError):
+        client.fetch_movies(upstream, None)
+    assert breaker.state == CircuitBreaker.OPEN and breaker.stats()["rejected"] == 0
+
+
+def test_total_deadline_bounds_retries():
+    client = MovieAPIClient(retries=10, backoff_factor=1, deadline=0.5, connect_timeout=0.2)
+    started = time.monotonic()
+    # Port 9 (discard) is closed locally, so every attempt fails.
+    assert "error" in client.fetch_movies("http://127.0.0.1:9/", None)
+    assert time.monotonic() - started < 1.5
+
+
+def test_shared_client_is_process_wide():
+    assert get_movie_api_client() is get_movie_api_client()
@@ -0,0 +1,87 @@
+import json
+import tracemalloc
+import pytest
+from django.contrib.auth.models import User
+from django.urls import reverse
+from rest_framework.test import APIClient
+from movies.models import Collection, Movie
+
+
+@pytest.fixture
+def user():
+    return User.objects.create_user(username="testuser", password="testpassword")
+
+
+@pytest.fixture
+def client(user):
+    client = APIClient()
+    client.force_authenticate(user=user)
+    return client
+
+
+def create_collection(user, title, movie_count):
+    collection = Collection.objects.create(user=user, title=title, description="Description")
+    movies = Movie.objects.bulk_create(
+        Movie(uuid=f"{title}-{i}", title=f"Movie {i}", description="D" * 200, genres="Drama")
+        for i in range(movie_count)
+    )
+    collection.movies.through.objects.bulk_create(
+        collection.movies.through(collection_id=collection.pk, movie_id=movie.pk) for movie in movies
+    )
+    return collection
+
+
+def consume(response):
+    assert response.streaming
+    return b''.join(response.streaming_content)
+
+
+@pytest.mark.django_db
+def test_streamed_responses_match_the_regular_ones(client, user):
+    create_collection(user, "First", 3)
+    collection = create_collection(user, "Second", 2)
+
+    url = reverse('collection-list')
+    streamed = json.loads(consume(client.get(url, {'stream': 'true'})))
+    assert streamed == json.loads(client.get(url).content)
+
+    url = reverse('collection-detail', args=[collection.uuid])
+    response = client.get(url, {'stream': 'true'})
+    assert response['Content-Type'] == 'application/json'
+    assert json.loads(consume(response)) == json.loads(client.get(url).content)
+
+
+@pytest.mark.django_db
+def test_ndjson_is_chosen_through_accept(client, user):
+    collection = create_collection(user, "First", 3)
+
+    response = client.get(reverse('collection-detail', args=[collection.uuid]), HTTP_ACCEPT='application/x-ndjson')
+    assert response['Content-Type'] == 'application/x-ndjson'
+    assert response['Vary'] == 'Accept'
+    lines = [json.loads(line) for line in consume(response).splitlines()]
+    assert lines[0] == {"title": "First", "description": "Description"}
+    assert [movie["uuid"] for movie in lines[1:]] == ["First-0", "First-1", "First-2"]
+
+    json_etag = client.get(reverse('collection-detail', args=[collection.uuid]))['ETag']
+    assert response['ETag'] != json_etag
+
+    response = client.get(reverse('collection-list'), HTTP_ACCEPT='application/x-ndjson')
+    assert [json.loads(line)["title"] for line in consume(response).splitlines()] == ["First"]
+
+
+@pytest.mark.django_db
+def test_streaming_memory_does_not_grow_with_collection_size(client, user, settings):
+    settings.STREAM_CHUNK_SIZE = 100
+
+    def peak(collection):
+        response = client.get(reverse('collection-detail', args=[collection.uuid]), {'stream': 'true'})
+        tracemalloc.start()
+        size = sum(len(chunk) for chunk in response.streaming_content)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        return size, peak
+
+    small_size, small_peak = peak(create_collection(user, "Small", 1000))
+    large_size, large_peak = peak(create_collection(user, "Large", 10000))
+    assert large_size > 9 * small_size
+    assert large_peak < small_peak * 1.5
@@ -0,0 +1,128 @@
+import asyncio
+import time
+import pytest
+from asgiref.sync import async_to_sync
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+from movies import page_cache
+from movies.tiered_cache import InvalidationBus, LocalCache, TieredCache, get_async_redis, get_tier
+
+KEY = 'tiered-cache-test'
+
+
+def wait_for(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.01)
+
+
+@pytest.fixture
+def workers():
+    """Two tiers sharing Redis, as in two worker processes."""
+    buses = [InvalidationBus(channel='cache_invalidation_test') for _ in range(2)]
+    tiers = [TieredCache('test', LocalCache(10, 1024 * 1024, 60), bus) for bus in buses]
+    for bus in buses:
+        assert bus.connected.wait(5)
+    yield tiers
+    for bus in buses:
+        bus.stop()
+    cache.delete(KEY)
+
+
+def test_local_cache_expires_and_evicts():
+    now = [0]
+    local = LocalCache(maxsize=2, max_bytes=1024, ttl=5, clock=lambda: now[0])
+    local.set("1", {"id": 1})
+    local.set("2", {"id": 2})
+    assert local.get("1") == {"id": 1}
+    local.set("3", {"id": 3})
+    assert local.get("2") is None
+    assert local.get("1") == {"id": 1}
+
+    local.set("4", {"id": 4}, ttl=1)
+    now[0] = 1
+    assert local.get("4") is None
+    now[0] = 5
+    assert local.get("1") is None
+
+
+def test_local_cache_is_bounded_by_bytes():
+    local = LocalCache(maxsize=100, max_bytes=1000, ttl=60)
+    assert not local.set("huge", "x" * 2000)
+    for i in range(5):
+        local.set(str(i), "x" * 300)
+    stats = local.stats()
+    assert stats['bytes'] <= 1000
+    assert stats['entries'] == 3
+    assert stats['evictions'] == 2
+    assert local.get("0") is None
+    assert local.get("4") == "x" * 300
+
+
+def test_writes_invalidate_other_workers(workers):
+    a, b = workers
+    a.set(KEY, "v1")
+    wait_for(lambda: b.bus.received == 1)
+    assert b.get(KEY) == "v1"
+    assert b.get(KEY) == "v1"
+    assert b.stats()['local']['hits'] == 1
+
+    a.set(KEY, "v2")
+    wait_for(lambda: b.bus.received == 2)
+    assert b.get(KEY) == "v2"
+
+    a.delete(KEY)
+    wait_for(lambda: b.bus.received == 3)
+    assert b.get(KEY) is None
+    assert a.bus.received == 0
+
+
+@pytest.mark.django_db
+def test_cache_stats_report_each_tier():
+    page = 9002
+    assert get_tier('movies').bus.connected.wait(5)
+    entry = page_cache.store_page(page, {"count": 1, "movies": []})
+    assert page_cache.get_movies_page(page) == entry
+    assert page_cache.get_movies_page(page) == entry
+
+    client = APIClient()
+    client.force_authenticate(User.objects.create_user(username="stats", password="testpassword"))
+    response = client.get(reverse('cache_stats'))
+    cache.delete(page_cache.page_cache_key(page))
+
+    assert response.status_code == status.HTTP_200_OK
+    movies = response.data['tiers']['movies']
+    assert movies['local']['hits'] >= 2
+    assert movies['local']['bytes'] > 0
+    assert set(movies['redis']) == {'hits', 'misses', 'hit_ratio'}
+    assert response.data['redis']['used_memory'] > 0
+    assert set(response.data['tiers']) == {'movies', 'collections', 'users'}
+
+
+def test_concurrent_misses_share_one_load(workers):
+    tier = workers[0]
+    loads = []
+
+    async def load():
+        loads.append(len(loads))
+        await asyncio.sleep(0.05)
+        if len(loads) == 1:
+            raise ValueError("upstream down")
+        return {"load": len(loads)}
+
+    async def main():
+        try:
+            return await asyncio.gather(*(tier.aget_or_set(KEY, load, timeout=60) for _ in range(10)), return_exceptions=True)
+        finally:
+            await get_async_redis().aclose()
+
+    results = async_to_sync(main)()
+    # The first load failed for its caller only; the others shared the retry.
+    assert [type(result) for result in results].count(ValueError) == 1
+    assert [result for result in results if isinstance(result, dict)] == [{"load": 2}] * 9
+    assert len(loads) == 2
+    assert tier.get(KEY) == {"load": 2}
@@ -0,0 +1,118 @@
+import pytest
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+from movies import page_cache
+from movies.models import Collection, Movie
+from movies.response_cache import response_cache_stats
+from movies.versioning import collection_version, collection_version_key
+
+
+@pytest.fixture
+def user():
+    user = User.objects.create_user(username="testuser", password="testpassword")
+    cache.delete(collection_version_key(user.pk))
+    return user
+
+
+@pytest.fixture
+def client(user):
+    client = APIClient()
+    client.force_authenticate(user=user)
+    return client
+
+
+@pytest.mark.django_db
+def test_collection_list_conditional_get(client, user, django_assert_num_queries, django_capture_on_commit_callbacks):
+    url = reverse('collection-list')
+    response = client.get(url)
+    etag = response['ETag']
+
+    with django_assert_num_queries(0):
+        response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == status.HTTP_304_NOT_MODIFIED
+    assert response['ETag'] == etag
+
+    assert client.get(url, {'page_size': 1}, HTTP_IF_NONE_MATCH=etag).status_code == status.HTTP_200_OK
+
+    with django_capture_on_commit_callbacks(execute=True):
+        client.post(url, {"title": "New", "description": "Description"}, format='json')
+    response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == status.HTTP_200_OK
+    assert response['ETag'] != etag
+
+
+@pytest.mark.django_db
+def test_collection_detail_etag_changes_on_update_and_delete(client, user, django_capture_on_commit_callbacks):
+    collection = Collection.objects.create(user=user, title="My Collection", description="Description")
+    url = reverse('collection-detail', args=[collection.uuid])
+    etag = client.get(url)['ETag']
+    assert client.get(url, HTTP_IF_NONE_MATCH=etag).status_code == status.HTTP_304_NOT_MODIFIED
+
+    version = collection_version(user.pk)
+    with django_capture_on_commit_callbacks(execute=True):
+        client.patch(url, {"description": "Changed"}, format='json')
+    assert collection_version(user.pk) == version + 1
+    response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == status.HTTP_200_OK
+    assert response.data['description'] == "Changed"
+
+    with django_capture_on_commit_callbacks(execute=True):
+        client.delete(url)
+    assert collection_version(user.pk) == version + 2
+
+
+@pytest.mark.django_db
+def test_movie_page_conditional_get(client, monkeypatch):
+    page = 9002
+    monkeypatch.setattr(page_cache, 'refresh_page', lambda p: pytest.fail("upstream called"))
+    entry = page_cache.store_page(page, {"count": 1, "movies": [{"uuid": "m", "title": "T", "description": "D", "genres": "G"}]})
+
+    response = client.get(reverse('movie-list'), {'page': page})
+    assert response.status_code == status.HTTP_200_OK
+    assert response['ETag'] == entry['etag']
+
+    response = client.get(reverse('movie-list'), {'page': page}, HTTP_IF_NONE_MATCH=entry['etag'])
+    assert response.status_code == status.HTTP_304_NOT_MODIFIED
+    cache.delete(page_cache.page_cache_key(page))
+
+
+@pytest.mark.django_db
+def test_collection_reads_are_served_from_the_response_cache(client, user, django_assert_num_queries, django_capture_on_commit_callbacks):
+    collection = Collection.objects.create(user=user, title="My Collection", description="Description")
+    with django_capture_on_commit_callbacks(execute=True):
+        client.patch(
+            reverse('collection-detail', args=[collection.uuid]),
+            {"movies": [{"uuid": "m1", "title": "Old Title", "description": "D", "genres": "Drama"}]},
+            format='json',
+        )
+    before = response_cache_stats()['list']
+
+    url = reverse('collection-list')
+    first = client.get(url)
+    with django_assert_num_queries(0):
+        second = client.get(url)
+    assert second.data == first.data
+    stats = response_cache_stats()['list']
+    assert stats['hits'] == before['hits'] + 1
+    assert stats['misses'] == before['misses'] + 1
+
+    with django_capture_on_commit_callbacks(execute=True):
+        movie = Movie.objects.get(uuid="m1")
+        movie.title = "New Title"
+        movie.save()
+    response = client.get(url)
+    assert response.data['data']['collections'][0]['movies'][0]['title'] == "New Title"
+
+
+@pytest.mark.django_db
+def test_response_cache_can_be_disabled_per_endpoint(client, user, settings, django_assert_num_queries):
+    settings.COLLECTION_RESPONSE_CACHE = {'list': True, 'retrieve': False}
+    collection = Collection.objects.create(user=user, title="My Collection", description="Description")
+    url = reverse('collection-detail', args=[collection.uuid])
+    client.get(url)
+    with django_assert_num_queries(2):
+        client.get(url)
+    assert response_cache_stats()['retrieve']['enabled'] is False
@@ -3,7 +3,8 @@ from rest_framework.test import APIClient
 from django.contrib.auth.models import User
 from django.urls import reverse
 from rest_framework import status
-from movies.models import Collection
+from movies.models import Collection, Genre
+from movies.serializers import CollectionSerializer
 
 
 @pytest.fixture
@@ -122,3 +123,167 @@ def test_delete_collection(client, user):
     assert Collection.objects.filter(uuid=collection.uuid).count() == 0
 
 
+
+
+def movies_payload(count, prefix="movie"):
+    return [
+        {
+            "uuid": f"{prefix}-{i}",
+            "title": f"Movie {i}",
+            "description": f"Description {i}",
+            "genres": "Action,Drama",
+        }
+        for i in range(count)
+    ]
+
+
+@pytest.mark.django_db
+def test_create_collection_with_movies(client, user):
+    url = reverse('collection-list')
+    client.force_authenticate(user=user)
+    data = {
+        "title": "With Movies",
+        "description": "A collection with movies.",
+        "movies": movies_payload(3),
+    }
+    response = client.post(url, data, format='json')
+    assert response.status_code == status.HTTP_201_CREATED
+    assert response.data['new_movies_added'] == ["Movie 0", "Movie 1", "Movie 2"]
+    collection = Collection.objects.get(uuid=response.data['collection_uuid'])
+    assert collection.movies.count() == 3
+
+
+@pytest.mark.django_db
+def test_patch_collection_reports_already_added_movies(client, user):
+    collection = Collection.objects.create(user=user, title="My Collection", description="A collection description")
+    url = reverse('collection-detail', args=[collection.uuid])
+    client.force_authenticate(user=user)
+    client.patch(url, {"movies": movies_payload(2)}, format='json')
+
+    response = client.patch(url, {"movies": movies_payload(3)}, format='json')
+    assert response.status_code == status.HTTP_200_OK
+    assert response.data['new_movies_added'] == ["Movie 2"]
+    assert response.data['already_added_movies'] == ["Movie 0", "Movie 1"]
+    assert collection.movies.count() == 3
+
+
+@pytest.mark.django_db
+def test_put_collection_replaces_movies(client, user):
+    collection = Collection.objects.create(user=user, title="My Collection", description="A collection description")
+    url = reverse('collection-detail', args=[collection.uuid])
+    client.force_authenticate(user=user)
+    client.patch(url, {"movies": movies_payload(2, prefix="old")}, format='json')
+
+    data = {"title": "My Collection", "description": "Replaced", "movies": movies_payload(2)}
+    response = client.put(url, data, format='json')
+    assert response.status_code == status.HTTP_200_OK
+    assert response.data['new_movies_added'] == ["Movie 0", "Movie 1"]
+    assert 'already_added_movies' not in response.data
+    assert set(collection.movies.values_list('uuid', flat=True)) == {"movie-0", "movie-1"}
+
+
+@pytest.mark.django_db
+def test_update_collection_query_count_is_constant(client, user, django_assert_max_num_queries):
+    collection = Collection.objects.create(user=user, title="My Collection", description="A collection description")
+    url = reverse('collection-detail', args=[collection.uuid])
+    client.force_authenticate(user=user)
+    client.patch(url, {"movies": movies_payload(100)}, format='json')
+
+    with django_assert_max_num_queries(25):
+        response = client.patch(url, {"movies": movies_payload(500)}, format='json')
+    assert len(response.data['new_movies_added']) == 400
+    assert len(response.data['already_added_movies']) == 100
+
+
+@pytest.mark.django_db
+def test_list_collections_is_cursor_paginated(client, user, django_assert_max_num_queries):
+    for i in range(5):
+        collection = Collection.objects.create(user=user, title=f"Collection {i}", description="Description")
+        client.force_authenticate(user=user)
+        client.patch(
+            reverse('collection-detail', args=[collection.uuid]),
+            {"movies": movies_payload(3, prefix=f"c{i}")},
+            format='json',
+        )
+
+    url = reverse('collection-list')
+    with django_assert_max_num_queries(4):
+        response = client.get(url, {'page_size': 2}, format='json')
+    assert response.status_code == status.HTTP_200_OK
+    data = response.data['data']
+    assert [c['title'] for c in data['collections']] == ["Collection 0", "Collection 1"]
+    assert len(data['collections'][0]['movies']) == 3
+    assert data['previous'] is None
+
+    titles = [c['title'] for c in data['collections']]
+    while data['next']:
+        data = client.get(data['next'], format='json').data['data']
+        titles.extend(c['title'] for c in data['collections'])
+    assert titles == [f"Collection {i}" for i in range(5)]
+
+
+@pytest.mark.django_db
+def test_list_collections_without_movies(client, user):
+    Collection.objects.create(user=user, title="My Collection", description="A collection description")
+    client.force_authenticate(user=user)
+    response = client.get(reverse('collection-list'), {'include_movies': 'false'}, format='json')
+    assert response.status_code == status.HTTP_200_OK
+    assert 'movies' not in response.data['data']['collections'][0]
+
+
+@pytest.mark.django_db
+def test_filter_collections_by_genre(client, user):
+    client.force_authenticate(user=user)
+    url = reverse('collection-list')
+    client.post(url, {
+        "title": "Dramas",
+        "description": "Description",
+        "movies": [{"uuid": "d1", "title": "D1", "description": "D", "genres": "Drama, Romance"}],
+    }, format='json')
+    response = client.post(url, {
+        "title": "Mixed",
+        "description": "Description",
+        "movies": [
+            {"uuid": "a1", "title": "A1", "description": "A", "genres": "Action"},
+            {"uuid": "c1", "title": "C1", "description": "C", "genres": "Comedy,Drama"},
+        ],
+    }, format='json')
+    assert Genre.objects.get(name="Drama").movies.count() == 2
+
+    response_data = client.get(url, {'genre': 'Drama'}, format='json').data['data']
+    assert [c['title'] for c in response_data['collections']] == ["Dramas", "Mixed"]
+    response_data = client.get(url, {'genre': 'Action'}, format='json').data['data']
+    assert [c['title'] for c in response_data['collections']] == ["Mixed"]
+
+    detail_url = reverse('collection-detail', args=[response.data['collection_uuid']])
+    movies = client.get(detail_url, {'genre': 'Comedy'}, format='json').data['movies']
+    assert movies == [{"uuid": "c1", "title": "C1", "description": "C", "genres": "Comedy,Drama"}]
+
+
+@pytest.mark.django_db
+def test_duplicate_titles_are_rejected_by_the_constraint(client, user, django_assert_num_queries):
+    client.force_authenticate(user=user)
+    url = reverse('collection-list')
+    client.post(url, {"title": "First", "description": "D"}, format='json')
+    second = client.post(url, {"title": "Second", "description": "D"}, format='json').data['collection_uuid']
+
+    response = client.post(url, {"title": "First", "description": "D", "movies": movies_payload(2)}, format='json')
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert response.data == {'title': ['A collection with this title already exists.']}
+    assert not Collection.objects.filter(movies__uuid="movie-0").exists()
+
+    response = client.patch(reverse('collection-detail', args=[second]), {"title": "First"}, format='json')
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert response.data == {'title': ['A collection with this title already exists.']}
+    assert Collection.objects.get(uuid=second).title == "Second"
+
+    # An update that keeps its own title and fails otherwise is not reported as a duplicate.
+    collection = Collection.objects.get(uuid=second)
+    assert CollectionSerializer().duplicate_title_error(user.pk, "Second", collection.pk) is None
+
+
+@pytest.mark.django_db
+def test_register_duplicate_username_message(client, user):
+    response = client.post(reverse('register'), {"username": user.username, "password": "NewPassword123!"}, format='json')
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert response.data == {'username': ['A user with this username already exists.']}
@@ -0,0 +1,415 @@
+import asyncio
+import logging
+import os
+import pickle
+import threading
+import time
+import uuid
+import weakref
+from collections import OrderedDict
+import redis.asyncio
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.module_loading import import_string
+from redis.exceptions import RedisError
+from .counters import get_redis
+from .instrumentation import timed
+
+logger = logging.getLogger(__name__)
+
+INVALIDATION_CHANNEL = 'cache_invalidation'
+
+
+_async_clients = weakref.WeakKeyDictionary()
+
+
+def get_async_redis():
+    """
+    A redis.asyncio client for the default cache's server, one per event
+    loop since its connections belong to the loop.
+    """
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    if client is None:
+        location = settings.CACHES['default']['LOCATION']
+        client = _async_clients[loop] = redis.asyncio.Redis.from_url(
+            location[0] if isinstance(location, (list, tuple)) else location
+        )
+    return client
+
+
+def ratio(hits, misses):
+    lookups = hits + misses
+    return round(hits / lookups, 4) if lookups else None
+
+
+class LocalCache:
+    """
+    Process-local LRU bounded by entry count and by the pickled size of its
+    values, keeping each entry for at most ``ttl`` seconds (or less, per key).
+    """
+
+    def __init__(self, maxsize, max_bytes, ttl, clock=time.monotonic):
+        self.maxsize = maxsize
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.clock = clock
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        # Bumped by every discard, so a fill racing an invalidation can be dropped.
+        self.generation = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] <= self.clock():
+                self._pop(key)
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[2]
+
+    def set(self, key, value, ttl=None, generation=None):
+        """
+        Store ``value`` for ``ttl`` seconds, capped at the cache's own TTL.
+        With ``generation``, skip the store if anything was discarded since.
+        """
+        ttl = self.ttl if ttl is None else min(ttl, self.ttl)
+        size = len(pickle.dumps(value, pickle.HIGHEST_PROTOCOL))
+        with self._lock:
+            if generation is not None and generation != self.generation:
+                return False
+            self._pop(key)
+            if ttl <= 0 or size > self.max_bytes:
+                return False
+            self._entries[key] = (self.clock() + ttl, size, value)
+            self.bytes += size
+            while len(self._entries) > self.maxsize or self.bytes > self.max_bytes:
+                _, (_, evicted, _) = self._entries.popitem(last=False)
+                self.bytes -= evicted
+                self.evictions += 1
+            return True
+
+    def discard(self, key):
+        with self._lock:
+            self.generation += 1
+            self._pop(key)
+
+    def clear(self):
+        with self._lock:
+            self.generation += 1
+            self._entries.clear()
+            self.bytes = 0
+
+    def _pop(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.bytes -= entry[1]
+
+    def stats(self):
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'max_entries': self.maxsize,
+                'bytes': self.bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': ratio(self.hits, self.misses),
+                'evictions': self.evictions,
+            }
+
+
+class InvalidationBus:
+    """
+    Tell the other processes to drop a key from their local tier through
+    Redis pub/sub. Messages are ``"<origin> <tier> <key>"``; a process skips
+    its own.
+
+    Local tiers are only used while the subscription is up, and are cleared
+    whenever it is (re)established, since invalidations may have been missed
+    in between.
+    """
+
+    def __init__(self, redis_client=None, channel=INVALIDATION_CHANNEL, origin=None):
+        self.redis_client = redis_client
+        self.channel = channel
+        self.origin = origin or uuid.uuid4().hex
+        self.tiers = {}
+        self.connected = threading.Event()
+        self.published = 0
+        self.received = 0
+        self.errors = 0
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='cache-invalidation', daemon=True)
+        self._thread.start()
+
+    def register(self, tier):
+        self.tiers[tier.name] = tier
+
+    def publish(self, tier_name, key):
+        try:
+            (self.redis_client or get_redis()).publish(self.channel, f"{self.origin} {tier_name} {key}")
+            self.published += 1
+        except RedisError as e:
+            logger.warning('Could not publish the invalidation of %s: %s', key, e)
+            self.errors += 1
+
+    async def apublish(self, tier_name, key):
+        try:
+            await get_async_redis().publish(self.channel, f"{self.origin} {tier_name} {key}")
+            self.published += 1
+        except RedisError as e:
+            logger.warning('Could not publish the invalidation of %s: %s', key, e)
+            self.errors += 1
+
+    def handle(self, data):
+        origin, tier_name, key = data.decode().split(' ', 2)
+        tier = self.tiers.get(tier_name)
+        if origin != self.origin and tier is not None:
+            tier.local.discard(key)
+            self.received += 1
+
+    def _run(self):
+        while not self._stopped.is_set():
+            pubsub = None
+            try:
+                pubsub = (self.redis_client or get_redis()).pubsub()
+                pubsub.subscribe(self.channel)
+                while not self._stopped.is_set():
+                    message = pubsub.get_message(timeout=1.0)
+                    if message is None:
+                        continue
+                    if message['type'] == 'subscribe':
+                        for tier in self.tiers.values():
+                            tier.local.clear()
+                        self.connected.set()
+                    elif message['type'] == 'message':
+                        self.handle(message['data'])
+            except RedisError as e:
+                self.connected.clear()
+                self.errors += 1
+                logger.warning('Cache invalidation subscription lost: %s', e)
+                self._stopped.wait(1)
+            finally:
+                if pubsub is not None:
+                    pubsub.close()
+        self.connected.clear()
+
+    def stop(self):
+        self._stopped.set()
+
+    def stats(self):
+        return {
+            'subscribed': self.connected.is_set(),
+            'published': self.published,
+            'received': self.received,
+            'errors': self.errors,
+        }
+
+
+class TieredCache:
+    """
+    A local LRU in front of the default (Redis) cache. Reads try the local
+    tier first and fill it from Redis; writes and deletes go to both and are
+    broadcast so that other workers drop their local copy.
+
+    Values in the local tier are shared between requests and must not be
+    mutated. With a ``codec``, values are stored in Redis as
+    ``codec.encode(value)``; the local tier keeps them decoded.
+    """
+
+    def __init__(self, name, local, bus=None, codec=None):
+        self.name = name
+        self.local = local
+        self.bus = bus
+        self.codec = codec
+        self.redis_hits = 0
+        self.redis_misses = 0
+        # Per event loop: key -> future of the ashared() load in flight.
+        self._loads = weakref.WeakKeyDictionary()
+        if bus is not None:
+            bus.register(self)
+
+    def local_enabled(self):
+        return self.bus is not None and self.bus.connected.is_set()
+
+    def get(self, key):
+        local_key = cache.make_key(key)
+        value, generation = self._local_get(local_key)
+        if value is None:
+            value = self._loaded(local_key, cache.get(key), generation)
+        return value
+
+    async def aget(self, key):
+        """get() with a native asyncio Redis call, for async views."""
+        local_key = cache.make_key(key)
+        value, generation = self._local_get(local_key)
+        if value is None:
+            with timed('cache'):
+                raw = await get_async_redis().get(local_key)
+            value = self._loaded(local_key, None if raw is None else cache.client.decode(raw), generation)
+        return value
+
+    def _local_get(self, local_key):
+        # The local value, and the generation to fill the local tier at (None: do not fill it).
+        if not self.local_enabled():
+            return None, None
+        generation = self.local.generation
+        return self.local.get(local_key), generation
+
+    def _loaded(self, local_key, value, generation):
+        if self.codec is not None:
+            value = self.codec.decode(value)
+        if value is None:
+            self.redis_misses += 1
+            return None
+        self.redis_hits += 1
+        if generation is not None:
+            self.local.set(local_key, value, generation=generation)
+        return value
+
+    async def aget_or_set(self, key, load, timeout=None):
+        """
+        aget(), or on a miss ``await load()`` and aset() its result unless
+        it is None. Concurrent misses of ``key`` on this event loop share
+        one load (ashared()).
+        """
+        value = await self.aget(key)
+        if value is not None:
+            return value
+
+        async def load_and_set():
+            value = await load()
+            if value is not None:
+                await self.aset(key, value, timeout=timeout)
+            return value
+
+        return await self.ashared(key, load_and_set)
+
+    async def ashared(self, key, load):
+        """
+        ``await load()``, unless a load of ``key`` is already in flight on
+        this event loop: then wait for it and return its result instead of
+        running another one.
+        """
+        loop = asyncio.get_running_loop()
+        loads = self._loads.setdefault(loop, {})
+        while key in loads:
+            shared = loads[key]
+            await asyncio.wait([shared])
+            if not shared.cancelled():
+                return shared.result()
+            # The load failed or was cancelled with its request; try again.
+
+        shared = loads[key] = loop.create_future()
+        try:
+            value = await load()
+        except BaseException:
+            shared.cancel()
+            raise
+        else:
+            shared.set_result(value)
+        finally:
+            del loads[key]
+        return value
+
+    def set(self, key, value, timeout=None):
+        cache.set(key, value if self.codec is None else self.codec.encode(value), timeout=timeout)
+        local_key = cache.make_key(key)
+        if self.local_enabled():
+            self.local.set(local_key, value, ttl=timeout)
+        self.publish(local_key)
+
+    async def aset(self, key, value, timeout=None):
+        local_key = cache.make_key(key)
+        raw = cache.client.encode(value if self.codec is None else self.codec.encode(value))
+        with timed('cache'):
+            await get_async_redis().set(local_key, raw, px=None if timeout is None else int(timeout * 1000))
+        if self.local_enabled():
+            self.local.set(local_key, value, ttl=timeout)
+        if self.bus is not None:
+            await self.bus.apublish(self.name, local_key)
+
+    def set_local(self, key, value, timeout=None, generation=None):
+        """
+        Replace this process's local copy of ``key`` without writing Redis,
+        for a value whose changes Redis keeps under other keys. With
+        ``generation``, skip it if the local tier was invalidated since.
+        """
+        if self.local_enabled():
+            self.local.set(cache.make_key(key), value, ttl=timeout, generation=generation)
+
+    def delete(self, key):
+        cache.delete(key)
+        local_key = cache.make_key(key)
+        self.local.discard(local_key)
+        self.publish(local_key)
+
+    def publish(self, local_key):
+        if self.bus is not None:
+            self.bus.publish(self.name, local_key)
+
+    def stats(self):
+        return {
+            'local': dict(self.local.stats(), enabled=self.local_enabled()),
+            'redis': {
+                'hits': self.redis_hits,
+                'misses': self.redis_misses,
+                'hit_ratio': ratio(self.redis_hits, self.redis_misses),
+            },
+        }
+
+
+_tiers = {}
+_tiers_pid = None
+_tiers_lock = threading.Lock()
+
+
+def get_tier(name):
+    # The subscriber thread does not survive a fork, so each worker builds its own.
+    global _tiers, _tiers_pid
+    pid = os.getpid()
+    if _tiers_pid != pid:
+        with _tiers_lock:
+            if _tiers_pid != pid:
+                bus = InvalidationBus() if settings.LOCAL_CACHE_ENABLED else None
+                _tiers = {
+                    tier: TieredCache(
+                        tier,
+                        LocalCache(options['max_entries'], options['max_bytes'], options['ttl']),
+                        bus,
+                        import_string(options['codec'])() if options.get('codec') else None,
+                    )
+                    for tier, options in settings.LOCAL_CACHE_TIERS.items()
+                }
+                _tiers_pid = pid
+    return _tiers[name]
+
+
+def clear_local_tiers():
+    for name in settings.LOCAL_CACHE_TIERS:
+        get_tier(name).local.clear()
+
+
+def tier_stats():
+    """Hit ratios and memory of this process's local tiers, and of Redis."""
+    tiers = {name: get_tier(name).stats() for name in settings.LOCAL_CACHE_TIERS}
+    bus = get_tier(next(iter(settings.LOCAL_CACHE_TIERS))).bus
+    memory = get_redis().info('memory')
+    return {
+        'pid': os.getpid(),
+        'tiers': tiers,
+        'invalidation': bus.stats() if bus is not None else None,
+        'redis': {
+            'used_memory': memory.get('used_memory'),
+            'maxmemory': memory.get('maxmemory'),
+        },
+    }
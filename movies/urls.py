@@ -1,6 +1,6 @@
 from rest_framework.routers import DefaultRouter
 from django.urls import path, include
-from .views import RegisterView, MovieListView, CollectionViewSet, RequestCountView, ResetRequestCountView
+from .views import RegisterView, MovieListView, MovieSearchView, CollectionViewSet, RequestCountView, ResetRequestCountView, UpstreamStatsView, CacheStatsView
 from rest_framework_simplejwt.views import TokenObtainPairView
 
 router = DefaultRouter()
@@ -10,7 +10,10 @@ urlpatterns = [
     path('register/', RegisterView.as_view(), name='register'),
     path('login/', TokenObtainPairView.as_view(), name='login'),
     path('movies/', MovieListView.as_view(), name='movie-list'),
+    path('movies/search/', MovieSearchView.as_view(), name='movie-search'),
     path('request-count/', RequestCountView.as_view(), name='request_count'),
     path('request-count/reset/', ResetRequestCountView.as_view(), name='reset_request_count'),
+    path('upstream-stats/', UpstreamStatsView.as_view(), name='upstream_stats'),
+    path('cache-stats/', CacheStatsView.as_view(), name='cache_stats'),
     path('', include(router.urls)),
 ]
\ No newline at end of file
@@ -0,0 +1,99 @@
+import hashlib
+import json
+import time
+from functools import partial
+from django.core.cache import cache
+from django.db import transaction
+from django.utils.cache import parse_etags
+from .instrumentation import timed
+from .models import Collection
+from .tiered_cache import get_async_redis
+
+# INCRBY only an existing key, as django-redis's incr() does.
+INCR_EXISTING = "if redis.call('EXISTS', KEYS[1]) == 1 then return redis.call('INCRBY', KEYS[1], 1) end"
+
+
+def collection_version_key(user_id):
+    return f"collections_version_{user_id}"
+
+
+def collection_version(user_id):
+    """
+    Return the version of a user's collections, bumped by every write.
+
+    A missing counter is seeded from the clock rather than 1, so that a
+    counter lost from Redis never repeats a version a client has seen.
+    """
+    key = collection_version_key(user_id)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, time.time_ns(), timeout=None)
+        version = cache.get(key)
+    return version
+
+
+def bump_collection_version(user_id):
+    key = collection_version_key(user_id)
+    try:
+        return cache.incr(key)
+    except ValueError:
+        cache.add(key, time.time_ns(), timeout=None)
+        return cache.get(key)
+
+
+async def acollection_version(user_id):
+    """collection_version() with the asyncio Redis client, for async views."""
+    redis = get_async_redis()
+    key = cache.make_key(collection_version_key(user_id))
+    with timed('cache'):
+        version = await redis.get(key)
+        if version is None:
+            await redis.set(key, time.time_ns(), nx=True)
+            version = await redis.get(key)
+    return int(version)
+
+
+async def abump_collection_version(user_id):
+    redis = get_async_redis()
+    key = cache.make_key(collection_version_key(user_id))
+    with timed('cache'):
+        version = await redis.eval(INCR_EXISTING, 1, key)
+        if version is None:
+            await redis.set(key, time.time_ns(), nx=True)
+            version = int(await redis.get(key))
+    return version
+
+
+def invalidate_movie_collections(movie_ids):
+    """
+    Bump the collection version of every user holding one of these movies,
+    since a shared Movie row shows up in their cached collection responses.
+    """
+    user_ids = Collection.movies.through.objects.filter(movie_id__in=movie_ids).values_list(
+        'collection__user_id', flat=True
+    )
+    for user_id in set(user_ids):
+        transaction.on_commit(partial(bump_collection_version, user_id))
+
+
+def digest(value):
+    return hashlib.md5(value.encode(), usedforsecurity=False).hexdigest()
+
+
+def collection_etag(request, version):
+    # Representations differ by path and by media type (JSON, NDJSON, ...).
+    representation = f"{request.get_full_path()} {getattr(request, 'accepted_media_type', '')}"
+    return f'W/"{request.user.pk}-{version}-{digest(representation)[:12]}"'
+
+
+def page_etag(entry):
+    payload = json.dumps({"count": entry["count"], "movies": entry["movies"]}, sort_keys=True, default=str)
+    return f'"{digest(payload)}"'
+
+
+def not_modified(request, etag):
+    etags = parse_etags(request.headers.get('If-None-Match', ''))
+    if '*' in etags:
+        return True
+    # If-None-Match uses the weak comparison.
+    return etag.removeprefix('W/') in [tag.removeprefix('W/') for tag in etags]
@@ -3,32 +3,68 @@ from rest_framework.response import Response
 from rest_framework import viewsets, status
 from rest_framework_simplejwt.tokens import RefreshToken
 from rest_framework.permissions import IsAuthenticated
-from .models import Collection
-from .serializers import RegisterSerializer, CollectionSerializer, MovieSerializer
+from .models import Collection, Movie
+from .serializers import RegisterSerializer, CollectionSerializer, CollectionSummarySerializer
+from .pagination import CollectionCursorPagination
 from django.conf import settings
-from django.core.cache import cache
-from .service import MovieAPIClient
-from collections import Counter
-import redis
+from django.db import transaction
+from django.db.models import Prefetch
+from functools import partial
+from itertools import chain
+from urllib.parse import urlencode
+import time
+from .page_cache import get_movies_page
+from .catalog import get_mirrored_page
+from . import read_serializers, search
+from .service import get_movie_api_client
+from .genre_counts import favourite_genres
+from .counters import read_request_count
+from .metrics import read_metrics, reset_metrics
+from .versioning import bump_collection_version, collection_etag, collection_version, not_modified, page_etag
+from .response_cache import get_cached_response, response_cache_stats, set_cached_response
+from .db_router import ReplicaReadMixin
+from .tiered_cache import tier_stats
+from .streaming import NDJSONRenderer, iter_json, iter_ndjson, stream_mode, streaming_response
+from redis.exceptions import RedisError
+from django.shortcuts import get_object_or_404
+from django.utils.cache import patch_vary_headers
+from rest_framework.settings import api_settings
 
 class RequestCountView(APIView):
     def get(self, request):
-        redis_client = redis.StrictRedis.from_url(settings.CACHES['default']['LOCATION'])
-        request_count = redis_client.get('request_count')
-        
-        if not request_count:
-            request_count = 0
-        
-        return Response({'requests': int(request_count)}, status=status.HTTP_200_OK)
+        try:
+            request_count = read_request_count()
+            metrics = read_metrics()
+            cache_stats = response_cache_stats()
+        except RedisError as e:
+            return Response({'error': 'Request counter unavailable', 'details': str(e)}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+
+        return Response({'requests': request_count, 'windows': metrics, 'response_cache': cache_stats}, status=status.HTTP_200_OK)
 
 class ResetRequestCountView(APIView):
     def post(self, request):
-        redis_client = redis.StrictRedis.from_url(settings.CACHES['default']['LOCATION'])
-        redis_client.set('request_count', 0)
-        
+        try:
+            reset_metrics()
+        except RedisError as e:
+            return Response({'error': 'Request counter unavailable', 'details': str(e)}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+
         return Response({'message': 'Request count reset successfully'}, status=status.HTTP_200_OK)
 
 
+class UpstreamStatsView(APIView):
+    def get(self, request):
+        return Response(get_movie_api_client().stats(), status=status.HTTP_200_OK)
+
+
+class CacheStatsView(APIView):
+    def get(self, request):
+        try:
+            stats = tier_stats()
+        except RedisError as e:
+            return Response({'error': 'Cache unavailable', 'details': str(e)}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+        return Response(stats, status=status.HTTP_200_OK)
+
+
 class RegisterView(APIView):
     def post(self, request):
         serializer = RegisterSerializer(data=request.data)
@@ -38,42 +74,94 @@ class RegisterView(APIView):
             return Response({'access_token': str(refresh.access_token)}, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
     
-class MovieListView(APIView):
+class MovieListView(ReplicaReadMixin, APIView):
     permission_classes = [IsAuthenticated]
+    trust_token_claims = True
 
     def get(self, request):
         page = int(request.query_params.get('page', 1))
 
-        cache_key = f"movies_list_page_{page}"
-        cached_movies = cache.get(cache_key)
-        if cached_movies:
-            return Response({"movies": cached_movies}, status=status.HTTP_200_OK)
-
-        api_client = MovieAPIClient()
-        url = settings.EXTERNAL_MOVIES_API_URL
-        auth = (settings.API_USERNAME, settings.API_PASSWORD)
-
-        result = api_client.fetch_movies(url, auth, page)
+        result = None
+        if settings.MOVIES_SOURCE == 'mirror':
+            result = get_mirrored_page(page)
+        if result is None:
+            result = get_movies_page(page)
 
         if "error" in result:
             return Response({"error": "Failed to fetch movies", "details": result["error"]}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
 
-        movie_data = result.get("results", [])
-        movies = [MovieSerializer(movie).data for movie in movie_data]
-        total_count = result.get("count", 0)
+        etag = result.get("etag") or page_etag(result)
+        if not_modified(request, etag):
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers={'ETag': etag})
 
-        cache.set(cache_key, movies, timeout=3600)
+        return Response({"count": result["count"], "page": page, "movies": result["movies"]}, status=status.HTTP_200_OK, headers={'ETag': etag})
 
-        return Response({"count": total_count, "page": page, "movies": movies}, status=status.HTTP_200_OK)
+class MovieSearchView(ReplicaReadMixin, APIView):
+    permission_classes = [IsAuthenticated]
+    trust_token_claims = True
 
-class CollectionViewSet(viewsets.ModelViewSet):
+    def get(self, request):
+        if not search.is_available():
+            return Response({"error": "Movie search requires the SQLite FTS5 index."}, status=status.HTTP_501_NOT_IMPLEMENTED)
+
+        q = request.query_params.get('q', '').strip()
+        if not q:
+            return Response({"q": "This query parameter is required."}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            page_size = max(1, min(int(request.query_params.get('page_size', 20)), 100))
+        except ValueError:
+            return Response({"page_size": "A valid integer is required."}, status=status.HTTP_400_BAD_REQUEST)
+        cursor = request.query_params.get('cursor')
+        after = search.decode_cursor(cursor) if cursor else None
+        if cursor and after is None:
+            return Response({"cursor": "Invalid cursor."}, status=status.HTTP_400_BAD_REQUEST)
+
+        started = time.perf_counter()
+        movies, next_cursor = search.search_movies(q, after=after, limit=page_size)
+        took_ms = round((time.perf_counter() - started) * 1000, 2)
+
+        next_url = None
+        if next_cursor:
+            next_url = request.build_absolute_uri(
+                f"{request.path}?{urlencode({'q': q, 'page_size': page_size, 'cursor': next_cursor})}"
+            )
+
+        return Response({"q": q, "took_ms": took_ms, "next": next_url, "movies": movies}, status=status.HTTP_200_OK)
+
+class CollectionViewSet(ReplicaReadMixin, viewsets.ModelViewSet):
     permission_classes = [IsAuthenticated]
+    trust_token_claims = True
     serializer_class = CollectionSerializer
     queryset = Collection.objects.all()
     lookup_field = 'uuid'
+    pagination_class = CollectionCursorPagination
+    renderer_classes = [*api_settings.DEFAULT_RENDERER_CLASSES, NDJSONRenderer]
 
     def get_queryset(self):
-        return self.queryset.filter(user=self.request.user)
+        queryset = self.queryset.filter(user=self.request.user)
+        genre = self.request.query_params.get('genre')
+        if self.action == 'list':
+            queryset = queryset.only('id', 'uuid', 'title', 'description')
+            if genre:
+                queryset = queryset.filter(movies__genre_list__name=genre).distinct()
+            if self.include_movies():
+                queryset = queryset.prefetch_related(
+                    Prefetch('movies', queryset=Movie.objects.only('uuid', 'title', 'description', 'genres'))
+                )
+        elif self.action == 'retrieve' and genre:
+            queryset = queryset.prefetch_related(
+                Prefetch('movies', queryset=Movie.objects.filter(genre_list__name=genre))
+            )
+        return queryset
+
+    def get_serializer_class(self):
+        if self.action == 'list' and not self.include_movies():
+            return CollectionSummarySerializer
+        return super().get_serializer_class()
+
+    def include_movies(self):
+        return self.request.query_params.get('include_movies', 'true').lower() not in ('0', 'false', 'no')
 
     def create(self, request, *args, **kwargs):
         serializer = self.get_serializer(data=request.data)
@@ -83,34 +171,129 @@ class CollectionViewSet(viewsets.ModelViewSet):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
     def list(self, request, *args, **kwargs):
-        collections = self.get_queryset()
-        serializer = self.get_serializer(collections, many=True)
+        version = collection_version(request.user.pk)
+        etag = collection_etag(request, version)
+        if not_modified(request, etag):
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers={'ETag': etag})
+
+        mode = stream_mode(request)
+        if mode:
+            return self.stream_list(mode, etag)
 
-        genres_count = Counter()
-        for collection in collections:
-            for movie in collection.movies.all():
-                genres_count.update(genre.strip() for genre in movie.genres.split(','))
+        cached = get_cached_response('list', request, version)
+        if cached is not None:
+            return Response(cached, headers={'ETag': etag})
 
-        sorted_genres = sorted(genres_count.items(), key=lambda x: x[1], reverse=True)[:3]
-        favorite_genres = ', '.join([genre for genre, _ in sorted_genres])
+        if read_serializers.enabled():
+            rows = self.paginate_queryset(
+                self.get_queryset().prefetch_related(None).values('id', *read_serializers.COLLECTION_FIELDS)
+            )
+            collections = read_serializers.collection_dicts(rows, self.include_movies())
+        else:
+            collections = self.get_serializer(self.paginate_queryset(self.get_queryset()), many=True).data
 
-        return Response({
+        favorite_genres = favourite_genres(request.user)
+
+        response_data = {
             'is_success': True,
             'data': {
-                'collections': serializer.data,
-                'favourite_genres': favorite_genres
+                'collections': collections,
+                'favourite_genres': favorite_genres,
+                'next': self.paginator.get_next_link(),
+                'previous': self.paginator.get_previous_link()
             }
-        })
+        }
+        set_cached_response('list', request, version, response_data)
+
+        return Response(response_data, headers={'ETag': etag})
 
     def retrieve(self, request, *args, **kwargs):
-        collection = self.get_object()
-        serializer = self.get_serializer(collection)
+        version = collection_version(request.user.pk)
+        etag = collection_etag(request, version)
+        if not_modified(request, etag):
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers={'ETag': etag})
+
+        mode = stream_mode(request)
+        if mode:
+            return self.stream_retrieve(mode, etag)
+
+        cached = get_cached_response('retrieve', request, version)
+        if cached is not None:
+            return Response(cached, status=status.HTTP_200_OK, headers={'ETag': etag})
+
+        if read_serializers.enabled():
+            collection = self.get_collection_summary()
+            movies = read_serializers.movie_dicts(self.collection_movies(collection))
+        else:
+            collection = self.get_object()
+            movies = self.get_serializer(collection).data.get('movies', [])
         response_data = {
             'title': collection.title,
             'description': collection.description,
-            'movies': serializer.data.get('movies', [])
+            'movies': movies
         }
-        return Response(response_data, status=status.HTTP_200_OK)
+        set_cached_response('retrieve', request, version, response_data)
+        return Response(response_data, status=status.HTTP_200_OK, headers={'ETag': etag})
+
+    def get_collection_summary(self):
+        """get_object() without the movies prefetch, for the retrieve paths that query movies themselves."""
+        queryset = self.queryset.filter(user=self.request.user).only('id', 'title', 'description')
+        collection = get_object_or_404(queryset, uuid=self.kwargs[self.lookup_field])
+        self.check_object_permissions(self.request, collection)
+        return collection
+
+    def collection_movies(self, collection):
+        movies = collection.movies.all()
+        genre = self.request.query_params.get('genre')
+        if genre:
+            movies = movies.filter(genre_list__name=genre)
+        return movies
+
+    def stream_list(self, mode, etag):
+        """
+        Stream every collection (unpaginated), serializing one chunk of the
+        queryset and its prefetched movies at a time.
+        """
+        serializer_class = self.get_serializer_class()
+        context = self.get_serializer_context()
+        collections = (
+            serializer_class(collection, context=context).data
+            for collection in self.get_queryset().order_by('id').iterator(chunk_size=settings.STREAM_CHUNK_SIZE)
+        )
+        if mode == 'ndjson':
+            return streaming_response(iter_ndjson(collections), mode, headers={'ETag': etag})
+
+        response_data = {
+            'is_success': True,
+            'data': {
+                'collections': collections,
+                'favourite_genres': favourite_genres(self.request.user),
+                'next': None,
+                'previous': None,
+            }
+        }
+        return streaming_response(iter_json(response_data), mode, headers={'ETag': etag})
+
+    def stream_retrieve(self, mode, etag):
+        """
+        Stream a collection's movies straight from the database cursor. In
+        NDJSON the first line holds the title and description.
+        """
+        collection = self.get_collection_summary()
+        movies = self.collection_movies(collection).values(*read_serializers.MOVIE_FIELDS)
+        movies = movies.iterator(chunk_size=settings.STREAM_CHUNK_SIZE)
+
+        summary = {'title': collection.title, 'description': collection.description}
+        if mode == 'ndjson':
+            return streaming_response(iter_ndjson(chain([summary], movies)), mode, headers={'ETag': etag})
+        return streaming_response(iter_json({**summary, 'movies': movies}), mode, headers={'ETag': etag})
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        if self.action in ('list', 'retrieve'):
+            # JSON, NDJSON and the browsable API share URLs.
+            patch_vary_headers(response, ['Accept'])
+        return response
 
     def update(self, request, *args, **kwargs):
         partial = kwargs.pop('partial', False)
@@ -127,6 +310,7 @@ class CollectionViewSet(viewsets.ModelViewSet):
         collection = self.get_object()
         collection_uuid = collection.uuid
         collection.delete()
+        transaction.on_commit(partial(bump_collection_version, collection.user_id))
         return Response(
             {'message': f'Collection with UUID {collection_uuid} has been deleted.'},
             status=status.HTTP_204_NO_CONTENT